@@ -132,6 +132,34 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Persistent store for repository metadata, shared by all workers.
+    'paper_metadata': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'paper_metadata',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
+}
+
+# Metadata cache for fetch_paper_data
+PAPER_METADATA_CACHE_TTL = 60 * 60 * 24
+PAPER_METADATA_CACHE_MAX_ENTRIES = 1024
+PAPER_METADATA_CACHE_BACKEND = 'paper_metadata'
+# Negative cache: unknown IDs vs. timeouts/5xx from the repository
+PAPER_METADATA_NOT_FOUND_TTL = 60 * 10
+PAPER_METADATA_ERROR_TTL = 30
+# Landing page bytes read after the <head> so the keep-alive connection is reused; bigger pages are cut off
+LANDING_PAGE_DRAIN_BYTES = 512 * 1024
+
 GEMINI_API_KEY = ''
 
 if not GEMINI_API_KEY and not DEBUG:
@@ -152,3 +180,116 @@ LOGGING = {
         },
     },
 }
+
+# Outbound HTTP (papers.http_client)
+# Identifies the service to upstream servers; set HTTP_CONTACT_EMAIL so their operators can reach us.
+HTTP_CONTACT_EMAIL = os.getenv('HTTP_CONTACT_EMAIL', '')
+HTTP_USER_AGENT = (
+    'arxiv-paper-summarizer/1.0 (+https://github.com/khasanyusupkhujaev/arXiv_paper_summarizer'
+    + (f'; mailto:{HTTP_CONTACT_EMAIL}' if HTTP_CONTACT_EMAIL else '') + ')'
+)
+HTTP_POOL_SIZE = 10
+HTTP_HOST_POOL_SIZES = {
+    'arxiv.org': 20,
+    'export.arxiv.org': 10,
+    'www.medrxiv.org': 10,
+    'www.biorxiv.org': 10,
+    'chemrxiv.org': 10,
+}
+# Retries of GET/HEAD on connection errors, 429 and 5xx; each attempt waits for the host's rate limit again.
+HTTP_RETRY_TOTAL = 3
+HTTP_RETRY_BACKOFF = 0.5
+
+# Download/extraction pipeline (papers.pipeline)
+PIPELINE_MAX_CONCURRENCY = 8
+PIPELINE_PER_HOST_CONCURRENCY = 4
+PIPELINE_EXTRACT_WORKERS = None  # defaults to the number of CPUs
+
+# Content-addressed store of original PDFs (papers.pdf_store)
+PDF_STORE_ROOT = BASE_DIR / 'pdf_store'
+PDF_STORE_MAX_BYTES = 5 * 1024 ** 3
+
+# Per-host rate limits shared by all workers (papers.ratelimit).
+# rate: requests per second, burst: bucket size, concurrency: simultaneous requests,
+# max_wait: seconds a request queues for its turn (default HTTP_RATE_LIMIT_MAX_WAIT).
+HTTP_RATE_LIMITS = {
+    # arXiv API terms: one request every three seconds. Lookups queue for their turn instead of
+    # failing; max_wait stays under gunicorn's default 30 s worker timeout.
+    'export.arxiv.org': {'rate': 1 / 3, 'burst': 1, 'concurrency': 1, 'max_wait': 25},
+    'arxiv.org': {'rate': 4, 'burst': 8, 'concurrency': 4},
+    'www.medrxiv.org': {'rate': 1, 'burst': 3, 'concurrency': 2},
+    'www.biorxiv.org': {'rate': 1, 'burst': 3, 'concurrency': 2},
+    'chemrxiv.org': {'rate': 1, 'burst': 3, 'concurrency': 2},
+}
+HTTP_DEFAULT_RATE_LIMIT = {'rate': 5, 'burst': 10, 'concurrency': 8}
+HTTP_RATE_LIMIT_DIR = BASE_DIR / 'cache' / 'ratelimit'
+HTTP_RATE_LIMIT_MAX_WAIT = 10.0
+
+# PDF text extraction (papers.extraction)
+PDF_EXTRACT_WORKERS = None  # defaults to the number of CPUs
+PDF_PARALLEL_MIN_PAGES = 24
+# Engines: 'pypdf2' (default), 'pymupdf' (pip install pymupdf), 'pdfminer' (pip install pdfminer.six).
+# Installed fallbacks are tried in order when an engine fails or returns under
+# PDF_EXTRACTION_MIN_CHARS_PER_PAGE characters per page. Compare them with
+# `manage.py bench_extraction_engines`.
+PDF_EXTRACTION_ENGINE = 'pypdf2'
+PDF_EXTRACTION_FALLBACK_ENGINES = ['pymupdf', 'pdfminer']
+PDF_EXTRACTION_MIN_CHARS_PER_PAGE = 200
+
+# Pages extracted per summary type (papers.extraction.EXTRACTION_PROFILES);
+# the rest is extracted at once for a detailed summary, or in the background
+# after the first question about the paper.
+SUMMARY_EXTRACTION_PROFILES = {
+    'short': 'until_references',
+    'ordinary': 'until_references',
+    'detailed': 'full',
+}
+
+# Celery broker for background jobs (papers.tasks). Without one, the rest of
+# a partially extracted paper is extracted on a thread of the web process.
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', '')
+# A background extraction that has not completed the text after this many
+# seconds (a crashed worker) may be scheduled again.
+FULL_TEXT_RESCHEDULE_AFTER = 15 * 60
+
+# Local extractive compression before summarization (papers.compression, needs NumPy).
+# Papers longer than the budget of their summary type are cut to the best
+# sentences by TextRank ('textrank') or centroid similarity ('centroid');
+# None sends the whole text. Compare with `manage.py bench_summarization`.
+SUMMARY_EXTRACTIVE_COMPRESSION = True
+SUMMARY_COMPRESSION_METHOD = 'textrank'
+SUMMARY_TOKEN_BUDGETS = {
+    'short': 3000,
+    'ordinary': 8000,
+    'detailed': None,
+}
+
+# Map-reduce summarization (papers.map_reduce): texts above the threshold
+# (after compression) are summarized in chunks on a thread pool, then reduced.
+SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS = 12000
+SUMMARY_MAP_REDUCE_CHUNK_TOKENS = 6000
+SUMMARY_MAP_REDUCE_WORKERS = 4
+
+# Prompt budgets per operation in estimated tokens (papers.prompts). Only the
+# paper context is shortened to fit. Question context is filled with the
+# abstract, conclusion, introduction, results and methods sections in that order.
+LLM_PROMPT_TOKEN_BUDGETS = {
+    'summary': 32000,
+    'summary_chunk': 8000,
+    'question': 1500,
+    'translation': 4000,
+}
+
+# How a summary in a new language is produced when the same summary type
+# exists in another language: 'translate' it (a few hundred tokens) or
+# 'summarize' the paper again.
+SUMMARY_LANGUAGE_POLICY = 'translate'
+
+# Single-flight LLM calls (papers.singleflight): identical summary or question
+# requests running at the same time, in any worker, share one model call via a
+# GenerationLock row. Others poll for the stored result every POLL_INTERVAL
+# seconds, for at most WAIT_SECONDS. The owner refreshes its lock while it
+# generates; a lock not refreshed for LOCK_TTL seconds (dead worker) is taken over.
+LLM_SINGLE_FLIGHT_LOCK_TTL = 60
+LLM_SINGLE_FLIGHT_WAIT_SECONDS = 120
+LLM_SINGLE_FLIGHT_POLL_INTERVAL = 0.5
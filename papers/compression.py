@@ -0,0 +1,163 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from .tokens import estimate_tokens
+
+try:
+    import numpy as np
+except ImportError:  # compression is skipped and the full text is sent
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Token budget of the text sent for each summary type; None sends the whole text.
+DEFAULT_TOKEN_BUDGETS = {
+    'short': 3000,
+    'ordinary': 8000,
+    'detailed': None,
+}
+DEFAULT_METHOD = 'textrank'
+
+# Vocabulary cap; keeps the sentence matrix small for long papers.
+MAX_FEATURES = 2048
+# Sentences scored together; the similarity matrix is N x N, so longer texts are scored in blocks of this many.
+MAX_BLOCK_SENTENCES = 1500
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+# Sentences near the start (abstract, introduction) get a small boost.
+POSITION_WEIGHT = 0.1
+MIN_SENTENCE_CHARS = 20
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-ZА-ЯЁ0-9(\[])')
+WORD_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+
+
+def _compression_settings(summary_type):
+    from django.conf import settings
+    if not getattr(settings, 'SUMMARY_EXTRACTIVE_COMPRESSION', True):
+        return None, DEFAULT_METHOD
+    budgets = getattr(settings, 'SUMMARY_TOKEN_BUDGETS', DEFAULT_TOKEN_BUDGETS)
+    return budgets.get(summary_type), getattr(settings, 'SUMMARY_COMPRESSION_METHOD', DEFAULT_METHOD)
+
+
+def split_sentences(text):
+    sentences = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = ' '.join(paragraph.split())
+        sentences.extend(sentence for sentence in SENTENCE_RE.split(paragraph) if len(sentence) >= MIN_SENTENCE_CHARS)
+    return sentences
+
+
+def _sentence_vectors(sentences):
+    """L2-normalized TF-IDF rows over the words shared by the most sentences."""
+    tokenized = [WORD_RE.findall(sentence.lower()) for sentence in sentences]
+    document_frequency = Counter(word for words in tokenized for word in set(words))
+    vocabulary = {
+        word: column
+        for column, (word, count) in enumerate(document_frequency.most_common(MAX_FEATURES))
+        if count > 1
+    }
+    rows, cols = [], []
+    for row, words in enumerate(tokenized):
+        for word in words:
+            column = vocabulary.get(word)
+            if column is not None:
+                rows.append(row)
+                cols.append(column)
+    matrix = np.zeros((len(sentences), max(len(vocabulary), 1)), dtype=np.float32)
+    np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    frequencies = np.array([document_frequency[word] for word in vocabulary] or [1], dtype=np.float32)
+    matrix *= np.log((1 + len(sentences)) / (1 + frequencies)) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def _textrank_scores(vectors):
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    row_sums[row_sums == 0] = 1
+    transition = similarity / row_sums
+    count = len(vectors)
+    scores = np.full(count, 1.0 / count, dtype=np.float32)
+    for _ in range(TEXTRANK_ITERATIONS):
+        scores = (1 - TEXTRANK_DAMPING) / count + TEXTRANK_DAMPING * (transition.T @ scores)
+    return scores
+
+
+def _centroid_scores(vectors):
+    centroid = vectors.mean(axis=0)
+    norm = np.linalg.norm(centroid)
+    return vectors @ (centroid / norm) if norm else np.zeros(len(vectors), dtype=np.float32)
+
+
+def _score_sentences(sentences, method):
+    """Scores in [0, 1]; each block of MAX_BLOCK_SENTENCES consecutive sentences is ranked on its own."""
+    scores = []
+    for start in range(0, len(sentences), MAX_BLOCK_SENTENCES):
+        block = sentences[start:start + MAX_BLOCK_SENTENCES]
+        if len(block) < 2:
+            scores.append(np.ones(len(block), dtype=np.float32))
+            continue
+        vectors = _sentence_vectors(block)
+        block_scores = _textrank_scores(vectors) if method == 'textrank' else _centroid_scores(vectors)
+        scores.append(block_scores / (block_scores.max() or 1))
+    return np.concatenate(scores)
+
+
+def compress_text(text, token_budget, method=DEFAULT_METHOD):
+    """
+    Keep the highest scoring sentences of text that fit in token_budget, in their original order.
+
+    method is 'textrank' (PageRank over the sentence similarity graph) or
+    'centroid' (similarity to the document's mean vector). Text that already
+    fits, or that cannot be compressed (no NumPy), is returned unchanged.
+    Very long texts are ranked in consecutive blocks of MAX_BLOCK_SENTENCES
+    to keep the similarity matrix bounded.
+    """
+    if np is None or not token_budget or estimate_tokens(text) <= token_budget:
+        return text
+    sentences = split_sentences(text)
+    if len(sentences) < 2:
+        return text
+    scores = _score_sentences(sentences, method)
+    scores = scores + POSITION_WEIGHT * (1 - np.arange(len(sentences)) / len(sentences))
+
+    chosen = []
+    used = 0
+    for index in np.argsort(-scores):
+        # One extra token per sentence covers the joining space and the rounding of estimate_tokens().
+        tokens = estimate_tokens(sentences[index]) + 1
+        if used + tokens > token_budget:
+            continue
+        chosen.append(index)
+        used += tokens
+    return ' '.join(sentences[index] for index in sorted(chosen))
+
+
+def compress_for_summary(text, summary_type):
+    """Apply the configured token budget of summary_type (settings.SUMMARY_TOKEN_BUDGETS)."""
+    return compress_for_summaries(text, [summary_type])
+
+
+def compress_for_summaries(text, summary_types):
+    """Compress once for several summary types written from the same text: the largest budget wins."""
+    budgets = []
+    for summary_type in summary_types:
+        token_budget, method = _compression_settings(summary_type)
+        if not token_budget:
+            return text
+        budgets.append(token_budget)
+    if not budgets:
+        return text
+    started = time.monotonic()
+    compressed = compress_text(text, max(budgets), method)
+    if compressed is not text:
+        logger.info(
+            f"Экстрактивное сжатие ({method}, {', '.join(summary_types)}): ~{estimate_tokens(text)} -> "
+            f"~{estimate_tokens(compressed)} токенов за {time.monotonic() - started:.2f} с"
+        )
+    return compressed
@@ -0,0 +1,276 @@
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .extraction_engines import DEFAULT_ENGINE, available_engines, get_engine
+
+logger = logging.getLogger(__name__)
+
+# Below this many pages the process pool costs more than it saves.
+DEFAULT_PARALLEL_MIN_PAGES = 24
+# Fewer characters per page than this means the engine likely failed (scans, odd encodings).
+DEFAULT_MIN_CHARS_PER_PAGE = 200
+
+# Page selection per profile. head_pages/tail_pages keep only the first/last
+# pages; stop_at_references drops everything from the References heading on.
+# The last pages of most papers are the bibliography and appendices, not the
+# conclusion, so head_tail is not used for any summary type by default.
+FULL_PROFILE = 'full'
+EXTRACTION_PROFILES = {
+    'head_tail': {'head_pages': 3, 'tail_pages': 2},
+    'until_references': {'stop_at_references': True},
+    FULL_PROFILE: {},
+}
+# Profiles from narrowest to widest: text extracted with a profile can stand in for any profile before it.
+PROFILE_ORDER = ('head_tail', 'until_references', FULL_PROFILE)
+DEFAULT_SUMMARY_PROFILES = {
+    'short': 'until_references',
+    'ordinary': 'until_references',
+    'detailed': FULL_PROFILE,
+}
+
+# Pages are joined with a form feed on a line of its own, so cleanup can tell where pages start and end.
+PAGE_BREAK = "\f"
+PAGE_SEPARATOR = f"\n{PAGE_BREAK}\n"
+
+REFERENCES_HEADING_RE = re.compile(
+    r'^[ \t]*(?:[0-9IVX]+\.?[ \t]*)?(?:References|Bibliography|Литература|Список литературы)[ \t]*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _clean_metadata_value(value):
+    value = (value or '').strip()
+    if value.startswith('(\ufeff') or value.startswith('( '):
+        value = value[1:]
+    if value.endswith(')'):
+        value = value[:-1]
+    return value
+
+
+class _Document:
+    """An open PDF together with the engine that opened it."""
+
+    def __init__(self, engine, source):
+        self.engine = engine
+        self.handle = engine.open(source)
+
+    def page_count(self):
+        return self.engine.page_count(self.handle)
+
+    def page_text(self, index):
+        return self.engine.page_text(self.handle, index)
+
+    def close(self):
+        self.engine.close(self.handle)
+
+
+def _open_document(source, engine_name):
+    """source is a file path or the PDF bytes; both can be sent to pool workers."""
+    return _Document(get_engine(engine_name), source)
+
+
+def _extract_pages(source, indices, engine_name):
+    """Pool worker: extract the given pages of the PDF, in order."""
+    document = _open_document(source, engine_name)
+    try:
+        return [document.page_text(index) for index in indices]
+    finally:
+        document.close()
+
+
+def profile_for_summary_type(summary_type):
+    """Extraction profile used for a summary type (settings.SUMMARY_EXTRACTION_PROFILES)."""
+    from django.conf import settings
+    profiles = getattr(settings, 'SUMMARY_EXTRACTION_PROFILES', DEFAULT_SUMMARY_PROFILES)
+    return profiles.get(summary_type, FULL_PROFILE)
+
+
+def widest_profile(profiles):
+    return max(profiles, key=PROFILE_ORDER.index, default=FULL_PROFILE)
+
+
+def profile_covers(extracted_profile, needed_profile):
+    """True if text extracted with extracted_profile is enough for needed_profile."""
+    return PROFILE_ORDER.index(extracted_profile or FULL_PROFILE) >= PROFILE_ORDER.index(needed_profile)
+
+
+def _select_pages(page_count, profile):
+    options = EXTRACTION_PROFILES[profile]
+    head = options.get('head_pages')
+    tail = options.get('tail_pages', 0)
+    if head is None or head + tail >= page_count:
+        return list(range(page_count))
+    return list(range(head)) + list(range(max(head, page_count - tail), page_count))
+
+
+def _extraction_settings():
+    from django.conf import settings
+    workers = getattr(settings, 'PDF_EXTRACT_WORKERS', None) or os.cpu_count() or 1
+    min_pages = getattr(settings, 'PDF_PARALLEL_MIN_PAGES', DEFAULT_PARALLEL_MIN_PAGES)
+    return workers, min_pages
+
+
+def _engine_settings():
+    from django.conf import settings
+    engine = getattr(settings, 'PDF_EXTRACTION_ENGINE', DEFAULT_ENGINE)
+    fallbacks = getattr(settings, 'PDF_EXTRACTION_FALLBACK_ENGINES', [])
+    min_chars = getattr(settings, 'PDF_EXTRACTION_MIN_CHARS_PER_PAGE', DEFAULT_MIN_CHARS_PER_PAGE)
+    return engine, fallbacks, min_chars
+
+
+def _get_pool(workers):
+    """Process pool shared by all extractions in this process, created on first use."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _page_ranges(page_count, parts):
+    size, remainder = divmod(page_count, parts)
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < remainder else 0)
+        if end > start:
+            yield start, end
+        start = end
+
+
+def _iter_page_texts(document, source, parallel, pages):
+    page_count = len(pages)
+    workers, min_pages = _extraction_settings() if parallel is not False else (1, 0)
+    use_pool = (
+        parallel is not False
+        and workers > 1
+        and (parallel or page_count >= min_pages)
+        and not multiprocessing.current_process().daemon
+    )
+    if not use_pool:
+        for index in pages:
+            yield document.page_text(index)
+        return
+    # A few ranges per worker keeps the pool busy when some pages are much heavier than others.
+    pool = _get_pool(workers)
+    futures = [pool.submit(_extract_pages, source, pages[start:end], document.engine.name) for start, end in _page_ranges(page_count, workers * 2)]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+    logger.info(f"Текст {page_count} страниц извлечен параллельно ({workers} процессов)")
+
+
+def _read_metadata(document):
+    title, authors = document.engine.metadata(document.handle)
+    return _clean_metadata_value(title), _clean_metadata_value(authors)
+
+
+def _normalize_source(source):
+    return source if isinstance(source, (bytes, bytearray)) else str(source)
+
+
+def _iter_pages(document, source, parallel, profile):
+    pages = _select_pages(document.page_count(), profile)
+    stop_at_references = EXTRACTION_PROFILES[profile].get('stop_at_references')
+    for index, page_text in zip(pages, _iter_page_texts(document, source, parallel, pages)):
+        if stop_at_references and index > 0:
+            match = REFERENCES_HEADING_RE.search(page_text)
+            if match:
+                yield index + 1, page_text[:match.start()]
+                logger.info(f"Извлечение остановлено на списке литературы (страница {index + 1} из {len(pages)})")
+                return
+        yield index + 1, page_text
+
+
+def collect_pages(pages, on_page=None):
+    """Join (page_number, text) pairs into the document text in a single pass, calling on_page for each."""
+    parts = []
+    for page_number, page_text in pages:
+        if on_page is not None:
+            on_page(page_number, page_text)
+        if page_text:
+            if parts:
+                parts.append(PAGE_SEPARATOR)
+            parts.append(page_text)
+    if parts:
+        parts.append("\n")
+    return "".join(parts)
+
+
+def _extract_with_engine(source, parallel, profile, engine_name):
+    document = _open_document(source, engine_name)
+    try:
+        title, authors = _read_metadata(document)
+        pages = []
+        text = collect_pages(_iter_pages(document, source, parallel, profile), on_page=lambda number, page_text: pages.append(number))
+    finally:
+        document.close()
+    return text, title, authors, len(pages)
+
+
+def _extract(source, parallel, profile):
+    """
+    Extract with the configured engine, falling back to the next installed one
+    when it fails or returns almost no text, and keep the richest result.
+    """
+    source = _normalize_source(source)
+    engine, fallbacks, min_chars = _engine_settings()
+    installed = available_engines()
+    candidates = [engine] + [name for name in fallbacks if name != engine and name in installed]
+    best = None
+    for index, engine_name in enumerate(candidates):
+        is_last = index == len(candidates) - 1
+        try:
+            text, title, authors, page_count = _extract_with_engine(source, parallel, profile, engine_name)
+        except Exception as e:
+            if is_last and best is None:
+                raise
+            logger.warning(f"Движок {engine_name} не смог извлечь текст из PDF: {e}")
+            continue
+        if best is None or len(text) > len(best[0]):
+            best = (text, title, authors)
+        if len(text) >= min_chars * max(page_count, 1):
+            break
+        if not is_last:
+            logger.info(f"Движок {engine_name} извлек мало текста ({len(text)} символов, {page_count} страниц), пробуем следующий")
+    return best
+
+
+def extract_text_and_metadata_from_pdf(file_path, parallel=None, profile=FULL_PROFILE):
+    """
+    Extract text, title and authors from a PDF file.
+
+    parallel=None splits long documents (PDF_PARALLEL_MIN_PAGES or more pages)
+    across a process pool of PDF_EXTRACT_WORKERS processes and extracts short
+    ones serially; True/False force either mode. profile selects the pages,
+    see EXTRACTION_PROFILES and profile_for_summary_type().
+    """
+    try:
+        text, title, authors = _extract(file_path, parallel, profile)
+        logger.info(f"Успешно извлечены текст, название и авторы из {file_path}")
+    except Exception as e:
+        logger.error(f"Ошибка при извлечении текста/метаданных из PDF {file_path}: {e}")
+        raise
+    return text, title, authors
+
+
+def extract_text_and_metadata_from_bytes(pdf_bytes, parallel=None, profile=FULL_PROFILE):
+    """Same as extract_text_and_metadata_from_pdf, for a PDF already held in memory."""
+    try:
+        return _extract(pdf_bytes, parallel, profile)
+    except Exception as e:
+        logger.error(f"Ошибка при извлечении текста/метаданных из PDF ({len(pdf_bytes)} байт): {e}")
+        raise
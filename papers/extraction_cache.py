@@ -0,0 +1,78 @@
+import logging
+import zlib
+
+from django.db import IntegrityError
+
+from .extraction import (
+    FULL_PROFILE, PROFILE_ORDER, _engine_settings, extract_text_and_metadata_from_bytes,
+    extract_text_and_metadata_from_pdf, profile_covers,
+)
+from .extraction_engines import ENGINES
+from .models import ExtractedText
+
+logger = logging.getLogger(__name__)
+
+# Bump when the text produced for the same PDF changes (cleanup, page joining, profiles).
+EXTRACTION_FORMAT_VERSION = 2
+COMPRESSION_LEVEL = 6
+
+
+def extractor_version():
+    """Cache key part that changes whenever the configured engines or their versions change."""
+    engine, fallbacks, _ = _engine_settings()
+    names = [engine] + [name for name in fallbacks if name != engine]
+    engines = "+".join(f"{name}-{ENGINES[name].version()}" for name in names if name in ENGINES and ENGINES[name].is_available())
+    return f"v{EXTRACTION_FORMAT_VERSION}:{engines}"[:100]
+
+
+def lookup(pdf_sha256, profile=FULL_PROFILE):
+    """
+    Return (text, title, authors, profile) for an already extracted PDF, or None.
+
+    An entry extracted with a wider profile also satisfies the request; the
+    narrowest one that does is returned, and its profile is reported so the
+    caller records what the text actually covers.
+    """
+    entries = ExtractedText.objects.filter(pdf_sha256=pdf_sha256, extractor_version=extractor_version())
+    entries = sorted(
+        (entry for entry in entries if entry.profile in PROFILE_ORDER and profile_covers(entry.profile, profile)),
+        key=lambda entry: PROFILE_ORDER.index(entry.profile),
+    )
+    if not entries:
+        return None
+    entry = entries[0]
+    return zlib.decompress(bytes(entry.text_zlib)).decode('utf-8'), entry.title, entry.authors, entry.profile
+
+
+def store(pdf_sha256, profile, text, title, authors):
+    compressed = zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+    try:
+        ExtractedText.objects.update_or_create(
+            pdf_sha256=pdf_sha256,
+            extractor_version=extractor_version(),
+            profile=profile,
+            defaults={'text_zlib': compressed, 'text_length': len(text), 'title': title or '', 'authors': authors or ''},
+        )
+    except IntegrityError:
+        # Another worker stored the same document concurrently; its result is as good as ours.
+        pass
+    logger.info(f"Кэш извлечения: сохранен {pdf_sha256[:12]} ({profile}, {len(text)} символов, {len(compressed)} байт сжато)")
+
+
+def extract_cached(pdf_sha256, source, profile=FULL_PROFILE, parallel=None):
+    """
+    Extract text and metadata from source (a path or the PDF bytes), reusing a previous
+    extraction of the same PDF content. Returns (text, title, authors, profile).
+    """
+    if pdf_sha256:
+        cached = lookup(pdf_sha256, profile)
+        if cached is not None:
+            logger.info(f"Кэш извлечения: попадание для {pdf_sha256[:12]} ({cached[3]})")
+            return cached
+    if isinstance(source, (bytes, bytearray)):
+        text, title, authors = extract_text_and_metadata_from_bytes(source, parallel=parallel, profile=profile)
+    else:
+        text, title, authors = extract_text_and_metadata_from_pdf(source, parallel=parallel, profile=profile)
+    if pdf_sha256 and text:
+        store(pdf_sha256, profile, text, title, authors)
+    return text, title, authors, profile
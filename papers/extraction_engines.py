@@ -0,0 +1,166 @@
+from io import BytesIO
+
+import PyPDF2
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pdfminer
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+except ImportError:
+    pdfminer_extract_text = None
+
+DEFAULT_ENGINE = 'pypdf2'
+
+
+def _as_file(source):
+    """source is a file path or the PDF bytes."""
+    return open(source, 'rb') if isinstance(source, str) else BytesIO(source)
+
+
+class ExtractionEngine:
+    """
+    Text extraction backend.
+
+    open() returns a document handle that the other methods take; handles are
+    per process, so pool workers open the document themselves by engine name.
+    metadata() returns raw (title, author) values.
+    """
+
+    name = None
+
+    def is_available(self):
+        return True
+
+    def version(self):
+        """Library version, part of the extraction cache key."""
+        return ''
+
+    def open(self, source):
+        raise NotImplementedError
+
+    def page_count(self, document):
+        raise NotImplementedError
+
+    def page_text(self, document, index):
+        raise NotImplementedError
+
+    def metadata(self, document):
+        return '', ''
+
+    def close(self, document):
+        pass
+
+
+class PyPDF2Engine(ExtractionEngine):
+    """Pure Python, always installed; slow and weak on multi-column layouts."""
+
+    name = 'pypdf2'
+
+    def version(self):
+        return PyPDF2.__version__
+
+    def open(self, source):
+        return PyPDF2.PdfReader(source if isinstance(source, str) else BytesIO(source))
+
+    def page_count(self, document):
+        return len(document.pages)
+
+    def page_text(self, document, index):
+        return document.pages[index].extract_text() or ''
+
+    def metadata(self, document):
+        if not document.metadata:
+            return '', ''
+        return document.metadata.get('/Title', ''), document.metadata.get('/Author', '')
+
+
+class PyMuPDFEngine(ExtractionEngine):
+    """MuPDF bindings (pip install pymupdf): much faster, reading order follows text blocks."""
+
+    name = 'pymupdf'
+
+    def is_available(self):
+        return fitz is not None
+
+    def version(self):
+        return fitz.VersionBind
+
+    def open(self, source):
+        return fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype='pdf')
+
+    def page_count(self, document):
+        return document.page_count
+
+    def page_text(self, document, index):
+        return document.load_page(index).get_text('text', sort=True) or ''
+
+    def metadata(self, document):
+        metadata = document.metadata or {}
+        return metadata.get('title', ''), metadata.get('author', '')
+
+    def close(self, document):
+        document.close()
+
+
+class PdfMinerEngine(ExtractionEngine):
+    """pdfminer.six: slowest, but the best column detection of the pure Python options."""
+
+    name = 'pdfminer'
+
+    def is_available(self):
+        return pdfminer_extract_text is not None
+
+    def version(self):
+        return pdfminer.__version__
+
+    def open(self, source):
+        document = {'file': _as_file(source)}
+        parser = PDFParser(document['file'])
+        document['info'] = (PDFDocument(parser).info or [{}])[0]
+        document['page_count'] = sum(1 for _ in PDFPage.get_pages(document['file']))
+        return document
+
+    def page_count(self, document):
+        return document['page_count']
+
+    def page_text(self, document, index):
+        document['file'].seek(0)
+        return pdfminer_extract_text(document['file'], page_numbers=[index]) or ''
+
+    def metadata(self, document):
+        info = document['info']
+
+        def decode(value):
+            value = resolve1(value)
+            if isinstance(value, bytes):
+                encoding = 'utf-16' if value.startswith((b'\xfe\xff', b'\xff\xfe')) else 'latin-1'
+                return value.decode(encoding, errors='ignore')
+            return value if isinstance(value, str) else ''
+        return decode(info.get('Title')), decode(info.get('Author'))
+
+    def close(self, document):
+        document['file'].close()
+
+
+ENGINES = {engine.name: engine for engine in (PyPDF2Engine(), PyMuPDFEngine(), PdfMinerEngine())}
+
+
+def get_engine(name):
+    engine = ENGINES.get(name)
+    if engine is None:
+        raise ValueError(f"Unknown PDF extraction engine: {name}")
+    if not engine.is_available():
+        raise ValueError(f"PDF extraction engine {name} is not installed")
+    return engine
+
+
+def available_engines():
+    return [name for name, engine in ENGINES.items() if engine.is_available()]
@@ -0,0 +1,157 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .extraction import FULL_PROFILE, profile_covers, profile_for_summary_type
+from . import extraction_cache
+from .identifiers import with_version
+from .models import PaperSummary
+from .pdf_store import pdf_store
+from .preprocessing import preprocess_text_with_stats, strip_page_breaks
+from .prompts import fit_to_budget, prompt_budget
+from .sections import QUESTION_SECTIONS, load_sections, select_sections, store_sections
+from .singleflight import flight_lock, single_flight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESCHEDULE_AFTER = 15 * 60
+
+
+def ensure_full_text(paper, parallel=None):
+    """
+    Replace a partially extracted text_content with the whole document and return it.
+
+    Papers ingested for a short or ordinary summary only hold the pages their
+    profile selected; questions and detailed summaries need everything. The text
+    comes from the extraction cache when possible, otherwise from the stored
+    PDF, which is downloaded again only if it was evicted. parallel is passed
+    on to the extraction (False keeps it on the calling thread).
+    """
+    if paper.extraction_profile == FULL_PROFILE:
+        return paper.text_content
+    cached = extraction_cache.lookup(paper.pdf_sha256) if paper.pdf_sha256 else None
+    if cached is not None:
+        return _save_full_text(paper, cached[0], paper.pdf_sha256)
+    path = pdf_store.path(paper.pdf_sha256) if paper.pdf_sha256 else None
+    pdf_sha256 = paper.pdf_sha256
+    if not path:
+        from .views import store_preprint_pdf
+        pdf_sha256 = store_preprint_pdf(paper.repository, with_version(paper.base_id, paper.version))
+        path = pdf_store.path(pdf_sha256)
+    if not path:
+        logger.warning(f"Полный текст недоступен для {paper.file_name}: PDF не загружен, используется частичный текст")
+        return paper.text_content
+    text, _, _, _ = extraction_cache.extract_cached(pdf_sha256, path, parallel=parallel)
+    return _save_full_text(paper, text, pdf_sha256)
+
+
+def _save_full_text(paper, text, pdf_sha256):
+    if text:
+        text = strip_page_breaks(text)
+        PaperSummary.objects.filter(pk=paper.pk).update(text_content=text, extraction_profile=FULL_PROFILE, pdf_sha256=pdf_sha256)
+        paper.text_content = text
+        paper.extraction_profile = FULL_PROFILE
+        paper.pdf_sha256 = pdf_sha256
+        store_sections(paper)
+        logger.info(f"Полный текст извлечен для {paper.file_name}: {len(text)} символов")
+    return paper.text_content
+
+
+def complete_full_text(paper_pk, parallel=None):
+    """ensure_full_text() for one paper, run by one worker at a time; returns None if another is already on it."""
+    with flight_lock(f"fulltext:{paper_pk}") as acquired:
+        if not acquired:
+            return None
+        return ensure_full_text(PaperSummary.objects.get(pk=paper_pk), parallel=parallel)
+
+
+def _complete_in_thread(paper_pk):
+    try:
+        # No process pool inside a web worker; the thread parses page by page.
+        complete_full_text(paper_pk, parallel=False)
+    except Exception:
+        logger.exception(f"Не удалось извлечь полный текст статьи {paper_pk}")
+    finally:
+        connection.close()
+
+
+def _claim_full_extraction(paper):
+    """
+    Mark paper as queued for full extraction; False if it is already complete or queued.
+
+    The conditional UPDATE lets exactly one request per paper schedule the
+    job. A mark older than FULL_TEXT_RESCHEDULE_AFTER is taken for a job that
+    died, so the paper can be scheduled again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'FULL_TEXT_RESCHEDULE_AFTER', DEFAULT_RESCHEDULE_AFTER))
+    claimed = (
+        PaperSummary.objects.filter(pk=paper.pk)
+        .exclude(extraction_profile=FULL_PROFILE)
+        .filter(Q(full_text_requested_at__isnull=True) | Q(full_text_requested_at__lt=stale))
+        .update(full_text_requested_at=now)
+    )
+    if claimed:
+        paper.full_text_requested_at = now
+    return bool(claimed)
+
+
+def schedule_full_extraction(paper):
+    """
+    Extract the rest of a partially extracted paper in the background, once.
+
+    Queues complete_extraction_task when a Celery broker is configured
+    (CELERY_BROKER_URL); otherwise runs it on a thread of this process. The
+    caller never waits for the PDF download or the parse. Returns True if a
+    job was scheduled, False if the text is already complete or queued.
+    """
+    if paper.extraction_profile == FULL_PROFILE or not _claim_full_extraction(paper):
+        return False
+    if getattr(settings, 'CELERY_BROKER_URL', ''):
+        from .tasks import complete_extraction_task
+        complete_extraction_task.delay(paper.pk)
+        return True
+    threading.Thread(target=_complete_in_thread, args=(paper.pk,), name=f'full-extraction-{paper.pk}', daemon=True).start()
+    return True
+
+
+def text_for_summary(paper, summary_type):
+    """
+    Stored text if it covers the profile of summary_type, otherwise the full text.
+
+    The full text is extracted here, on first request; a background
+    extraction of the same paper already running is waited for rather than
+    repeated.
+    """
+    if profile_covers(paper.extraction_profile, profile_for_summary_type(summary_type)):
+        return paper.text_content
+
+    def lookup():
+        return PaperSummary.objects.filter(pk=paper.pk, extraction_profile=FULL_PROFILE).values_list('text_content', flat=True).first()
+
+    text = single_flight(f"fulltext:{paper.pk}", lookup, lambda: ensure_full_text(paper))
+    if text and paper.extraction_profile != FULL_PROFILE:
+        paper.refresh_from_db(fields=['text_content', 'extraction_profile', 'pdf_sha256'])
+    return text
+
+
+def question_context(paper, max_tokens=None):
+    """
+    Text sent with a question: the most informative sections (abstract,
+    conclusion, introduction, ...) within the 'question' prompt budget
+    (LLM_PROMPT_TOKEN_BUDGETS), rather than a blind prefix of the document.
+
+    A partially extracted paper is answered from the text it has; the first
+    question schedules the rest in the background for later ones.
+    """
+    if max_tokens is None:
+        max_tokens = prompt_budget('question')
+    schedule_full_extraction(paper)
+    sections = {kind: preprocess_text_with_stats(text)[0] for kind, text in load_sections(paper, QUESTION_SECTIONS).items()}
+    context = select_sections(sections, QUESTION_SECTIONS, max_tokens)
+    return context or fit_to_budget(paper.text_content, max_tokens)
@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+
+import arxiv
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .ratelimit import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+DOWNLOAD_TIMEOUT = (3.05, 60)
+
+RETRY_METHODS = frozenset(['GET', 'HEAD'])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+# Upper bound on a Retry-After the server asks us to honour.
+MAX_RETRY_DELAY = 30
+
+_session = None
+_arxiv_client = None
+_lock = threading.Lock()
+
+
+def _retry_delay(attempt, response=None):
+    retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+    if retry_after.strip().isdigit():
+        return min(int(retry_after), MAX_RETRY_DELAY)
+    return settings.HTTP_RETRY_BACKOFF * 2 ** attempt
+
+
+class RateLimitedSession(requests.Session):
+    """
+    Session that passes every request through the per-host rate limiter.
+
+    For streamed responses the concurrency slot is held until the response is
+    closed, so the cap covers the whole body transfer. Requests made without a
+    timeout (the arxiv client passes none) get DEFAULT_TIMEOUT.
+
+    GET and HEAD are retried here rather than by urllib3 (HTTP_RETRY_TOTAL,
+    with backoff or the server's Retry-After): the slot is given back while
+    waiting, and every attempt takes a new token, so retries are paced like
+    any other request.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        limiter = rate_limiter.for_url(url)
+        retries = settings.HTTP_RETRY_TOTAL if method.upper() in RETRY_METHODS else 0
+        attempt = 0
+        while True:
+            release = limiter.hold()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                release()
+                if attempt >= retries:
+                    raise
+                delay = _retry_delay(attempt)
+                logger.info(f"HTTP {method} {url}: {e}; retry {attempt + 1}/{retries} in {delay:.1f}s")
+            except BaseException:
+                release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    break
+                delay = _retry_delay(attempt, response)
+                response.close()
+                release()
+                logger.info(f"HTTP {method} {url}: {response.status_code}; retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+        if not kwargs.get('stream'):
+            release()
+            return response
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+        response.close = close_and_release
+        return response
+
+
+def _build_session():
+    session = RateLimitedSession()
+    session.headers.update({'User-Agent': settings.HTTP_USER_AGENT})
+    # Pool sizes are defined in settings only (HTTP_POOL_SIZE, HTTP_HOST_POOL_SIZES).
+    pool_size = settings.HTTP_POOL_SIZE
+    default_adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', default_adapter)
+    session.mount('http://', default_adapter)
+    # Longer prefixes win, so each upstream host gets its own keep-alive pool.
+    for host, size in settings.HTTP_HOST_POOL_SIZES.items():
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        session.mount(f'https://{host}/', adapter)
+        session.mount(f'http://{host}/', adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide pooled requests.Session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+                logger.info("Shared HTTP session created.")
+    return _session
+
+
+def get(url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """GET through the shared session with keep-alive, retries and a default timeout."""
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+class SharedSessionArxivClient(arxiv.Client):
+    """
+    arxiv.Client that sends its API requests through the shared session.
+
+    arxiv.Client has no public way to pass a session: it creates one in
+    __init__ and sends every page request through self._session. This is the
+    only place that relies on that, checked against the arxiv version pinned in
+    requirements.txt; if a release renames the attribute, the client keeps its
+    own session (and the library's pacing) and a warning is logged.
+    """
+
+    def __init__(self, session, **kwargs):
+        super().__init__(**kwargs)
+        if isinstance(getattr(self, '_session', None), requests.Session):
+            self._session = session
+        else:
+            logger.warning("arxiv.Client has no _session; arXiv API requests bypass the shared session and rate limiter.")
+            self.delay_seconds = 3.0
+
+
+def get_arxiv_client():
+    """
+    Return a single long-lived arXiv client that reuses the shared session.
+
+    Retries (HTTP_RETRY_*) and pacing (the export.arxiv.org rate limit)
+    already happen in the session, so the client's own retries and delay are
+    off by default instead of multiplying with them.
+    """
+    global _arxiv_client
+    if _arxiv_client is None:
+        session = get_session()
+        with _lock:
+            if _arxiv_client is None:
+                _arxiv_client = SharedSessionArxivClient(
+                    session,
+                    page_size=getattr(settings, 'ARXIV_PAGE_SIZE', 100),
+                    delay_seconds=getattr(settings, 'ARXIV_DELAY_SECONDS', 0),
+                    num_retries=getattr(settings, 'ARXIV_NUM_RETRIES', 0),
+                )
+    return _arxiv_client
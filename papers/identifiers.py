@@ -0,0 +1,22 @@
+import re
+
+VERSION_RE = re.compile(r'^(?P<base>.+?)v(?P<version>\d+)$')
+
+
+def split_version(paper_id):
+    """Split '2506.08872v2' into ('2506.08872', 2); unversioned IDs give (paper_id, None)."""
+    match = VERSION_RE.match(paper_id)
+    if not match:
+        return paper_id, None
+    return match.group('base'), int(match.group('version'))
+
+
+def with_version(base_id, version):
+    return f"{base_id}v{version}" if version else base_id
+
+
+def parse_file_name(file_name):
+    """Split a PaperSummary.file_name ('repository:paper_id') into (repository, base_id, version)."""
+    repository, paper_id = file_name.split(':', 1) if ':' in file_name else ('arxiv', file_name)
+    base_id, version = split_version(paper_id)
+    return repository, base_id, version
@@ -0,0 +1,65 @@
+import logging
+import threading
+
+import google.generativeai as genai
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gemini-2.0-flash'
+PLACEHOLDER_API_KEY = 'your_dev_api_key_if_needed'
+
+_models = {}
+_lock = threading.Lock()
+_configured = False
+
+
+def _configure():
+    """Configure the Gemini client once, on first use rather than at import."""
+    global _configured
+    if _configured:
+        return True
+    api_key = getattr(settings, 'GEMINI_API_KEY', '')
+    if not api_key or api_key == PLACEHOLDER_API_KEY:
+        logger.warning("GEMINI_API_KEY не установлен.")
+        return False
+    try:
+        genai.configure(api_key=api_key)
+    except Exception as e:
+        logger.error(f"Ошибка конфигурации Gemini API: {e}")
+        return False
+    _configured = True
+    logger.info("Gemini API успешно настроен.")
+    return True
+
+
+def get_model(model_name=None, **generation_config):
+    """
+    Return a GenerativeModel for (model_name, generation_config), shared by the whole process.
+
+    generation_config takes GenerationConfig fields (temperature,
+    max_output_tokens, response_mime_type, ...). Handles are created once and
+    reused, so their API client and its connections are too. Returns None if
+    the API is not configured or the model cannot be created.
+    """
+    model_name = model_name or getattr(settings, 'GEMINI_MODEL', DEFAULT_MODEL)
+    key = (model_name, tuple(sorted(generation_config.items())))
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+        if not _configure():
+            return None
+        try:
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=genai.types.GenerationConfig(**generation_config) if generation_config else None,
+            )
+        except Exception as e:
+            logger.error(f"Не удалось получить модель Gemini '{model_name}': {e}")
+            return None
+        _models[key] = model
+        return model
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import resource
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from papers.extraction_engines import ENGINES, available_engines
+
+
+def _run_engine(engine_name, path):
+    """Runs in a fresh process so peak RSS belongs to this engine and document only."""
+    from papers.extraction_engines import get_engine
+    engine = get_engine(engine_name)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    document = engine.open(path)
+    try:
+        page_count = engine.page_count(document)
+        characters = sum(len(engine.page_text(document, index)) for index in range(page_count))
+    finally:
+        engine.close(document)
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'pages': page_count, 'characters': characters, 'seconds': elapsed, 'peak_kb': peak_kb, 'delta_kb': peak_kb - baseline_kb}
+
+
+class Command(BaseCommand):
+    help = "Run every installed PDF extraction engine over a corpus of PDFs and report pages/s, peak RSS and characters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="PDF files or directories (default: MEDIA_ROOT).")
+        parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), help="Engines to compare (default: all installed).")
+
+    def handle(self, *args, **options):
+        files = self._collect_files(options['paths'] or [settings.MEDIA_ROOT])
+        engines = [name for name in (options['engines'] or available_engines()) if ENGINES[name].is_available()]
+        missing = sorted(set(ENGINES) - set(engines))
+        if missing:
+            self.stdout.write(f"Not installed or not selected: {', '.join(missing)}")
+        if not files:
+            self.stdout.write("No PDF files found.")
+            return
+        totals = {name: {'pages': 0, 'characters': 0, 'seconds': 0.0, 'peak_kb': 0, 'failed': 0} for name in engines}
+        context = multiprocessing.get_context('spawn')
+        for path in files:
+            self.stdout.write(f"{os.path.basename(path)} ({os.path.getsize(path) // 1024} KB):")
+            for name in engines:
+                # maxtasksperchild=1: a fresh interpreter per run, so RSS peaks do not carry over.
+                with context.Pool(processes=1, maxtasksperchild=1) as pool:
+                    try:
+                        result = pool.apply(_run_engine, (name, path))
+                    except Exception as e:
+                        totals[name]['failed'] += 1
+                        self.stdout.write(f"  {name:<10} failed: {e}")
+                        continue
+                total = totals[name]
+                for key in ('pages', 'characters', 'seconds'):
+                    total[key] += result[key]
+                total['peak_kb'] = max(total['peak_kb'], result['peak_kb'])
+                pages_per_second = result['pages'] / result['seconds'] if result['seconds'] else 0.0
+                self.stdout.write(
+                    f"  {name:<10} {result['pages']:5d} pages {pages_per_second:8.1f} pages/s"
+                    f"  peak RSS {result['peak_kb'] / 1024:7.1f} MB (+{result['delta_kb'] / 1024:.1f} MB)"
+                    f"  {result['characters']:9d} chars"
+                )
+        self.stdout.write("Total:")
+        for name, total in totals.items():
+            pages_per_second = total['pages'] / total['seconds'] if total['seconds'] else 0.0
+            self.stdout.write(
+                f"  {name:<10} {total['pages']:5d} pages {pages_per_second:8.1f} pages/s"
+                f"  max peak RSS {total['peak_kb'] / 1024:7.1f} MB  {total['characters']:9d} chars  {total['failed']} failed"
+            )
+
+    def _collect_files(self, paths):
+        files = []
+        for path in paths:
+            path = str(path)
+            if os.path.isdir(path):
+                files.extend(
+                    os.path.join(path, filename) for filename in sorted(os.listdir(path))
+                    if filename.lower().endswith('.pdf')
+                )
+            elif path.lower().endswith('.pdf'):
+                files.append(path)
+        return files
@@ -0,0 +1,65 @@
+import os
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from papers.meta_parser import parse_citation_meta, has_required_metadata
+from papers.views import scrape_chemrxiv_html, scrape_rxiv_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'fixtures', 'landing_pages')
+CHUNK_SIZE = 16 * 1024
+
+
+def _chunks(html):
+    return iter([html[i:i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE)])
+
+
+def _fast_path(html, scrape_fallback):
+    chunks = _chunks(html)
+    metadata, consumed = parse_citation_meta(chunks)
+    if not has_required_metadata(metadata):
+        scraped = scrape_fallback(consumed + ''.join(chunks))
+        metadata.update({key: value for key, value in scraped.items() if not metadata.get(key)})
+    return metadata, len(consumed)
+
+
+def _measure(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = func()
+    elapsed = (time.perf_counter() - started) / iterations
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = "Compare the citation_* meta parser with the full BeautifulSoup scrape on saved landing pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--fixtures', default=FIXTURE_DIR, help="Directory with saved *.html landing pages.")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        fixture_dir = os.path.abspath(options['fixtures'])
+        for filename in sorted(os.listdir(fixture_dir)):
+            if not filename.endswith('.html'):
+                continue
+            with open(os.path.join(fixture_dir, filename), encoding='utf-8') as f:
+                html = f.read()
+            scrape = scrape_chemrxiv_html if filename.startswith('chemrxiv') else scrape_rxiv_html
+
+            soup_result, soup_time, soup_peak = _measure(lambda: scrape(html), iterations)
+            (fast_result, parsed_chars), fast_time, fast_peak = _measure(lambda: _fast_path(html, scrape), iterations)
+
+            same_title = soup_result['title'] == fast_result['title']
+            self.stdout.write(
+                f"{filename} ({len(html) // 1024} KB, fast path read {parsed_chars // 1024} KB):\n"
+                f"  BeautifulSoup: {soup_time * 1000:8.2f} ms, peak {soup_peak / 1024:8.0f} KB\n"
+                f"  meta parser:   {fast_time * 1000:8.2f} ms, peak {fast_peak / 1024:8.0f} KB"
+                f"  ({soup_time / fast_time:.1f}x faster, title {'matches' if same_title else 'differs'})"
+            )
@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from papers.compression import compress_for_summary
+from papers.models import PaperSummary
+from papers.preprocessing import preprocess_text
+from papers.prompts import DEFAULT_PROMPT_BUDGETS
+from papers.tokens import estimate_tokens
+from papers.views import summarize_text_gemini
+
+
+class Command(BaseCommand):
+    help = "Compare Gemini summarization latency on the full text and on the extractively compressed text."
+
+    def summarize_raw(self, text, language, summary_type):
+        """The baseline: one model call on the whole text, without the prompt budget or map-reduce."""
+        budgets = {**getattr(settings, 'LLM_PROMPT_TOKEN_BUDGETS', DEFAULT_PROMPT_BUDGETS), 'summary': None}
+        with override_settings(LLM_PROMPT_TOKEN_BUDGETS=budgets):
+            return summarize_text_gemini(text, language, summary_type, compress=False, map_reduce=False)
+
+    def add_arguments(self, parser):
+        parser.add_argument('papers', nargs='*', help="PaperSummary file names (default: the longest stored papers).")
+        parser.add_argument('--limit', type=int, default=3)
+        parser.add_argument('--summary-types', nargs='+', default=['short', 'ordinary'])
+        parser.add_argument('--language', default='en')
+
+    def handle(self, *args, **options):
+        if options['papers']:
+            papers = list(PaperSummary.objects.filter(file_name__in=options['papers']))
+            if not papers:
+                raise CommandError("No stored papers with these file names.")
+        else:
+            papers = sorted(PaperSummary.objects.all(), key=lambda paper: len(paper.text_content), reverse=True)[:options['limit']]
+        for paper in papers:
+            text = preprocess_text(paper.text_content)
+            self.stdout.write(f"{paper.file_name}: ~{estimate_tokens(text)} tokens after cleanup")
+            for summary_type in options['summary_types']:
+                started = time.monotonic()
+                self.summarize_raw(text, options['language'], summary_type)
+                full_seconds = time.monotonic() - started
+
+                started = time.monotonic()
+                compressed = compress_for_summary(text, summary_type)
+                compress_seconds = time.monotonic() - started
+                summarize_text_gemini(compressed, options['language'], summary_type, compress=False)
+                total_seconds = time.monotonic() - started
+
+                self.stdout.write(
+                    f"  {summary_type:<9} full {full_seconds:6.2f}s | compressed to ~{estimate_tokens(compressed)} tokens: "
+                    f"{total_seconds:6.2f}s (compression {compress_seconds:.2f}s, "
+                    f"{(1 - total_seconds / full_seconds) * 100 if full_seconds else 0:.0f}% faster)"
+                )
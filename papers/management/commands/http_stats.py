@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from papers.ratelimit import rate_limiter
+
+
+class Command(BaseCommand):
+    help = "Show per-host rate limits and the wait-time metrics shared by all workers."
+
+    def handle(self, *args, **options):
+        for host in sorted(rate_limiter.limits):
+            limiter = rate_limiter.for_host(host)
+            state = limiter.shared_stats()
+            requests_count = state.get('requests', 0)
+            avg_wait = state.get('wait_seconds', 0.0) / requests_count if requests_count else 0.0
+            self.stdout.write(
+                f"{host}: rate={limiter.rate:.2f}/s burst={limiter.burst} concurrency={limiter.concurrency} | "
+                f"requests={requests_count} queued={state.get('queued', 0)} "
+                f"avg_wait={avg_wait:.2f}s max_wait={state.get('max_wait_seconds', 0.0):.2f}s"
+            )
@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+import time
+import logging
+
+import arxiv
+from django.core.management.base import BaseCommand, CommandError
+
+from papers import http_client
+from papers.identifiers import split_version
+from papers.metadata_cache import metadata_cache
+from papers.models import PaperSummary
+from papers.sections import store_sections
+from papers.pipeline import DownloadPipeline
+from papers.preprocessing import strip_page_breaks
+from papers.views import arxiv_result_to_data, fetch_paper_data
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """Resumable record of processed IDs, rewritten atomically after every paper."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.failed = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+            self.done = set(state.get('done', []))
+            self.failed = state.get('failed', {})
+
+    def mark_done(self, paper_id):
+        self.done.add(paper_id)
+        self.failed.pop(paper_id, None)
+        self.save()
+
+    def mark_failed(self, paper_id, reason):
+        self.failed[paper_id] = reason
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'done': sorted(self.done), 'failed': self.failed}, f)
+        os.replace(tmp_path, self.path)
+
+
+class Command(BaseCommand):
+    help = "Bulk-ingest papers from a list of IDs (one per line) read from a file or stdin."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', default='-', help="File with paper IDs, or '-' for stdin.")
+        parser.add_argument('--repository', default='arxiv', choices=['arxiv', 'medrxiv', 'biorxiv', 'chemrxiv'])
+        parser.add_argument('--batch-size', type=int, default=50, help="IDs per arXiv metadata query and per pipeline run.")
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent PDF downloads (text extraction runs on a process pool).")
+        parser.add_argument('--checkpoint', default=None, help="Checkpoint file (default: ingest_<repository>.checkpoint.json).")
+
+    def handle(self, *args, **options):
+        repository = options['repository']
+        paper_ids = self._read_ids(options['source'])
+        checkpoint = Checkpoint(options['checkpoint'] or f"ingest_{repository}.checkpoint.json")
+
+        existing = set(
+            PaperSummary.objects.filter(file_name__in=[f"{repository}:{pid}" for pid in paper_ids])
+            .values_list('file_name', flat=True)
+        )
+        pending = [pid for pid in paper_ids if pid not in checkpoint.done and f"{repository}:{pid}" not in existing]
+        skipped = len(paper_ids) - len(pending)
+        self.stdout.write(f"{len(paper_ids)} IDs, {skipped} already ingested, {len(pending)} to process.")
+        if not pending:
+            return
+
+        started = time.monotonic()
+        metadata = self._fetch_metadata(repository, pending, options['batch_size'])
+        metadata_elapsed = time.monotonic() - started
+
+        ingested = failed = 0
+        total_bytes = 0
+        for paper_id in pending:
+            if paper_id not in metadata:
+                checkpoint.mark_failed(paper_id, 'metadata not found')
+                failed += 1
+
+        pipeline = DownloadPipeline(max_concurrency=options['workers'])
+        jobs = [
+            {'repository': repository, 'paper_id': paper_id, 'pdf_url': data['pdf_url']}
+            for paper_id, data in metadata.items()
+        ]
+        batch_size = options['batch_size']
+        for i in range(0, len(jobs), batch_size):
+            for result in pipeline.run_sync(jobs[i:i + batch_size]):
+                paper_id = result['paper_id']
+                error = result['error'] or (None if result['text'] else 'no text extracted')
+                if error:
+                    logger.error(f"Ingestion failed for {repository} ID {paper_id}: {error}")
+                    checkpoint.mark_failed(paper_id, error)
+                    failed += 1
+                    continue
+                data = metadata[paper_id]
+                paper, created = PaperSummary.objects.get_or_create(
+                    file_name=f"{repository}:{paper_id}",
+                    defaults={
+                        'text_content': strip_page_breaks(result['text']),
+                        'title': data.get('title', ''),
+                        'authors': data.get('authors', ''),
+                        'url': data.get('abs_url', ''),
+                        'pdf_sha256': result['pdf_sha256'],
+                    }
+                )
+                if created:
+                    store_sections(paper)
+                checkpoint.mark_done(paper_id)
+                ingested += 1
+                total_bytes += result['size']
+            self.stdout.write(f"[{ingested + failed}/{len(pending)}] queue depths: {pipeline.queue_depths()}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {ingested}, failed {failed}, skipped {skipped} in {elapsed:.1f}s "
+            f"(metadata {metadata_elapsed:.1f}s): "
+            f"{ingested / elapsed:.2f} papers/s, {total_bytes / elapsed / 1_000_000:.2f} MB/s"
+        ))
+
+    def _read_ids(self, source):
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            if not os.path.exists(source):
+                raise CommandError(f"File not found: {source}")
+            with open(source, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        seen = set()
+        paper_ids = []
+        for line in lines:
+            paper_id = line.split('#', 1)[0].strip()
+            if paper_id and paper_id not in seen:
+                seen.add(paper_id)
+                paper_ids.append(paper_id)
+        return paper_ids
+
+    def _fetch_metadata(self, repository, paper_ids, batch_size):
+        """Return {paper_id: data}, querying arXiv with one id_list search per batch."""
+        if repository != 'arxiv':
+            metadata = {}
+            for paper_id in paper_ids:
+                data = fetch_paper_data(repository, paper_id)
+                if data:
+                    metadata[paper_id] = data
+            return metadata
+
+        metadata = {}
+        client = http_client.get_arxiv_client()
+        for i in range(0, len(paper_ids), batch_size):
+            batch = paper_ids[i:i + batch_size]
+            cached = {pid: metadata_cache.get(repository, pid) for pid in batch}
+            metadata.update({pid: data for pid, data in cached.items() if data})
+            to_query = [pid for pid in batch if not cached[pid]]
+            if not to_query:
+                continue
+            by_base_id = {split_version(pid)[0]: pid for pid in to_query}
+            search = arxiv.Search(id_list=to_query, max_results=len(to_query))
+            try:
+                for result in client.results(search):
+                    short_id = result.get_short_id()
+                    paper_id = short_id if short_id in to_query else by_base_id.get(split_version(short_id)[0])
+                    if paper_id is None:
+                        continue
+                    data = arxiv_result_to_data(paper_id, result)
+                    metadata_cache.set(repository, paper_id, data)
+                    metadata[paper_id] = data
+            except Exception as e:
+                logger.error(f"arXiv batch metadata query failed for {len(to_query)} IDs: {e}")
+            self.stdout.write(f"Metadata: {min(i + batch_size, len(paper_ids))}/{len(paper_ids)}")
+        return metadata
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from papers.metadata_cache import metadata_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the paper metadata cache."
+
+    def handle(self, *args, **options):
+        stats = metadata_cache.stats()
+        self.stdout.write("Shared counters (all workers):")
+        for name, value in stats['shared'].items():
+            self.stdout.write(f"  {name}: {value}")
+        self.stdout.write("This process:")
+        for name, value in stats['local'].items():
+            self.stdout.write(f"  {name}: {value}")
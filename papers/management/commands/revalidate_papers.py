@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from papers.revalidation import revalidate_papers
+
+
+class Command(BaseCommand):
+    help = "Check stored papers for newer upstream versions and re-ingest the ones that changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repository', choices=['arxiv', 'medrxiv', 'biorxiv', 'chemrxiv'])
+        parser.add_argument('--min-age-hours', type=float, default=24, help="Skip papers checked more recently than this.")
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help="Only report what changed.")
+
+    def handle(self, *args, **options):
+        counters = revalidate_papers(
+            repository=options['repository'],
+            min_age=timedelta(hours=options['min_age_hours']),
+            limit=options['limit'],
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {counters['checked']}, changed {counters['changed']}, "
+            f"re-ingested {counters['reingested']}, failed {counters['failed']}."
+        ))
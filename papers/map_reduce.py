@@ -0,0 +1,83 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .compression import SENTENCE_RE
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD_TOKENS = 12000
+DEFAULT_CHUNK_TOKENS = 6000
+DEFAULT_WORKERS = 4
+
+
+def map_reduce_settings():
+    from django.conf import settings
+    return (
+        getattr(settings, 'SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS', DEFAULT_THRESHOLD_TOKENS),
+        getattr(settings, 'SUMMARY_MAP_REDUCE_CHUNK_TOKENS', DEFAULT_CHUNK_TOKENS),
+        getattr(settings, 'SUMMARY_MAP_REDUCE_WORKERS', DEFAULT_WORKERS),
+    )
+
+
+def should_map_reduce(text):
+    threshold, _, _ = map_reduce_settings()
+    return bool(threshold) and estimate_tokens(text) > threshold
+
+
+def chunk_text(text, max_tokens):
+    """Split text into chunks of at most max_tokens, at paragraph and then sentence boundaries."""
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+        else:
+            # Every sentence is kept, however short; compression.split_sentences() would drop some.
+            pieces.extend(sentence for sentence in SENTENCE_RE.split(paragraph) if sentence.strip())
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        # Two extra tokens per piece cover the paragraph separator and the rounding of estimate_tokens().
+        tokens = estimate_tokens(piece) + 2
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def map_reduce_summarize(text, summarize_chunk, reduce):
+    """
+    Summarize text chunk by chunk on a thread pool, then combine the partial summaries.
+
+    summarize_chunk(chunk, index, count) returns the summary of one chunk (or
+    None on failure); reduce(partial_summaries) produces the final summary.
+    Returns (summary, timings) with seconds spent in the split, map and
+    reduce phases.
+    """
+    _, chunk_tokens, workers = map_reduce_settings()
+    timings = {}
+    started = time.monotonic()
+    chunks = chunk_text(text, chunk_tokens)
+    timings['split'] = time.monotonic() - started
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks)) or 1, thread_name_prefix='summary-map') as pool:
+        partials = list(pool.map(summarize_chunk, chunks, range(len(chunks)), [len(chunks)] * len(chunks)))
+    timings['map'] = time.monotonic() - started
+    partials = [partial for partial in partials if partial]
+
+    started = time.monotonic()
+    summary = reduce(partials)
+    timings['reduce'] = time.monotonic() - started
+    logger.info(
+        f"Map-reduce summary: {len(chunks)} частей (~{chunk_tokens} токенов), "
+        f"split {timings['split']:.2f}s, map {timings['map']:.2f}s, reduce {timings['reduce']:.2f}s"
+    )
+    return summary, timings
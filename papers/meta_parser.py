@@ -0,0 +1,107 @@
+import re
+from html.parser import HTMLParser
+
+TITLE_KEYS = ('citation_title', 'dc.title', 'og:title')
+AUTHOR_KEYS = ('citation_author', 'dc.creator')
+ABSTRACT_KEYS = ('citation_abstract', 'dc.description')
+# Generic page descriptions: used only without an abstract tag, and often the site's tagline rather than the abstract.
+DESCRIPTION_KEYS = ('description', 'og:description')
+PDF_KEYS = ('citation_pdf_url',)
+
+TAG_RE = re.compile(r'<[^>]+>')
+# Site-wide descriptions of bioRxiv, medRxiv and ChemRxiv pages.
+BOILERPLATE_RE = re.compile(r'preprint server for|cold spring harbor|chemrxiv is a free submission', re.IGNORECASE)
+# A description shorter than this is a tagline or teaser, not an abstract.
+MIN_DESCRIPTION_CHARS = 200
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class CitationMetaParser(HTMLParser):
+    """
+    Incremental parser that collects citation_* (and Dublin Core / OpenGraph) <meta> tags.
+
+    It ignores everything except <meta> and stops at </head> or the first
+    <body> tag, so the rest of a large landing page is never parsed.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.values = {}
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attrs = dict(attrs)
+            key = (attrs.get('name') or attrs.get('property') or '').lower()
+            content = attrs.get('content')
+            if key and content:
+                self.values.setdefault(key, []).append(content.strip())
+        elif tag == 'body':
+            self._finish()
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self._finish()
+
+    def _finish(self):
+        self.done = True
+        raise _StopParsing()
+
+    def first(self, keys):
+        for key in keys:
+            if self.values.get(key):
+                return self.values[key][0]
+        return ''
+
+    def all(self, keys):
+        for key in keys:
+            if self.values.get(key):
+                return self.values[key]
+        return []
+
+    def abstract(self):
+        abstract = TAG_RE.sub('', self.first(ABSTRACT_KEYS)).strip()
+        if abstract:
+            return abstract
+        description = TAG_RE.sub('', self.first(DESCRIPTION_KEYS)).strip()
+        if len(description) < MIN_DESCRIPTION_CHARS or BOILERPLATE_RE.search(description):
+            return ''
+        return description
+
+    def metadata(self):
+        return {
+            'title': self.first(TITLE_KEYS),
+            'authors': ", ".join(self.all(AUTHOR_KEYS)),
+            'abstract': self.abstract(),
+            'pdf_url': self.first(PDF_KEYS),
+        }
+
+
+def parse_citation_meta(chunks):
+    """
+    Feed an iterator of decoded text chunks to CitationMetaParser until the <head> is done.
+
+    Returns (metadata, consumed) where consumed is the text read so far. The
+    iterator is left positioned after the last consumed chunk, so a caller
+    falling back to a full parse can read the rest of the page from it
+    instead of downloading it again.
+    """
+    parser = CitationMetaParser()
+    consumed = []
+    try:
+        for text in chunks:
+            consumed.append(text)
+            parser.feed(text)
+    except _StopParsing:
+        pass
+    return parser.metadata(), ''.join(consumed)
+
+
+def has_required_metadata(metadata):
+    return bool(metadata.get('title') and metadata.get('authors'))
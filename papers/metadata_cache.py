@@ -0,0 +1,311 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+from .ratelimit import RateLimitTimeout
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60 * 60 * 24
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_BACKEND = 'paper_metadata'
+DEFAULT_NOT_FOUND_TTL = 60 * 10
+DEFAULT_ERROR_TTL = 30
+# Counters are added to the shared backend in batches, not on every lookup.
+STATS_FLUSH_EVERY = 100
+STATS_FLUSH_SECONDS = 60
+SHARED_STATS = ('hits', 'backend_hits', 'misses', 'negative_hits')
+# Entries are stored under a generation number (the cache key version); clear() moves to a new one.
+GENERATION_KEY = 'paper_metadata_generation'
+# How often a process re-reads the generation, to notice a clear() made by another process.
+GENERATION_REFRESH_SECONDS = 60
+
+NOT_FOUND = 'not_found'
+TRANSIENT_ERROR = 'transient_error'
+
+
+class TransientFetchError(Exception):
+    """Raised by metadata fetchers when the upstream failed for a retryable reason (timeout, 5xx)."""
+
+
+class MetadataCache:
+    """
+    Two-level cache for paper metadata keyed by (repository, paper_id).
+
+    The first level is an in-process LRU dictionary with a TTL; the second is a
+    persistent Django cache backend shared between workers, so a lookup made by
+    one gunicorn worker is visible to the others and survives restarts.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, backend_alias=DEFAULT_BACKEND,
+                 not_found_ttl=DEFAULT_NOT_FOUND_TTL, error_ttl=DEFAULT_ERROR_TTL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend_alias = backend_alias
+        self.negative_ttls = {NOT_FOUND: not_found_ttl, TRANSIENT_ERROR: error_ttl}
+        self._entries = OrderedDict()
+        self._negative = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'backend_hits': 0, 'misses': 0, 'evictions': 0, 'negative_hits': 0}
+        self._unflushed = dict.fromkeys(SHARED_STATS, 0)
+        self._flushed_at = time.monotonic()
+        self._generation = None
+        self._generation_read_at = 0.0
+
+    @property
+    def backend(self):
+        try:
+            return caches[self.backend_alias]
+        except InvalidCacheBackendError:
+            return None
+
+    @staticmethod
+    def make_key(repository, paper_id):
+        return f"paper_metadata:{repository}:{paper_id}"
+
+    @staticmethod
+    def make_negative_key(repository, paper_id):
+        return f"paper_metadata_negative:{repository}:{paper_id}"
+
+    def _version(self, backend):
+        """Current generation of the shared entries, re-read from the backend every GENERATION_REFRESH_SECONDS."""
+        now = time.monotonic()
+        with self._lock:
+            if self._generation is not None and now - self._generation_read_at < GENERATION_REFRESH_SECONDS:
+                return self._generation
+        try:
+            generation = backend.get(GENERATION_KEY, 1)
+        except Exception as e:
+            logger.warning(f"Metadata cache generation read failed: {e}")
+            generation = self._generation or 1
+        with self._lock:
+            self._generation = generation
+            self._generation_read_at = now
+        return generation
+
+    def negative_reason(self, repository, paper_id):
+        """Return NOT_FOUND or TRANSIENT_ERROR if a recent lookup failed, otherwise None."""
+        key = self.make_negative_key(repository, paper_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._negative.get(key)
+            if entry is not None:
+                expires_at, reason = entry
+                if expires_at > now:
+                    return reason
+                del self._negative[key]
+        backend = self.backend
+        if backend is not None:
+            try:
+                reason = backend.get(key, version=self._version(backend))
+            except Exception as e:
+                logger.warning(f"Metadata cache backend read failed for {key}: {e}")
+                reason = None
+            if reason in self.negative_ttls:
+                with self._lock:
+                    self._negative[key] = (now + self.negative_ttls[reason], reason)
+                return reason
+        return None
+
+    def set_negative(self, repository, paper_id, reason):
+        ttl = self.negative_ttls[reason]
+        if not ttl:
+            return
+        key = self.make_negative_key(repository, paper_id)
+        with self._lock:
+            self._negative[key] = (time.monotonic() + ttl, reason)
+            if len(self._negative) > self.max_entries:
+                now = time.monotonic()
+                self._negative = {k: v for k, v in self._negative.items() if v[0] > now}
+        backend = self.backend
+        if backend is not None:
+            try:
+                backend.set(key, reason, timeout=ttl, version=self._version(backend))
+            except Exception as e:
+                logger.warning(f"Metadata cache backend write failed for {key}: {e}")
+
+    def get(self, repository, paper_id):
+        """Return cached metadata or None if absent or expired."""
+        key = self.make_key(repository, paper_id)
+        now = time.monotonic()
+        data = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                else:
+                    del self._entries[key]
+                    data = None
+        if data is not None:
+            self._count('hits')
+            return data
+        backend = self.backend
+        if backend is not None:
+            try:
+                data = backend.get(key, version=self._version(backend))
+            except Exception as e:
+                logger.warning(f"Metadata cache backend read failed for {key}: {e}")
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                self._count('backend_hits')
+                return data
+        self._count('misses')
+        return None
+
+    def set(self, repository, paper_id, data):
+        key = self.make_key(repository, paper_id)
+        self._remember(key, data)
+        backend = self.backend
+        if backend is not None:
+            try:
+                backend.set(key, data, timeout=self.ttl, version=self._version(backend))
+            except Exception as e:
+                logger.warning(f"Metadata cache backend write failed for {key}: {e}")
+
+    def get_or_fetch(self, repository, paper_id, fetch):
+        """
+        Return cached metadata, calling fetch(repository, paper_id) on a miss.
+
+        IDs that recently failed are answered with None from the negative cache
+        without calling fetch. fetch returns None for unknown IDs and raises
+        TransientFetchError for retryable failures; the two are remembered with
+        separate TTLs, except a RateLimitTimeout of the local limiter, which is
+        not remembered. Any other exception is a bug, not an answer about the
+        ID: it is logged and None returned without caching anything.
+        """
+        data = self.get(repository, paper_id)
+        if data is not None:
+            return data
+        reason = self.negative_reason(repository, paper_id)
+        if reason is not None:
+            self._count('negative_hits')
+            logger.info(f"Negative cache hit ({reason}) for {repository} ID {paper_id}")
+            return None
+        try:
+            data = fetch(repository, paper_id)
+        except TransientFetchError as e:
+            logger.warning(f"Transient metadata fetch failure for {repository} ID {paper_id}: {e}")
+            # Running out of time in our own rate limiter says nothing about the upstream.
+            if not isinstance(e.__cause__, RateLimitTimeout):
+                self.set_negative(repository, paper_id, TRANSIENT_ERROR)
+            return None
+        except Exception:
+            logger.exception(f"Unexpected error fetching metadata for {repository} ID {paper_id}")
+            return None
+        if data:
+            self.set(repository, paper_id, data)
+        else:
+            self.set_negative(repository, paper_id, NOT_FOUND)
+        return data
+
+    def invalidate(self, repository, paper_id):
+        key = self.make_key(repository, paper_id)
+        negative_key = self.make_negative_key(repository, paper_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._negative.pop(negative_key, None)
+        backend = self.backend
+        if backend is not None:
+            backend.delete_many([key, negative_key], version=self._version(backend))
+
+    def clear(self):
+        """
+        Drop every entry, in this process and in the shared backend.
+
+        Shared entries are not deleted one by one: the cache moves to a new
+        generation and the old entries expire with their TTL. Nothing else
+        stored in the backend (such as the shared counters) is touched. Other
+        processes switch within GENERATION_REFRESH_SECONDS, but keep what their
+        in-process level already holds.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._negative.clear()
+        backend = self.backend
+        if backend is None:
+            return
+        try:
+            generation = 2 if backend.add(GENERATION_KEY, 2, timeout=None) else backend.incr(GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"Metadata cache clear failed: {e}")
+            return
+        with self._lock:
+            self._generation = generation
+            self._generation_read_at = time.monotonic()
+
+    def stats(self):
+        """
+        Return per-process counters plus the shared counters from the backend.
+
+        The shared counters include what this process has counted so far but
+        lag other processes by up to STATS_FLUSH_EVERY lookups or
+        STATS_FLUSH_SECONDS each; they are approximate, since concurrent
+        flushes from several workers can lose an increment.
+        """
+        self.flush_stats()
+        with self._lock:
+            local = dict(self._stats, size=len(self._entries), max_entries=self.max_entries)
+        shared = {}
+        backend = self.backend
+        if backend is not None:
+            try:
+                shared = {name: backend.get(f"paper_metadata_stats:{name}", 0) for name in SHARED_STATS}
+            except Exception as e:
+                logger.warning(f"Metadata cache stats read failed: {e}")
+        lookups = local['hits'] + local['backend_hits'] + local['misses']
+        local['hit_ratio'] = (local['hits'] + local['backend_hits']) / lookups if lookups else 0.0
+        return {'local': local, 'shared': shared}
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _count(self, name):
+        """Count a lookup in memory; a lookup costs no backend I/O beyond its own."""
+        with self._lock:
+            self._stats[name] += 1
+            self._unflushed[name] += 1
+            due = (
+                sum(self._unflushed.values()) >= STATS_FLUSH_EVERY
+                or time.monotonic() - self._flushed_at >= STATS_FLUSH_SECONDS
+            )
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add the counts gathered since the last flush to the shared counters in the backend."""
+        with self._lock:
+            pending = {name: count for name, count in self._unflushed.items() if count}
+            self._unflushed = dict.fromkeys(SHARED_STATS, 0)
+            self._flushed_at = time.monotonic()
+        backend = self.backend
+        if backend is None or not pending:
+            return
+        for name, count in pending.items():
+            stat_key = f"paper_metadata_stats:{name}"
+            try:
+                if not backend.add(stat_key, count, timeout=None):
+                    backend.incr(stat_key, count)
+            except Exception as e:
+                logger.warning(f"Metadata cache stats flush failed for {stat_key}: {e}")
+
+
+metadata_cache = MetadataCache(
+    ttl=getattr(settings, 'PAPER_METADATA_CACHE_TTL', DEFAULT_TTL),
+    max_entries=getattr(settings, 'PAPER_METADATA_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+    backend_alias=getattr(settings, 'PAPER_METADATA_CACHE_BACKEND', DEFAULT_BACKEND),
+    not_found_ttl=getattr(settings, 'PAPER_METADATA_NOT_FOUND_TTL', DEFAULT_NOT_FOUND_TTL),
+    error_ttl=getattr(settings, 'PAPER_METADATA_ERROR_TTL', DEFAULT_ERROR_TTL),
+)
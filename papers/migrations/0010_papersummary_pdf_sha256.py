@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0009_remove_papersummary_pdf_download_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papersummary',
+            name='pdf_sha256',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 оригинального PDF в локальном хранилище.', max_length=64, null=True),
+        ),
+    ]
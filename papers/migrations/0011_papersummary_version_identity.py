@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+def fill_identity(apps, schema_editor):
+    from papers.identifiers import parse_file_name
+
+    PaperSummary = apps.get_model('papers', 'PaperSummary')
+    for paper in PaperSummary.objects.all().only('pk', 'file_name'):
+        repository, base_id, version = parse_file_name(paper.file_name)
+        PaperSummary.objects.filter(pk=paper.pk).update(repository=repository, base_id=base_id, version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0010_papersummary_pdf_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papersummary',
+            name='repository',
+            field=models.CharField(blank=True, default='', help_text='Репозиторий статьи (arxiv, medrxiv, biorxiv, chemrxiv).', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='papersummary',
+            name='base_id',
+            field=models.CharField(blank=True, default='', help_text='ID статьи в репозитории без номера версии.', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='papersummary',
+            name='version',
+            field=models.PositiveIntegerField(blank=True, help_text='Номер версии статьи, из которой извлечен текст (если известен).', null=True),
+        ),
+        migrations.AddField(
+            model_name='papersummary',
+            name='etag',
+            field=models.CharField(blank=True, default='', help_text='ETag оригинала при последней проверке.', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='papersummary',
+            name='last_modified',
+            field=models.CharField(blank=True, default='', help_text='Заголовок Last-Modified оригинала при последней проверке.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='papersummary',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, help_text='Время последней проверки на наличие новой версии.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='papersummary',
+            index=models.Index(fields=['repository', 'base_id'], name='papers_paper_repo_base_idx'),
+        ),
+        migrations.RunPython(fill_identity, migrations.RunPython.noop),
+    ]
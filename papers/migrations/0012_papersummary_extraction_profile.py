@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0011_papersummary_version_identity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papersummary',
+            name='extraction_profile',
+            field=models.CharField(default='full', help_text='Профиль извлечения текста (full — весь документ; иначе только часть страниц).', max_length=20),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0012_papersummary_extraction_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pdf_sha256', models.CharField(help_text='SHA-256 PDF, из которого извлечен текст.', max_length=64)),
+                ('extractor_version', models.CharField(help_text='Версия экстрактора (движки и их версии); при смене версии текст извлекается заново.', max_length=100)),
+                ('profile', models.CharField(default='full', help_text='Профиль извлечения (какие страницы извлечены).', max_length=20)),
+                ('text_zlib', models.BinaryField(help_text='Извлеченный текст, сжатый zlib.')),
+                ('text_length', models.PositiveIntegerField(default=0, help_text='Длина извлеченного текста в символах.')),
+                ('title', models.TextField(blank=True, default='', help_text='Название из метаданных PDF.')),
+                ('authors', models.TextField(blank=True, default='', help_text='Авторы из метаданных PDF.')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Временная метка извлечения.')),
+            ],
+            options={
+                'verbose_name': 'Извлеченный текст PDF',
+                'verbose_name_plural': 'Извлеченные тексты PDF',
+                'unique_together': {('pdf_sha256', 'extractor_version', 'profile')},
+            },
+        ),
+    ]
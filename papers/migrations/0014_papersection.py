@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0013_extractedtext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaperSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(help_text='Порядковый номер раздела в тексте.')),
+                ('kind', models.CharField(choices=[('front', 'Титульная часть'), ('abstract', 'Аннотация'), ('introduction', 'Введение'), ('methods', 'Методы'), ('results', 'Результаты'), ('conclusion', 'Заключение'), ('references', 'Список литературы'), ('appendix', 'Приложение')], help_text='Тип раздела.', max_length=20)),
+                ('heading', models.CharField(blank=True, default='', help_text='Заголовок раздела, как он найден в тексте.', max_length=255)),
+                ('start_offset', models.PositiveIntegerField(help_text='Смещение начала раздела в text_content (символы).')),
+                ('end_offset', models.PositiveIntegerField(help_text='Смещение конца раздела в text_content (символы, не включая).')),
+                ('text', models.TextField(help_text='Текст раздела.')),
+                ('paper_summary', models.ForeignKey(help_text='Статья, к которой относится раздел.', on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='papers.papersummary')),
+            ],
+            options={
+                'verbose_name': 'Раздел статьи',
+                'verbose_name_plural': 'Разделы статей',
+                'ordering': ['paper_summary', 'order'],
+                'unique_together': {('paper_summary', 'order')},
+                'indexes': [models.Index(fields=['paper_summary', 'kind'], name='papers_section_paper_kind_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0014_papersection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papersummary',
+            name='token_count',
+            field=models.PositiveIntegerField(blank=True, help_text='Оценка числа токенов в text_content.', null=True),
+        ),
+        migrations.AddField(
+            model_name='papersection',
+            name='token_count',
+            field=models.PositiveIntegerField(default=0, help_text='Оценка числа токенов в разделе.'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0015_token_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localizedpapersummary',
+            name='derived_from',
+            field=models.ForeignKey(blank=True, help_text='Summary на другом языке, переводом которого получен этот (пусто, если написан по тексту статьи).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='translations', to='papers.localizedpapersummary'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0016_localizedpapersummary_derived_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Ключ запроса, например summary:<pk>:<язык>:<тип>.', max_length=255, unique=True)),
+                ('owner', models.CharField(help_text='Идентификатор процесса, выполняющего генерацию.', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Временная метка захвата блокировки.')),
+                ('expires_at', models.DateTimeField(help_text='После этого времени блокировка считается брошенной и может быть захвачена заново.')),
+            ],
+            options={
+                'verbose_name': 'Блокировка генерации',
+                'verbose_name_plural': 'Блокировки генерации',
+            },
+        ),
+    ]
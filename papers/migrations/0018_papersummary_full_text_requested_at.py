@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0017_generationlock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papersummary',
+            name='full_text_requested_at',
+            field=models.DateTimeField(blank=True, help_text='Время постановки фонового извлечения полного текста в очередь.', null=True),
+        ),
+    ]
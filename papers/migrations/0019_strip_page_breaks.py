@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 19:30
+
+from django.db import migrations
+
+
+def strip_page_breaks(apps, schema_editor):
+    """Drop page break markers stored before papers.preprocessing.strip_page_breaks; sections are rebuilt on next use."""
+    PaperSummary = apps.get_model('papers', 'PaperSummary')
+    PaperSection = apps.get_model('papers', 'PaperSection')
+    for paper in PaperSummary.objects.filter(text_content__contains='\f').only('pk', 'text_content'):
+        paper.text_content = paper.text_content.replace('\n\f\n', '\n').replace('\f', '\n')
+        paper.save(update_fields=['text_content'])
+        PaperSection.objects.filter(paper_summary_id=paper.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0018_papersummary_full_text_requested_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_page_breaks, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from .identifiers import parse_file_name
 
 class PaperSummary(models.Model):
     """
@@ -32,14 +33,80 @@ class PaperSummary(models.Model):
         null=True,
         help_text=_("URL оригинальной статьи (например, ссылка на ArXiv).")
     )
+    pdf_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text=_("SHA-256 оригинального PDF в локальном хранилище.")
+    )
+    repository = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        help_text=_("Репозиторий статьи (arxiv, medrxiv, biorxiv, chemrxiv).")
+    )
+    base_id = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text=_("ID статьи в репозитории без номера версии.")
+    )
+    version = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text=_("Номер версии статьи, из которой извлечен текст (если известен).")
+    )
+    etag = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text=_("ETag оригинала при последней проверке.")
+    )
+    last_modified = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text=_("Заголовок Last-Modified оригинала при последней проверке.")
+    )
+    last_checked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text=_("Время последней проверки на наличие новой версии.")
+    )
+    extraction_profile = models.CharField(
+        max_length=20,
+        default='full',
+        help_text=_("Профиль извлечения текста (full — весь документ; иначе только часть страниц).")
+    )
+    full_text_requested_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text=_("Время постановки фонового извлечения полного текста в очередь.")
+    )
+    token_count = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text=_("Оценка числа токенов в text_content.")
+    )
 
     def __str__(self):
         return self.file_name
 
+    def save(self, *args, **kwargs):
+        if not self.base_id:
+            self.repository, self.base_id, version = parse_file_name(self.file_name)
+            if self.version is None:
+                self.version = version
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = _("Summary статьи")
         verbose_name_plural = _("Summaries статей")
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['repository', 'base_id'], name='papers_paper_repo_base_idx'),
+        ]
 
 class LocalizedPaperSummary(models.Model):
     """
@@ -68,6 +135,14 @@ class LocalizedPaperSummary(models.Model):
         default='ordinary',
         help_text=_("Тип summary (короткий, стандартный или подробный).")
     )
+    derived_from = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='translations',
+        help_text=_("Summary на другом языке, переводом которого получен этот (пусто, если написан по тексту статьи).")
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         help_text=_("Временная метка создания summary.")
@@ -86,6 +161,65 @@ class LocalizedPaperSummary(models.Model):
     def __str__(self):
         return f"{self.get_summary_type_display()} summary для {self.paper_summary.file_name} на {self.language}"
 
+class PaperSection(models.Model):
+    """
+    Модель для хранения разделов извлеченного текста статьи (аннотация, введение, методы и т.д.).
+    """
+    paper_summary = models.ForeignKey(
+        PaperSummary,
+        on_delete=models.CASCADE,
+        related_name='sections',
+        help_text=_("Статья, к которой относится раздел.")
+    )
+    order = models.PositiveIntegerField(
+        help_text=_("Порядковый номер раздела в тексте.")
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=[
+            ('front', _('Титульная часть')),
+            ('abstract', _('Аннотация')),
+            ('introduction', _('Введение')),
+            ('methods', _('Методы')),
+            ('results', _('Результаты')),
+            ('conclusion', _('Заключение')),
+            ('references', _('Список литературы')),
+            ('appendix', _('Приложение')),
+        ],
+        help_text=_("Тип раздела.")
+    )
+    heading = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text=_("Заголовок раздела, как он найден в тексте.")
+    )
+    start_offset = models.PositiveIntegerField(
+        help_text=_("Смещение начала раздела в text_content (символы).")
+    )
+    end_offset = models.PositiveIntegerField(
+        help_text=_("Смещение конца раздела в text_content (символы, не включая).")
+    )
+    text = models.TextField(
+        help_text=_("Текст раздела.")
+    )
+    token_count = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Оценка числа токенов в разделе.")
+    )
+
+    class Meta:
+        unique_together = ('paper_summary', 'order')
+        verbose_name = _("Раздел статьи")
+        verbose_name_plural = _("Разделы статей")
+        ordering = ['paper_summary', 'order']
+        indexes = [
+            models.Index(fields=['paper_summary', 'kind'], name='papers_section_paper_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.paper_summary.file_name}, {self.start_offset}-{self.end_offset})"
+
 class QuestionAnswer(models.Model):
     """
     Модель для хранения вопросов и ответов, связанных со статьей.
@@ -122,4 +256,79 @@ class QuestionAnswer(models.Model):
         ordering = ['answered_at']
 
     def __str__(self):
-        return f"В: {self.question[:70]}... (для {self.paper_summary.file_name})"
\ No newline at end of file
+        return f"В: {self.question[:70]}... (для {self.paper_summary.file_name})"
+
+class ExtractedText(models.Model):
+    """
+    Кэш результатов извлечения текста, по SHA-256 PDF и версии экстрактора.
+    """
+    pdf_sha256 = models.CharField(
+        max_length=64,
+        help_text=_("SHA-256 PDF, из которого извлечен текст.")
+    )
+    extractor_version = models.CharField(
+        max_length=100,
+        help_text=_("Версия экстрактора (движки и их версии); при смене версии текст извлекается заново.")
+    )
+    profile = models.CharField(
+        max_length=20,
+        default='full',
+        help_text=_("Профиль извлечения (какие страницы извлечены).")
+    )
+    text_zlib = models.BinaryField(
+        help_text=_("Извлеченный текст, сжатый zlib.")
+    )
+    text_length = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Длина извлеченного текста в символах.")
+    )
+    title = models.TextField(
+        blank=True,
+        default='',
+        help_text=_("Название из метаданных PDF.")
+    )
+    authors = models.TextField(
+        blank=True,
+        default='',
+        help_text=_("Авторы из метаданных PDF.")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text=_("Временная метка извлечения.")
+    )
+
+    class Meta:
+        unique_together = ('pdf_sha256', 'extractor_version', 'profile')
+        verbose_name = _("Извлеченный текст PDF")
+        verbose_name_plural = _("Извлеченные тексты PDF")
+
+    def __str__(self):
+        return f"{self.pdf_sha256[:12]} ({self.profile}, {self.extractor_version})"
+
+class GenerationLock(models.Model):
+    """
+    Блокировка генерации ответа модели: одна строка на выполняемый запрос (см. papers.singleflight).
+    """
+    key = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text=_("Ключ запроса, например summary:<pk>:<язык>:<тип>.")
+    )
+    owner = models.CharField(
+        max_length=64,
+        help_text=_("Идентификатор процесса, выполняющего генерацию.")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text=_("Временная метка захвата блокировки.")
+    )
+    expires_at = models.DateTimeField(
+        help_text=_("После этого времени блокировка считается брошенной и может быть захвачена заново.")
+    )
+
+    class Meta:
+        verbose_name = _("Блокировка генерации")
+        verbose_name_plural = _("Блокировки генерации")
+
+    def __str__(self):
+        return f"{self.key} ({self.owner})"
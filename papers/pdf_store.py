@@ -0,0 +1,201 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+EVICTION_CHECK_EVERY = 20
+
+
+class PdfStore:
+    """
+    Content-addressed store of original PDFs, keyed by the SHA-256 of their bytes.
+
+    Blobs live in sharded directories (ab/cd/abcd....pdf) and are written to a
+    temporary file first and renamed into place, so concurrent writers of the
+    same paper never see a partial file. Reads touch the blob's mtime and the
+    least recently used blobs are evicted once the store exceeds max_bytes.
+    Aliases (paper ID -> blob) are small files under aliases/, so no cache
+    clear or culling can make a stored PDF unreachable by its ID.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}.pdf")
+
+    def path(self, sha256):
+        """Return the blob path if it is present (and mark it as recently used), else None."""
+        if not sha256:
+            return None
+        blob_path = self.path_for(sha256)
+        try:
+            os.utime(blob_path)
+        except OSError:
+            return None
+        return blob_path
+
+    def exists(self, sha256):
+        return bool(sha256) and os.path.exists(self.path_for(sha256))
+
+    def put_bytes(self, data):
+        return self.put_stream([data])[0]
+
+    def put_stream(self, chunks):
+        """Write an iterable of byte chunks into the store; return (sha256, size)."""
+        writer = self.writer()
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def writer(self):
+        """Return a BlobWriter for callers that produce the PDF incrementally (e.g. while streaming it)."""
+        return BlobWriter(self)
+
+    def remember_alias(self, alias, sha256):
+        """Map an external name such as 'arxiv:2506.08872' to a blob, for papers without a PaperSummary."""
+        alias_path = self._alias_path(alias)
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(alias_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(sha256)
+            os.replace(tmp_path, alias_path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить alias {alias} -> {sha256}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def lookup_alias(self, alias):
+        """Return the SHA-256 remembered for alias, or None. The blob itself may have been evicted since."""
+        try:
+            with open(self._alias_path(alias), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _alias_path(self, alias):
+        digest = hashlib.sha256(alias.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, 'aliases', digest[:2], f"{digest}.alias")
+
+    def total_size(self):
+        return sum(size for _, size, _ in self._blobs())
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used blobs until the store fits in max_bytes."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        blobs = sorted(self._blobs(), key=lambda blob: blob[2])
+        total = sum(size for _, size, _ in blobs)
+        removed = 0
+        for blob_path, size, _ in blobs:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(blob_path)
+                total -= size
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Не удалось удалить PDF из хранилища {blob_path}: {e}")
+        if removed:
+            logger.info(f"Из хранилища PDF удалено {removed} файлов, размер {total} байт")
+        return removed
+
+    def _maybe_evict(self):
+        with self._lock:
+            self._puts += 1
+            if self._puts % EVICTION_CHECK_EVERY != 1:
+                return
+        self.evict()
+
+    def _blobs(self):
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if os.path.basename(dirpath) == 'tmp':
+                self._clean_stale_parts(dirpath, filenames)
+                continue
+            if dirpath == os.path.join(self.root, 'aliases'):
+                dirnames[:] = []
+                continue
+            for filename in filenames:
+                if filename.endswith('.pdf'):
+                    blob_path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(blob_path)
+                    except OSError:
+                        continue
+                    yield blob_path, stat.st_size, stat.st_mtime
+
+    def _clean_stale_parts(self, dirpath, filenames, max_age=60 * 60):
+        now = time.time()
+        for filename in filenames:
+            part_path = os.path.join(dirpath, filename)
+            try:
+                if now - os.path.getmtime(part_path) > max_age:
+                    os.remove(part_path)
+            except OSError:
+                pass
+
+
+class BlobWriter:
+    """Incremental writer into a PdfStore: hashes while writing and renames into place on commit."""
+
+    def __init__(self, store):
+        self.store = store
+        tmp_dir = os.path.join(store.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        if chunk:
+            self._digest.update(chunk)
+            self._file.write(chunk)
+            self.size += len(chunk)
+
+    def commit(self):
+        try:
+            self._file.close()
+            sha256 = self._digest.hexdigest()
+            blob_path = self.store.path_for(sha256)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(self.tmp_path, blob_path)
+        except BaseException:
+            self.abort()
+            raise
+        logger.info(f"PDF сохранен в хранилище: {sha256} ({self.size} байт)")
+        self.store._maybe_evict()
+        return sha256, self.size
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+pdf_store = PdfStore(
+    root=getattr(settings, 'PDF_STORE_ROOT', os.path.join(settings.BASE_DIR, 'pdf_store')),
+    max_bytes=getattr(settings, 'PDF_STORE_MAX_BYTES', DEFAULT_MAX_BYTES),
+)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+
+from . import extraction_cache, http_client
+from .extraction import FULL_PROFILE, extract_text_and_metadata_from_pdf
+from .pdf_store import pdf_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_PER_HOST_CONCURRENCY = 4
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _download_to_store(url):
+    """Stream the PDF into the PDF store chunk by chunk; returns (sha256, size)."""
+    with http_client.get(url, stream=True, timeout=http_client.DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        return pdf_store.put_stream(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+
+
+def _in_io_thread(func, *args):
+    """Run an ORM call on a pool thread and close the connection it opened there."""
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+class DownloadPipeline:
+    """
+    Asyncio pipeline that downloads PDFs concurrently and extracts their text on a process pool.
+
+    Jobs are dicts with 'repository', 'paper_id', 'pdf_url' and optionally an
+    extraction 'profile' (any other keys are passed through). Downloads are bounded by a global semaphore and a
+    per-host semaphore. Downloads are streamed into the PDF store and the
+    extraction pool reads the stored file, so no PDF is held in memory whole
+    (nor pickled to a worker), and network waits of one paper overlap with
+    parsing of another. Each result is the job dict extended with 'text',
+    'title', 'authors', 'size', 'pdf_sha256', 'profile' and 'error'. PDFs
+    extracted before (same SHA-256) are served from the extraction cache. Results are returned once the whole batch is done, so callers
+    can touch the ORM outside the event loop.
+    """
+
+    def __init__(self, max_concurrency=None, per_host_concurrency=None, extract_workers=None, report_interval=5.0):
+        self.max_concurrency = max_concurrency or getattr(settings, 'PIPELINE_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)
+        self.per_host_concurrency = per_host_concurrency or getattr(settings, 'PIPELINE_PER_HOST_CONCURRENCY', DEFAULT_PER_HOST_CONCURRENCY)
+        self.extract_workers = extract_workers or getattr(settings, 'PIPELINE_EXTRACT_WORKERS', None) or multiprocessing.cpu_count()
+        self.report_interval = report_interval
+        self.stats = {
+            'download_queue': 0,
+            'downloading': 0,
+            'extract_queue': 0,
+            'extracting': 0,
+            'completed': 0,
+            'cached': 0,
+            'failed': 0,
+            'bytes': 0,
+        }
+
+    def queue_depths(self):
+        return dict(self.stats)
+
+    async def run(self, jobs):
+        loop = asyncio.get_running_loop()
+        download_semaphore = asyncio.Semaphore(self.max_concurrency)
+        host_semaphores = defaultdict(lambda: asyncio.Semaphore(self.per_host_concurrency))
+        extract_semaphore = asyncio.Semaphore(self.extract_workers)
+        reporter = asyncio.create_task(self._report())
+        io_pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='pdf-download')
+        cpu_pool = self._make_cpu_pool()
+        try:
+            tasks = [
+                self._process(loop, job, download_semaphore, host_semaphores, extract_semaphore, io_pool, cpu_pool)
+                for job in jobs
+            ]
+            return await asyncio.gather(*tasks)
+        finally:
+            reporter.cancel()
+            io_pool.shutdown(wait=False)
+            cpu_pool.shutdown(wait=True)
+            logger.info(f"Pipeline finished: {self.queue_depths()}")
+
+    def run_sync(self, jobs):
+        return asyncio.run(self.run(jobs))
+
+    def _make_cpu_pool(self):
+        # Celery prefork workers are daemonic and may not start child processes.
+        if multiprocessing.current_process().daemon:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-extract')
+        return ProcessPoolExecutor(max_workers=self.extract_workers)
+
+    async def _process(self, loop, job, download_semaphore, host_semaphores, extract_semaphore, io_pool, cpu_pool):
+        profile = job.get('profile', FULL_PROFILE)
+        result = dict(job, text='', title='', authors='', size=0, pdf_sha256=None, profile=profile, error=None)
+        try:
+            # A malformed job fails alone instead of raising out of gather() and aborting the batch.
+            host = urlsplit(job['pdf_url']).hostname or ''
+            self.stats['download_queue'] += 1
+            async with host_semaphores[host], download_semaphore:
+                self.stats['download_queue'] -= 1
+                self.stats['downloading'] += 1
+                try:
+                    started = time.monotonic()
+                    pdf_sha256, size = await loop.run_in_executor(io_pool, _download_to_store, job['pdf_url'])
+                    logger.debug(f"Downloaded {job['paper_id']} ({size} bytes) in {time.monotonic() - started:.2f}s")
+                finally:
+                    self.stats['downloading'] -= 1
+            result['size'] = size
+            self.stats['bytes'] += size
+            result['pdf_sha256'] = pdf_sha256
+            cached = await loop.run_in_executor(io_pool, _in_io_thread, extraction_cache.lookup, result['pdf_sha256'], profile)
+            if cached is not None:
+                text, title, authors, cached_profile = cached
+                result.update(text=text, title=title, authors=authors, profile=cached_profile)
+                self.stats['cached'] += 1
+                self.stats['completed'] += 1
+                return result
+
+            self.stats['extract_queue'] += 1
+            async with extract_semaphore:
+                self.stats['extract_queue'] -= 1
+                self.stats['extracting'] += 1
+                try:
+                    # Documents are already extracted in parallel here, so no nested per-page pool.
+                    text, title, authors = await loop.run_in_executor(
+                        cpu_pool, partial(extract_text_and_metadata_from_pdf, parallel=False, profile=profile), pdf_store.path_for(pdf_sha256),
+                    )
+                finally:
+                    self.stats['extracting'] -= 1
+            if text:
+                await loop.run_in_executor(io_pool, _in_io_thread, extraction_cache.store, result['pdf_sha256'], profile, text, title, authors)
+            result.update(text=text, title=title, authors=authors)
+            self.stats['completed'] += 1
+        except Exception as e:
+            logger.error(f"Pipeline failed for {job.get('repository')} ID {job.get('paper_id')}: {e}")
+            result['error'] = str(e)
+            self.stats['failed'] += 1
+        return result
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info(f"Pipeline queue depths: {self.queue_depths()}")
+
+
+def download_and_extract(jobs, **kwargs):
+    """Run the pipeline from synchronous code (views, Celery tasks, management commands)."""
+    return DownloadPipeline(**kwargs).run_sync(jobs)
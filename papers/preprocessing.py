@@ -0,0 +1,129 @@
+import logging
+import re
+from collections import Counter
+
+from .extraction import PAGE_BREAK, PAGE_SEPARATOR
+from .sections import REFERENCES, segment_text
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# A line repeated at the top or bottom of this many pages is a running header or footer.
+MIN_HEADER_REPEATS = 3
+MIN_HEADER_LENGTH = 10
+MAX_HEADER_LENGTH = 120
+# Lines at each end of a page that may be headers, footers or page numbers.
+PAGE_EDGE_LINES = 2
+
+PAGE_NUMBER_RE = re.compile(
+    r'^[ \t]*(?:[-–—][ \t]*)?(?:(?:page|стр\.?|страница)[ \t]*)?\d{1,4}(?:[ \t]*(?:of|из|/)[ \t]*\d{1,4})?(?:[ \t]*[-–—])?[ \t]*$',
+    re.IGNORECASE,
+)
+HYPHENATION_RE = re.compile(r'(?<=[a-zа-яё])-[ \t]*\n[ \t]*(?=[a-zа-яё])')
+DIGITS_RE = re.compile(r'\d+')
+LETTERS_RE = re.compile(r'[^\W\d_]{2,}')
+SPACES_RE = re.compile(r'[ \t\u00a0]+')
+TRAILING_SPACES_RE = re.compile(r'[ \t]+\n')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def _header_key(line):
+    # Page numbers and dates inside running headers change from page to page.
+    return DIGITS_RE.sub('#', line.strip().lower())
+
+
+def _is_header_candidate(line):
+    # Rows of numbers (table cells) are never headers, however often their shape repeats.
+    stripped = line.strip()
+    return MIN_HEADER_LENGTH <= len(stripped) <= MAX_HEADER_LENGTH and LETTERS_RE.search(stripped) is not None
+
+
+def _page_edges(lines):
+    """Indices of the first and last PAGE_EDGE_LINES non-empty lines of a page."""
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    return set(filled[:PAGE_EDGE_LINES] + filled[-PAGE_EDGE_LINES:])
+
+
+def _remove_page_furniture(text):
+    """
+    Drop running headers/footers and page numbers.
+
+    Only lines at the top or bottom of a page (pages are separated by
+    PAGE_BREAK, see papers.extraction) are considered, so repeated lines and
+    bare numbers inside the body, such as table rows, are kept. Text without
+    page breaks is a single page and loses at most its first or last line
+    if that is a page number.
+    """
+    pages = [page.split('\n') for page in text.replace(PAGE_SEPARATOR, PAGE_BREAK).split(PAGE_BREAK)]
+    edges = [_page_edges(lines) for lines in pages]
+    counts = Counter()
+    for lines, indices in zip(pages, edges):
+        counts.update({_header_key(lines[index]) for index in indices if _is_header_candidate(lines[index])})
+    repeated = {key for key, count in counts.items() if count >= MIN_HEADER_REPEATS}
+
+    def is_furniture(line):
+        if PAGE_NUMBER_RE.match(line):
+            return True
+        return _is_header_candidate(line) and _header_key(line) in repeated
+
+    return '\n'.join(
+        '\n'.join(line for index, line in enumerate(lines) if index not in indices or not is_furniture(line))
+        for lines, indices in zip(pages, edges)
+    )
+
+
+def strip_page_breaks(text):
+    """
+    Text as stored in PaperSummary.text_content: running headers, footers and
+    page numbers removed while the page breaks are still there to find them,
+    pages joined with plain newlines so no PAGE_BREAK reaches the database or
+    the page.
+    """
+    return _remove_page_furniture((text or '').replace('\r\n', '\n').replace('\r', '\n'))
+
+
+def _remove_references(text):
+    sections = segment_text(text)
+    if not any(section['kind'] == REFERENCES for section in sections):
+        return text
+    return ''.join(text[section['start']:section['end']] for section in sections if section['kind'] != REFERENCES)
+
+
+def preprocess_text_with_stats(text):
+    """
+    Strip what the model does not need from extracted paper text.
+
+    Removes running headers/footers, page numbers, the reference list,
+    hyphenation at line breaks and redundant whitespace. Returns
+    (text, stats) where stats holds characters and estimated tokens before
+    and after.
+    """
+    original = text or ''
+    text = original.replace('\r\n', '\n').replace('\r', '\n')
+    text = HYPHENATION_RE.sub('', text)
+    text = _remove_page_furniture(text)
+    text = _remove_references(text)
+    text = SPACES_RE.sub(' ', text)
+    text = TRAILING_SPACES_RE.sub('\n', text)
+    text = BLANK_LINES_RE.sub('\n\n', text).strip()
+    stats = {
+        'chars_before': len(original),
+        'chars_after': len(text),
+        'tokens_before': estimate_tokens(original),
+        'tokens_after': estimate_tokens(text),
+    }
+    stats['chars_saved'] = stats['chars_before'] - stats['chars_after']
+    stats['tokens_saved'] = stats['tokens_before'] - stats['tokens_after']
+    return text, stats
+
+
+def preprocess_text(text):
+    """preprocess_text_with_stats() without the stats; the savings are logged."""
+    text, stats = preprocess_text_with_stats(text)
+    if stats['chars_before']:
+        logger.info(
+            f"Предобработка текста: {stats['chars_before']} -> {stats['chars_after']} символов, "
+            f"~{stats['tokens_saved']} токенов сэкономлено "
+            f"({stats['chars_saved'] * 100 // stats['chars_before']}%)"
+        )
+    return text
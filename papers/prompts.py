@@ -0,0 +1,83 @@
+import logging
+
+from .compression import split_sentences
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Prompt budget (instructions + context) per operation, in estimated tokens.
+DEFAULT_PROMPT_BUDGETS = {
+    'summary': 32000,
+    'summary_chunk': 8000,
+    'question': 1500,
+    'translation': 4000,
+}
+TRUNCATION_MARKER = "\n[...]"
+# estimate_tokens() rounds down, so joined parts can come out a token or two above the sum of their estimates.
+JOIN_SLACK_TOKENS = 2
+
+
+def prompt_budget(operation):
+    from django.conf import settings
+    budgets = getattr(settings, 'LLM_PROMPT_TOKEN_BUDGETS', DEFAULT_PROMPT_BUDGETS)
+    return budgets.get(operation, DEFAULT_PROMPT_BUDGETS.get(operation))
+
+
+def fit_to_budget(text, max_tokens):
+    """Cut text to max_tokens at a paragraph or sentence boundary."""
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ''
+    parts = []
+    used = estimate_tokens(TRUNCATION_MARKER) + JOIN_SLACK_TOKENS
+    for paragraph in text.split('\n\n'):
+        tokens = estimate_tokens(paragraph) + JOIN_SLACK_TOKENS
+        if used + tokens <= max_tokens:
+            parts.append(paragraph)
+            used += tokens
+            continue
+        sentences = []
+        for sentence in split_sentences(paragraph):
+            tokens = estimate_tokens(sentence) + 1
+            if used + tokens > max_tokens:
+                break
+            sentences.append(sentence)
+            used += tokens
+        if sentences:
+            parts.append(' '.join(sentences))
+        break
+    return '\n\n'.join(parts) + TRUNCATION_MARKER
+
+
+def build_prompt(operation, instructions, context, suffix=''):
+    """
+    Return (prompt, prompt_tokens) with context cut so that the whole prompt fits the operation's budget.
+
+    The prompt is instructions + context + suffix; only the context is
+    shortened, never the instructions or the question.
+    """
+    budget = prompt_budget(operation)
+    fixed_tokens = estimate_tokens(instructions) + estimate_tokens(suffix)
+    context_budget = None if budget is None else budget - fixed_tokens - JOIN_SLACK_TOKENS
+    fitted = fit_to_budget(context, context_budget)
+    if fitted is not context:
+        logger.info(f"Промпт {operation}: контекст сокращен с ~{estimate_tokens(context)} до ~{estimate_tokens(fitted)} токенов (бюджет {budget})")
+    prompt = f"{instructions}{fitted}{suffix}"
+    return prompt, fixed_tokens + estimate_tokens(fitted)
+
+
+def log_token_usage(operation, prompt_tokens, response):
+    """Log prompt and response tokens of a model call, preferring the counts the API reports."""
+    usage = getattr(response, 'usage_metadata', None)
+    reported_prompt = getattr(usage, 'prompt_token_count', None)
+    reported_response = getattr(usage, 'candidates_token_count', None)
+    if reported_response is None:
+        try:
+            reported_response = estimate_tokens(response.text)
+        except Exception:
+            reported_response = 0
+    logger.info(
+        f"LLM {operation}: prompt {reported_prompt if reported_prompt is not None else f'~{prompt_tokens}'} токенов, "
+        f"ответ {reported_response} токенов"
+    )
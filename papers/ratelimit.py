@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits are enforced per process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SLOT_POLL_INTERVAL = 0.05
+SLOW_WAIT_LOG_THRESHOLD = 1.0
+
+
+class RateLimitTimeout(requests.exceptions.RequestException):
+    """The caller could not get a token or a concurrency slot for the host before its deadline."""
+
+
+class HostLimiter:
+    """
+    Token bucket plus concurrency cap for one upstream host, shared by all worker processes.
+
+    The bucket state lives in a small JSON file updated under an exclusive
+    flock. Callers reserve a token even when the bucket is empty and sleep
+    until it refills, so they are served in arrival order. The concurrency cap
+    is a set of slot files locked with flock, so slots held by a crashed worker
+    are released by the kernel. max_wait is how long a caller queues before
+    giving up with RateLimitTimeout.
+    """
+
+    def __init__(self, host, rate, burst, concurrency, state_dir, max_wait):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.state_dir = state_dir
+        self.state_path = os.path.join(state_dir, f"{host}.bucket")
+        self._local_lock = threading.Lock()
+        self._local_slots = threading.BoundedSemaphore(concurrency)
+        self._stats = {'requests': 0, 'waited': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'timeouts': 0}
+
+    def shared_stats(self):
+        """Token-wait counters accumulated by all processes in the bucket state file."""
+        if not os.path.exists(self.state_path):
+            return {}
+        with self._locked_state() as state:
+            return dict(state)
+
+    def stats(self):
+        """Counters of this process, including time spent waiting for a concurrency slot."""
+        with self._local_lock:
+            stats = dict(self._stats)
+        stats['avg_wait_seconds'] = stats['wait_seconds'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    @contextmanager
+    def acquire(self, max_wait=None):
+        """Block until a token and a slot are available, or raise RateLimitTimeout after max_wait (default self.max_wait) seconds."""
+        started = time.monotonic()
+        deadline = started + (self.max_wait if max_wait is None else max_wait)
+        try:
+            self._wait_for_token(deadline)
+            slot = self._acquire_slot(deadline)
+        except RateLimitTimeout:
+            self._record(time.monotonic() - started, timed_out=True)
+            raise
+        self._record(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self._release_slot(slot)
+
+    def hold(self, max_wait=None):
+        """Like acquire(), but return a release callable for slots that outlive the current block."""
+        context = self.acquire(max_wait)
+        context.__enter__()
+        released = []
+
+        def release():
+            if not released:
+                released.append(True)
+                context.__exit__(None, None, None)
+        return release
+
+    def _record(self, waited, timed_out=False):
+        with self._local_lock:
+            self._stats['requests'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+            if waited > 0.001:
+                self._stats['waited'] += 1
+            if timed_out:
+                self._stats['timeouts'] += 1
+        if waited > SLOW_WAIT_LOG_THRESHOLD:
+            logger.info(f"Rate limiter: waited {waited:.2f}s for {self.host}")
+
+    def _wait_for_token(self, deadline):
+        wait = self._reserve_token(deadline)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _reserve_token(self, deadline):
+        now = time.time()
+        with self._locked_state() as state:
+            tokens = min(self.burst, state.get('tokens', self.burst) + (now - state.get('updated', now)) * self.rate)
+            wait = max(0.0, (1 - tokens) / self.rate)
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"Rate limit for {self.host}: next token in {wait:.1f}s")
+            state['tokens'] = tokens - 1
+            state['updated'] = now
+            # Shared wait metrics, visible to every worker (see the http_stats command).
+            state['requests'] = state.get('requests', 0) + 1
+            state['queued'] = state.get('queued', 0) + (1 if wait > 0 else 0)
+            state['wait_seconds'] = state.get('wait_seconds', 0.0) + wait
+            state['max_wait_seconds'] = max(state.get('max_wait_seconds', 0.0), wait)
+        return wait
+
+    @contextmanager
+    def _locked_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        with self._local_lock:
+            with open(self.state_path, 'a+', encoding='utf-8') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw else {}
+                    except ValueError:
+                        state = {}
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _acquire_slot(self, deadline):
+        while True:
+            if self._local_slots.acquire(timeout=SLOT_POLL_INTERVAL):
+                if not fcntl:
+                    return None
+                for index in range(self.concurrency):
+                    slot_file = open(os.path.join(self.state_dir, f"{self.host}.slot{index}"), 'a')
+                    try:
+                        fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        return slot_file
+                    except OSError:
+                        slot_file.close()
+                self._local_slots.release()
+            if time.monotonic() > deadline:
+                raise RateLimitTimeout(f"No free connection slot for {self.host}")
+            time.sleep(SLOT_POLL_INTERVAL)
+
+    def _release_slot(self, slot_file):
+        if slot_file is not None:
+            fcntl.flock(slot_file, fcntl.LOCK_UN)
+            slot_file.close()
+        self._local_slots.release()
+
+
+class RateLimiter:
+    """
+    Registry of HostLimiter objects configured from settings.HTTP_RATE_LIMITS.
+
+    A host's config may set its own max_wait; otherwise the registry's
+    max_wait (settings.HTTP_RATE_LIMIT_MAX_WAIT) applies.
+    """
+
+    def __init__(self, limits, default_limit, state_dir, max_wait):
+        self.limits = limits
+        self.default_limit = default_limit
+        self.state_dir = state_dir
+        self.max_wait = max_wait
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                config = self.limits.get(host, self.default_limit)
+                limiter = HostLimiter(
+                    host, config['rate'], config['burst'], config['concurrency'], self.state_dir,
+                    config.get('max_wait', self.max_wait),
+                )
+                self._limiters[host] = limiter
+            return limiter
+
+    def for_url(self, url):
+        return self.for_host(urlsplit(url).hostname or '')
+
+    def stats(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {host: limiter.stats() for host, limiter in limiters.items()}
+
+
+# The limits are defined in settings only (see HTTP_RATE_LIMITS there).
+rate_limiter = RateLimiter(
+    limits=settings.HTTP_RATE_LIMITS,
+    default_limit=settings.HTTP_DEFAULT_RATE_LIMIT,
+    state_dir=str(settings.HTTP_RATE_LIMIT_DIR),
+    max_wait=settings.HTTP_RATE_LIMIT_MAX_WAIT,
+)
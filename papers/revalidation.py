@@ -0,0 +1,222 @@
+import logging
+from datetime import timedelta
+
+import arxiv
+import requests
+from django.utils import timezone
+
+from . import http_client
+from .extraction import FULL_PROFILE
+from .extraction_cache import extract_cached
+from .identifiers import parse_file_name, split_version, with_version
+from .metadata_cache import metadata_cache
+from .models import PaperSummary
+from .pdf_store import pdf_store
+from .preprocessing import strip_page_breaks
+from .sections import store_sections
+
+logger = logging.getLogger(__name__)
+
+ARXIV_BATCH_SIZE = 100
+MAX_VERSION_PROBES = 10
+
+UNCHANGED = 'unchanged'
+NEW_VERSION = 'new_version'
+MODIFIED = 'modified'
+
+
+def _rxiv_base_url(repository):
+    return 'https://www.medrxiv.org' if repository == 'medrxiv' else 'https://www.biorxiv.org'
+
+
+def _head_exists(url):
+    response = http_client.get_session().head(url, allow_redirects=True, timeout=http_client.DEFAULT_TIMEOUT)
+    if response.status_code in (404, 410):
+        return False
+    response.raise_for_status()
+    return True
+
+
+def _conditional_check(paper, url):
+    """
+    Send a conditional request with the stored validators.
+
+    Returns (changed, etag, last_modified). The first check of a paper only
+    records the validators, since there is nothing to compare them with yet.
+    """
+    headers = {}
+    if paper.etag:
+        headers['If-None-Match'] = paper.etag
+    if paper.last_modified:
+        headers['If-Modified-Since'] = paper.last_modified
+    response = http_client.get_session().head(url, headers=headers, allow_redirects=True, timeout=http_client.DEFAULT_TIMEOUT)
+    if response.status_code == 304:
+        return False, paper.etag, paper.last_modified
+    response.raise_for_status()
+    etag = response.headers.get('ETag', '')
+    last_modified = response.headers.get('Last-Modified', '')
+    had_validators = bool(paper.etag or paper.last_modified)
+    changed = had_validators and (etag, last_modified) != (paper.etag, paper.last_modified)
+    return changed, etag, last_modified
+
+
+def _check_arxiv_batch(papers):
+    """Return {paper.pk: (status, latest_version)} with one arXiv API query per batch."""
+    outcome = {}
+    # Versioned and unversioned rows of the same paper share a base ID; all of them are checked.
+    by_base_id = {}
+    for paper in papers:
+        by_base_id.setdefault(paper.base_id, []).append(paper)
+    client = http_client.get_arxiv_client()
+    search = arxiv.Search(id_list=list(by_base_id), max_results=len(by_base_id))
+    for result in client.results(search):
+        base_id, latest_version = split_version(result.get_short_id())
+        for paper in by_base_id.get(base_id, ()):
+            if paper.version is not None:
+                changed = latest_version is not None and latest_version > paper.version
+            else:
+                # Unversioned ID: we stored whatever was latest when it was ingested.
+                changed = result.updated > (paper.last_checked_at or paper.uploaded_at)
+            outcome[paper.pk] = (NEW_VERSION if changed else UNCHANGED, latest_version)
+    return outcome
+
+
+def _check_rxiv(paper):
+    """Probe v{n+1}, v{n+2}, ... with HEAD requests; fall back to a conditional check of the current PDF."""
+    base_url = _rxiv_base_url(paper.repository)
+    current = paper.version or 1
+    latest = current
+    for candidate in range(current + 1, current + 1 + MAX_VERSION_PROBES):
+        if not _head_exists(f"{base_url}/content/10.1101/{paper.base_id}v{candidate}"):
+            break
+        latest = candidate
+    if latest > current:
+        # Validators belong to the old version; the next check records fresh ones.
+        return NEW_VERSION, latest, '', ''
+    changed, etag, last_modified = _conditional_check(paper, f"{base_url}/content/10.1101/{paper.base_id}v{current}.full.pdf")
+    return (MODIFIED if changed else UNCHANGED), current, etag, last_modified
+
+
+def _check_chemrxiv(paper):
+    changed, etag, last_modified = _conditional_check(paper, f"https://chemrxiv.org/engage/chemrxiv/article-details/{paper.base_id}")
+    return (MODIFIED if changed else UNCHANGED), paper.version, etag, last_modified
+
+
+def _file_name_for_version(paper, version):
+    """A versioned file_name follows the stored version; an unversioned one means "latest" and stays."""
+    repository, base_id, named_version = parse_file_name(paper.file_name)
+    if named_version is None or not version:
+        return paper.file_name
+    return f"{repository}:{with_version(base_id, version)}"
+
+
+def reingest(paper, version=None):
+    """
+    Download the given (or current) version again and replace the stored text if the PDF changed.
+
+    Returns True when the text was replaced. Cached summaries and answers of
+    the old text are dropped so they are regenerated on the next request. A
+    new version with an identical PDF only records the version number. A row
+    stored under a versioned ID (arxiv:2101.00001v1) is renamed to the new
+    version, so its file_name always names the text it holds; if that version
+    is already stored as a row of its own, this row is left alone.
+    """
+    paper_id = with_version(paper.base_id, version or paper.version)
+    file_name = _file_name_for_version(paper, version)
+    if file_name != paper.file_name and PaperSummary.objects.filter(file_name=file_name).exists():
+        logger.info(f"Revalidation: {file_name} is already stored, {paper.file_name} kept as is")
+        return False
+    metadata_cache.invalidate(paper.repository, paper_id)
+    metadata_cache.invalidate(paper.repository, paper.base_id)
+    from .views import fetch_paper_data, store_preprint_pdf
+    data = fetch_paper_data(paper.repository, paper_id)
+    if not data:
+        logger.warning(f"Revalidation: metadata not found for {paper.repository} ID {paper_id}")
+        return False
+    pdf_sha256 = store_preprint_pdf(paper.repository, paper_id, data=data)
+    if not pdf_sha256:
+        return False
+    if pdf_sha256 == paper.pdf_sha256:
+        if version and version != paper.version:
+            # Otherwise the paper is reported as NEW_VERSION and downloaded again on every run.
+            paper.version = version
+            paper.file_name = file_name
+            PaperSummary.objects.filter(pk=paper.pk).update(version=version, file_name=file_name)
+            logger.info(f"Revalidation: {paper.file_name} is now {paper_id}, PDF unchanged")
+        return False
+    text, _, _, _ = extract_cached(pdf_sha256, pdf_store.path(pdf_sha256))
+    if not text:
+        return False
+    paper.text_content = strip_page_breaks(text)
+    paper.pdf_sha256 = pdf_sha256
+    paper.extraction_profile = FULL_PROFILE
+    paper.version = version or paper.version
+    paper.file_name = file_name
+    paper.title = data.get('title') or paper.title
+    paper.authors = data.get('authors') or paper.authors
+    paper.save()
+    store_sections(paper)
+    paper.localized_summaries.all().delete()
+    paper.questions_answers.all().delete()
+    logger.info(f"Revalidation: re-ingested {paper.file_name} as {paper_id}")
+    return True
+
+
+def revalidate_papers(repository=None, min_age=timedelta(days=1), limit=None, dry_run=False):
+    """
+    Check stored papers for newer upstream versions and re-ingest only the ones that changed.
+
+    Returns counters: checked, changed, reingested, failed.
+    """
+    cutoff = timezone.now() - min_age
+    papers = PaperSummary.objects.exclude(last_checked_at__gt=cutoff).defer('text_content').order_by('last_checked_at')
+    if repository:
+        papers = papers.filter(repository=repository)
+    if limit:
+        papers = papers[:limit]
+    papers = list(papers)
+    counters = {'checked': 0, 'changed': 0, 'reingested': 0, 'failed': 0}
+
+    checks = {}
+    arxiv_papers = [paper for paper in papers if paper.repository == 'arxiv']
+    for i in range(0, len(arxiv_papers), ARXIV_BATCH_SIZE):
+        batch = arxiv_papers[i:i + ARXIV_BATCH_SIZE]
+        try:
+            for pk, (status, latest_version) in _check_arxiv_batch(batch).items():
+                checks[pk] = (status, latest_version, None, None)
+        except Exception as e:
+            logger.error(f"Revalidation: arXiv batch check failed: {e}")
+    for paper in papers:
+        if paper.repository == 'arxiv':
+            continue
+        try:
+            if paper.repository in ('medrxiv', 'biorxiv'):
+                checks[paper.pk] = _check_rxiv(paper)
+            elif paper.repository == 'chemrxiv':
+                checks[paper.pk] = _check_chemrxiv(paper)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Revalidation: check failed for {paper.file_name}: {e}")
+
+    for paper in papers:
+        if paper.pk not in checks:
+            counters['failed'] += 1
+            continue
+        status, latest_version, etag, last_modified = checks[paper.pk]
+        counters['checked'] += 1
+        if status != UNCHANGED:
+            counters['changed'] += 1
+            logger.info(f"Revalidation: {paper.file_name} {status} (version {paper.version} -> {latest_version})")
+            if not dry_run:
+                try:
+                    if reingest(paper, latest_version if status == NEW_VERSION else None):
+                        counters['reingested'] += 1
+                except Exception as e:
+                    logger.error(f"Revalidation: re-ingest failed for {paper.file_name}: {e}")
+                    counters['failed'] += 1
+                    continue
+        if not dry_run:
+            update = {'last_checked_at': timezone.now()}
+            if etag is not None:
+                update.update(etag=etag, last_modified=last_modified)
+            PaperSummary.objects.filter(pk=paper.pk).update(**update)
+    return counters
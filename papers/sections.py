@@ -0,0 +1,134 @@
+import logging
+import re
+
+from .models import PaperSection, PaperSummary
+from .prompts import fit_to_budget
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+FRONT = 'front'
+ABSTRACT = 'abstract'
+INTRODUCTION = 'introduction'
+METHODS = 'methods'
+RESULTS = 'results'
+CONCLUSION = 'conclusion'
+REFERENCES = 'references'
+APPENDIX = 'appendix'
+
+SECTION_HEADINGS = (
+    (ABSTRACT, r'abstract|аннотация|резюме'),
+    (INTRODUCTION, r'introduction|background|related work|motivation|введение'),
+    (METHODS, r'methods?|methodology|materials and methods|approach|experimental setup|model|data and methods|методы|методология'),
+    (RESULTS, r'results?|experiments?|evaluation|discussion|results and discussion|findings|результаты|обсуждение'),
+    (CONCLUSION, r'conclusions?|concluding remarks|summary and conclusions?|conclusions? and future work|заключение|выводы'),
+    (REFERENCES, r'references|bibliography|literature cited|список литературы|литература'),
+    (APPENDIX, r'appendix(?:\s+[A-Z])?|appendices|supplementary(?: material| information)?|приложение'),
+)
+
+# A heading is a short line, optionally numbered ("3", "3.", "III.", "A."), with nothing else on it.
+HEADING_RE = re.compile(
+    r'^[ \t]*(?:(?:\d+(?:\.\d+)*|[IVX]+|[A-H])\.?[ \t]+)?(?P<title>'
+    + '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in SECTION_HEADINGS)
+    + r')[ \t]*[:.]?[ \t]*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+# "Abstract. We study..." / "Abstract—We study..." on one line.
+INLINE_ABSTRACT_RE = re.compile(r'^[ \t]*(?P<title>abstract)[ \t]*[.:—–-][ \t]*\S', re.IGNORECASE | re.MULTILINE)
+
+# Sections that make sense to send to the model for questions, most useful first.
+QUESTION_SECTIONS = (ABSTRACT, CONCLUSION, INTRODUCTION, RESULTS, METHODS)
+
+
+def _headings(text):
+    found = []
+    for match in HEADING_RE.finditer(text):
+        kind = next(kind for kind, _ in SECTION_HEADINGS if match.group(kind))
+        found.append((match.start(), kind, match.group('title').strip()))
+    inline = INLINE_ABSTRACT_RE.search(text)
+    if inline and not any(kind == ABSTRACT for _, kind, _ in found):
+        found.append((inline.start(), ABSTRACT, inline.group('title')))
+    found.sort()
+    headings = []
+    seen_references = False
+    for start, kind, title in found:
+        # After the reference list only appendices start new sections; anything else is a citation title.
+        if seen_references and kind != APPENDIX:
+            continue
+        if kind == ABSTRACT and any(previous == ABSTRACT for _, previous, _ in headings):
+            continue
+        seen_references = seen_references or kind == REFERENCES
+        headings.append((start, kind, title))
+    return headings
+
+
+def segment_text(text):
+    """
+    Split extracted paper text into sections at recognized headings.
+
+    Returns a list of dicts with 'kind', 'heading', 'start' and 'end'
+    (character offsets into text, end exclusive). Text before the first
+    heading is the 'front' section (title, authors, affiliations).
+    """
+    sections = []
+    headings = _headings(text)
+    if not headings or headings[0][0] > 0:
+        sections.append({'kind': FRONT, 'heading': '', 'start': 0})
+    for start, kind, title in headings:
+        sections.append({'kind': kind, 'heading': title, 'start': start})
+    for section, following in zip(sections, sections[1:] + [None]):
+        section['end'] = following['start'] if following else len(text)
+    return [section for section in sections if text[section['start']:section['end']].strip()]
+
+
+def store_sections(paper):
+    """Segment paper.text_content, replace its stored sections and record token counts."""
+    text = paper.text_content or ''
+    sections = segment_text(text)
+    PaperSection.objects.filter(paper_summary=paper).delete()
+    PaperSection.objects.bulk_create([
+        PaperSection(
+            paper_summary=paper,
+            order=order,
+            kind=section['kind'],
+            heading=section['heading'][:255],
+            start_offset=section['start'],
+            end_offset=section['end'],
+            text=text[section['start']:section['end']],
+            token_count=estimate_tokens(text[section['start']:section['end']]),
+        )
+        for order, section in enumerate(sections)
+    ])
+    paper.token_count = estimate_tokens(text)
+    PaperSummary.objects.filter(pk=paper.pk).update(token_count=paper.token_count)
+    logger.info(f"Разделы статьи {paper.file_name}: {', '.join(section['kind'] for section in sections)}")
+    return sections
+
+
+def load_sections(paper, kinds):
+    """
+    Return {kind: text} for the requested section kinds, in document order.
+
+    Sections are created on first use for papers stored before segmentation existed.
+    """
+    if not PaperSection.objects.filter(paper_summary=paper).exists():
+        if not paper.text_content:
+            return {}
+        store_sections(paper)
+    texts = {}
+    for kind, text in PaperSection.objects.filter(paper_summary=paper, kind__in=kinds).values_list('kind', 'text'):
+        texts[kind] = texts[kind] + "\n" + text if kind in texts else text
+    return texts
+
+
+def select_sections(texts, priority, max_tokens):
+    """Fill max_tokens with sections in priority order and return them joined in document order."""
+    chosen = {}
+    remaining = max_tokens
+    for kind in priority:
+        if remaining <= 0:
+            break
+        if texts.get(kind):
+            chosen[kind] = fit_to_budget(texts[kind], remaining)
+            remaining -= estimate_tokens(chosen[kind])
+    return "\n\n".join(chosen[kind] for kind in texts if kind in chosen and chosen[kind])
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import GenerationLock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_TTL = 60
+DEFAULT_WAIT_SECONDS = 120
+DEFAULT_POLL_INTERVAL = 0.5
+
+
+def _settings():
+    return (
+        getattr(settings, 'LLM_SINGLE_FLIGHT_LOCK_TTL', DEFAULT_LOCK_TTL),
+        getattr(settings, 'LLM_SINGLE_FLIGHT_WAIT_SECONDS', DEFAULT_WAIT_SECONDS),
+        getattr(settings, 'LLM_SINGLE_FLIGHT_POLL_INTERVAL', DEFAULT_POLL_INTERVAL),
+    )
+
+
+def summary_key(paper_pk, language, summary_type):
+    return f"summary:{paper_pk}:{language}:{summary_type}"
+
+
+def question_key(paper_pk, question, language):
+    digest = hashlib.sha256(question.encode('utf-8')).hexdigest()
+    return f"question:{paper_pk}:{language}:{digest}"
+
+
+def _owner():
+    return f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def _acquire(key, owner, ttl):
+    """Insert the lock row for key; a row left behind by a crashed worker is taken over once expired."""
+    now = timezone.now()
+    GenerationLock.objects.filter(key=key, expires_at__lt=now).delete()
+    try:
+        with transaction.atomic():
+            GenerationLock.objects.create(key=key, owner=owner, expires_at=now + timedelta(seconds=ttl))
+    except IntegrityError:
+        return False
+    return True
+
+
+def _release(key, owner):
+    GenerationLock.objects.filter(key=key, owner=owner).delete()
+
+
+def _keep_alive(key, owner, ttl, stop):
+    """Push the lock's expiry forward every ttl/3 seconds until stop is set."""
+    try:
+        while not stop.wait(ttl / 3):
+            GenerationLock.objects.filter(key=key, owner=owner).update(expires_at=timezone.now() + timedelta(seconds=ttl))
+    except Exception as e:
+        logger.warning(f"Single-flight {key}: не удалось продлить блокировку: {e}")
+    finally:
+        connection.close()
+
+
+@contextmanager
+def flight_lock(key):
+    """
+    Hold the lock for key while the block runs; yields False (and holds nothing) if another worker has it.
+
+    The lock is refreshed in the background while held, so a generation
+    that outlasts LLM_SINGLE_FLIGHT_LOCK_TTL (a long streamed answer) is not
+    taken for abandoned; only a dead worker's lock expires.
+    """
+    owner = _owner()
+    ttl = _settings()[0]
+    acquired = _acquire(key, owner, ttl)
+    stop = threading.Event()
+    if acquired:
+        threading.Thread(target=_keep_alive, args=(key, owner, ttl, stop), name=f'flight-lock-{key}', daemon=True).start()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            stop.set()
+            _release(key, owner)
+
+
+def single_flight(key, lookup, generate):
+    """
+    Run generate() for key at most once at a time across all workers.
+
+    lookup() returns the stored result or None; generate() produces and
+    stores it. The first caller takes the GenerationLock row for key and
+    generates; callers arriving meanwhile poll lookup() until the result is
+    stored, and take over if the lock is released or expires without one.
+    Waiting longer than LLM_SINGLE_FLIGHT_WAIT_SECONDS generates anyway, so a
+    stuck worker never blocks a request for good.
+    """
+    result = lookup()
+    if result is not None:
+        return result
+    _, wait_seconds, poll_interval = _settings()
+    deadline = time.monotonic() + wait_seconds
+    waited = False
+    while True:
+        with flight_lock(key) as acquired:
+            if acquired:
+                # Another worker may have stored the result and released the lock since the last lookup.
+                result = lookup()
+                if result is None:
+                    result = generate()
+                return result
+        if not waited:
+            logger.info(f"Single-flight {key}: генерация уже выполняется, ожидаем результат.")
+            waited = True
+        time.sleep(poll_interval)
+        result = lookup()
+        if result is not None:
+            logger.info(f"Single-flight {key}: использован результат параллельного запроса.")
+            return result
+        if time.monotonic() >= deadline:
+            logger.warning(f"Single-flight {key}: результат не получен за {wait_seconds} с, генерируем сами.")
+            return generate()
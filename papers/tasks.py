@@ -1,12 +1,20 @@
 from celery import shared_task
-from django.conf import settings
-from .views import fetch_paper_data, download_preprint_pdf, extract_text_and_metadata_from_pdf, summarize_text_gemini, preprocess_text
+from .views import fetch_paper_data, summarize_batch_gemini
+from .preprocessing import preprocess_text, strip_page_breaks
+from .pipeline import download_and_extract
+from .extraction import profile_for_summary_type, widest_profile
+from .fulltext import complete_full_text
+from .sections import store_sections
 from .models import PaperSummary, LocalizedPaperSummary
-import os
+from .revalidation import revalidate_papers
 import logging
+from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
+PRECOMPUTED_LANGUAGES = ['en', 'ru']  # Add more languages as needed
+PRECOMPUTED_SUMMARY_TYPES = ['ordinary', 'short']  # Add 'detailed' if needed
+
 @shared_task
 def process_new_paper(repository, paper_id, file_name_for_db, summary_type, language):
     """Process a new paper in the background."""
@@ -16,15 +24,16 @@ def process_new_paper(repository, paper_id, file_name_for_db, summary_type, lang
         logger.error(f"Не удалось найти статью с ID {paper_id} на {repository}")
         return {"error": f"Не удалось найти статью с ID {paper_id} на {repository}."}
     
-    # Download PDF
-    pdf_save_path = download_preprint_pdf(repository, paper_id, settings.MEDIA_ROOT)
-    if not pdf_save_path:
-        logger.error(f"Не удалось загрузить PDF с {repository} ID: {paper_id}")
+    # Download PDF and extract text (use metadata from API, not PDF); only the pages the precomputed summaries need
+    extraction_profile = widest_profile([profile_for_summary_type(sum_type) for sum_type in PRECOMPUTED_SUMMARY_TYPES])
+    job = {'repository': repository, 'paper_id': paper_id, 'pdf_url': data['pdf_url'], 'profile': extraction_profile}
+    result = download_and_extract([job], extract_workers=1)[0]
+    if result['error']:
+        logger.error(f"Не удалось загрузить PDF с {repository} ID: {paper_id}: {result['error']}")
         return {"error": f"Не удалось загрузить PDF с {repository} ID: {paper_id}."}
     
     try:
-        # Extract text (use metadata from API, not PDF)
-        extracted_text, _, _ = extract_text_and_metadata_from_pdf(pdf_save_path)
+        extracted_text = strip_page_breaks(result['text'])
         if not extracted_text:
             logger.warning(f"Извлечено ноль текста из PDF {paper_id}")
             return {"error": "Не удалось извлечь текст из PDF."}
@@ -39,33 +48,44 @@ def process_new_paper(repository, paper_id, file_name_for_db, summary_type, lang
             text_content=extracted_text,
             title=data.get('title', ''),
             authors=data.get('authors', ''),
-            url=data.get('abs_url', '')
+            url=data.get('abs_url', ''),
+            pdf_sha256=result['pdf_sha256'],
+            extraction_profile=result['profile']
         )
         logger.info(f"Объект PaperSummary создан с ID: {paper_summary_obj.pk}")
+        store_sections(paper_summary_obj)
         
-        # Precompute summaries for common languages and types
-        for lang in ['en', 'ru']:  # Add more languages as needed
-            for sum_type in ['ordinary', 'short']:  # Add 'detailed' if needed
-                summary_content = summarize_text_gemini(
-                    preprocessed_text,
-                    target_language=lang,
-                    summary_type=sum_type
-                )
-                LocalizedPaperSummary.objects.create(
-                    paper_summary=paper_summary_obj,
-                    language=lang,
-                    summary_text=summary_content,
-                    summary_type=sum_type
-                )
-                logger.info(f"LocalizedPaperSummary создан для '{paper_id}' на {lang}, тип '{sum_type}'")
+        # Precompute summaries for common languages and types with one model call
+        summaries = summarize_batch_gemini(preprocessed_text, PRECOMPUTED_LANGUAGES, PRECOMPUTED_SUMMARY_TYPES)
+        LocalizedPaperSummary.objects.bulk_create([
+            LocalizedPaperSummary(
+                paper_summary=paper_summary_obj,
+                language=lang,
+                summary_text=summary_content,
+                summary_type=sum_type
+            )
+            for (lang, sum_type), summary_content in summaries.items()
+        ], ignore_conflicts=True)  # a page view may have created one of them meanwhile
+        logger.info(f"LocalizedPaperSummary созданы для '{paper_id}': {', '.join(f'{lang}/{sum_type}' for lang, sum_type in summaries)}")
         
         return {"pk": paper_summary_obj.pk, "summary_type": summary_type}
     except Exception as e:
         logger.error(f"Ошибка обработки статьи {paper_id}: {e}")
         return {"error": f"Ошибка обработки статьи: {e}"}
-    finally:
-        try:
-            os.remove(pdf_save_path)
-            logger.info(f"Временный PDF удален: {pdf_save_path}")
-        except OSError as e:
-            logger.error(f"Ошибка удаления PDF {pdf_save_path}: {e}")
\ No newline at end of file
+
+
+@shared_task
+def revalidate_papers_task(repository=None, min_age_hours=24, limit=None):
+    """Periodic check for newer upstream versions (schedule with Celery beat)."""
+    counters = revalidate_papers(repository=repository, min_age=timedelta(hours=min_age_hours), limit=limit)
+    logger.info(f"Проверка версий статей завершена: {counters}")
+    return counters
+
+
+@shared_task
+def complete_extraction_task(paper_pk):
+    """Replace a partially extracted paper text with the full document."""
+    text = complete_full_text(paper_pk)
+    if text is None:
+        return {"pk": paper_pk, "skipped": "already running"}
+    return {"pk": paper_pk, "characters": len(text)}
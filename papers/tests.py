@@ -1,3 +1,1113 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+import arxiv
+import requests
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from reportlab.pdfgen import canvas
+
+from . import compression, extraction, extraction_cache, extraction_engines, fulltext, http_client, llm, map_reduce, pipeline, prompts, revalidation, sections, singleflight, views
+from .extraction import PAGE_SEPARATOR
+from .management.commands import ingest_papers
+from .meta_parser import parse_citation_meta
+from .metadata_cache import NOT_FOUND, TRANSIENT_ERROR, MetadataCache, TransientFetchError, metadata_cache
+from .models import ExtractedText, GenerationLock, LocalizedPaperSummary, PaperSection, PaperSummary, QuestionAnswer
+from .pdf_store import PdfStore
+from .preprocessing import preprocess_text, strip_page_breaks
+from .ratelimit import HostLimiter, RateLimitTimeout, RateLimiter
+from .tokens import estimate_tokens
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'paper_metadata': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-paper-metadata'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MetadataCacheTests(TestCase):
+    def setUp(self):
+        self.cache = MetadataCache(ttl=60, max_entries=2)
+        self.cache.clear()
+
+    def test_get_or_fetch_caches_data(self):
+        fetch = mock.Mock(return_value={'title': "A paper"})
+        self.assertEqual(self.cache.get_or_fetch('arxiv', '1', fetch), {'title': "A paper"})
+        self.assertEqual(self.cache.get_or_fetch('arxiv', '1', fetch), {'title': "A paper"})
+        fetch.assert_called_once_with('arxiv', '1')
+        self.assertEqual(self.cache.stats()['local']['hits'], 1)
+
+    def test_backend_serves_other_processes(self):
+        self.cache.set('arxiv', '1', {'title': "A paper"})
+        other = MetadataCache(ttl=60, max_entries=2)
+        self.assertEqual(other.get('arxiv', '1'), {'title': "A paper"})
+        self.assertEqual(other.stats()['local']['backend_hits'], 1)
+
+    def test_lru_eviction(self):
+        for paper_id in ('1', '2', '3'):
+            self.cache._remember(self.cache.make_key('arxiv', paper_id), {'id': paper_id})
+        self.assertEqual(self.cache.stats()['local']['size'], 2)
+        self.assertEqual(self.cache.stats()['local']['evictions'], 1)
+
+    def test_shared_stats_are_flushed(self):
+        # clear() keeps the shared counters, so count from the current value.
+        before = self.cache.stats()['shared']['misses']
+        self.cache.get('arxiv', 'missing')
+        self.assertEqual(self.cache.stats()['shared']['misses'], before + 1)
+
+    def test_clear_clears_backend(self):
+        self.cache.set('arxiv', '1', {'title': "A paper"})
+        self.cache.clear()
+        self.assertIsNone(MetadataCache().get('arxiv', '1'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class NegativeCacheTests(TestCase):
+    def setUp(self):
+        self.cache = MetadataCache(ttl=60, max_entries=2)
+        self.cache.clear()
+
+    def test_negative_reasons(self):
+        self.assertIsNone(self.cache.get_or_fetch('arxiv', 'missing', mock.Mock(return_value=None)))
+        self.assertEqual(self.cache.negative_reason('arxiv', 'missing'), NOT_FOUND)
+        self.assertIsNone(self.cache.get_or_fetch('arxiv', 'flaky', mock.Mock(side_effect=TransientFetchError("503"))))
+        self.assertEqual(self.cache.negative_reason('arxiv', 'flaky'), TRANSIENT_ERROR)
+        fetch = mock.Mock()
+        self.assertIsNone(self.cache.get_or_fetch('arxiv', 'missing', fetch))
+        fetch.assert_not_called()
+
+    def test_unexpected_error_is_not_cached(self):
+        self.assertIsNone(self.cache.get_or_fetch('arxiv', 'bug', mock.Mock(side_effect=ValueError("bug"))))
+        self.assertIsNone(self.cache.negative_reason('arxiv', 'bug'))
+
+
+class ArxivFetchTests(TestCase):
+    def _fetch_with(self, error):
+        client = mock.Mock()
+        client.results.side_effect = error
+        with mock.patch.object(views.http_client, 'get_arxiv_client', return_value=client):
+            return views._fetch_paper_data_uncached('arxiv', '2101.00001')
+
+    def test_unknown_id_is_not_found(self):
+        self.assertIsNone(self._fetch_with(arxiv.HTTPError('https://export.arxiv.org/api/query', 0, 400)))
+
+    def test_server_error_is_transient(self):
+        with self.assertRaises(TransientFetchError):
+            self._fetch_with(arxiv.HTTPError('https://export.arxiv.org/api/query', 0, 503))
+
+    def test_connection_error_is_transient(self):
+        with self.assertRaises(TransientFetchError):
+            self._fetch_with(requests.exceptions.ConnectionError("connection reset"))
+
+
+class SharedSessionTests(TestCase):
+    def setUp(self):
+        limiter = mock.Mock()
+        limiter.hold.return_value = lambda: None
+        patcher = mock.patch.object(http_client.rate_limiter, 'for_url', return_value=limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_session_is_shared(self):
+        self.assertIs(http_client.get_session(), http_client.get_session())
+
+    def test_requests_get_a_default_timeout(self):
+        with mock.patch.object(requests.Session, 'request', return_value=mock.Mock(status_code=200)) as request:
+            http_client.get_session().get('https://export.arxiv.org/api/query')
+            http_client.get_session().get('https://arxiv.org/pdf/2101.00001', timeout=5)
+        self.assertEqual(request.call_args_list[0].kwargs['timeout'], http_client.DEFAULT_TIMEOUT)
+        self.assertEqual(request.call_args_list[1].kwargs['timeout'], 5)
+
+
+class IngestCommandTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+    def test_checkpoint_survives_restart(self):
+        path = os.path.join(self.tmp_dir, 'ingest.checkpoint.json')
+        checkpoint = ingest_papers.Checkpoint(path)
+        checkpoint.mark_failed('2101.00001', 'timeout')
+        checkpoint.mark_done('2101.00001')
+        checkpoint.mark_failed('2101.00002', 'no text extracted')
+        restored = ingest_papers.Checkpoint(path)
+        self.assertEqual(restored.done, {'2101.00001'})
+        self.assertEqual(restored.failed, {'2101.00002': 'no text extracted'})
+
+    def test_ids_are_deduplicated_and_comments_dropped(self):
+        path = os.path.join(self.tmp_dir, 'ids.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("2101.00001\n# a comment\n2101.00002  # second\n\n2101.00001\n")
+        self.assertEqual(ingest_papers.Command()._read_ids(path), ['2101.00001', '2101.00002'])
+
+    @override_settings(CACHES=TEST_CACHES)
+    def test_metadata_matches_versioned_results(self):
+        result = mock.Mock(title="A paper", authors=[mock.Mock()], summary="Abstract")
+        result.authors[0].name = "A. Author"
+        result.get_short_id.return_value = '2101.00001v3'
+        client = mock.Mock()
+        client.results.return_value = iter([result])
+        command = ingest_papers.Command(stdout=mock.Mock())
+        with mock.patch.object(ingest_papers.http_client, 'get_arxiv_client', return_value=client), \
+                mock.patch.object(ingest_papers, 'metadata_cache', MetadataCache()):
+            metadata = command._fetch_metadata('arxiv', ['2101.00001', '2101.00002'], batch_size=50)
+        self.assertEqual(list(metadata), ['2101.00001'])
+        self.assertEqual(metadata['2101.00001']['authors'], "A. Author")
+
+
+class PipelineTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.store = PdfStore(tmp_dir.name)
+        patches = [
+            mock.patch.object(pipeline, 'pdf_store', self.store),
+            mock.patch.object(pipeline.extraction_cache, 'lookup', return_value=None),
+            mock.patch.object(pipeline.extraction_cache, 'store'),
+            mock.patch.object(pipeline, 'extract_text_and_metadata_from_pdf', return_value=("text", "Title", "Authors")),
+            mock.patch.object(pipeline.DownloadPipeline, '_make_cpu_pool', lambda self: ThreadPoolExecutor(max_workers=1)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _download(self, url):
+        if 'broken' in url:
+            raise requests.exceptions.HTTPError("503 Server Error")
+        return self.store.put_stream([b"%PDF-1.4 ", url.encode()])
+
+    def test_failures_are_reported_per_job(self):
+        jobs = [
+            {'repository': 'arxiv', 'paper_id': '1', 'pdf_url': 'https://arxiv.org/pdf/1'},
+            {'repository': 'arxiv', 'paper_id': '2'},
+            {'repository': 'arxiv', 'paper_id': '3', 'pdf_url': 'https://arxiv.org/pdf/broken'},
+        ]
+        with mock.patch.object(pipeline, '_download_to_store', side_effect=self._download):
+            results = pipeline.download_and_extract(jobs, extract_workers=1)
+        self.assertEqual([result['paper_id'] for result in results], ['1', '2', '3'])
+        self.assertIsNone(results[0]['error'])
+        self.assertEqual(results[0]['text'], "text")
+        self.assertTrue(self.store.exists(results[0]['pdf_sha256']))
+        self.assertEqual(results[0]['size'], len(b"%PDF-1.4 https://arxiv.org/pdf/1"))
+        self.assertIn('pdf_url', results[1]['error'])
+        self.assertIn('503', results[2]['error'])
+
+    def test_download_is_streamed_into_the_store(self):
+        response = mock.MagicMock()
+        response.__enter__.return_value = response
+        response.iter_content.return_value = iter([b"%PDF-1.4 ", b"body"])
+        with mock.patch.object(pipeline.http_client, 'get', return_value=response):
+            sha256, size = pipeline._download_to_store('https://arxiv.org/pdf/1')
+        self.assertEqual(size, len(b"%PDF-1.4 body"))
+        with open(self.store.path(sha256), 'rb') as f:
+            self.assertEqual(f.read(), b"%PDF-1.4 body")
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PdfStoreTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.store = PdfStore(tmp_dir.name, max_bytes=250)
+
+    def test_identical_pdfs_share_a_blob(self):
+        first = self.store.put_bytes(b"%PDF-1.4 same")
+        self.assertEqual(self.store.put_bytes(b"%PDF-1.4 same"), first)
+        with open(self.store.path(first), 'rb') as f:
+            self.assertEqual(f.read(), b"%PDF-1.4 same")
+        self.assertEqual(self.store.total_size(), len(b"%PDF-1.4 same"))
+
+    def test_eviction_removes_least_recently_used(self):
+        blobs = [self.store.put_bytes(bytes([index]) * 100) for index in range(3)]
+        now = time.time()
+        for age, sha256 in zip((30, 10, 20), blobs):
+            os.utime(self.store.path_for(sha256), (now - age, now - age))
+        self.assertEqual(self.store.evict(), 1)
+        self.assertFalse(self.store.exists(blobs[0]))
+        self.assertTrue(self.store.exists(blobs[1]))
+        self.assertTrue(self.store.exists(blobs[2]))
+
+    def test_aliases_survive_cache_clear_and_eviction_scan(self):
+        sha256 = self.store.put_bytes(b"%PDF-1.4 aliased")
+        self.store.remember_alias('arxiv:2101.00001', sha256)
+        metadata_cache.clear()
+        caches['paper_metadata'].clear()
+        self.assertEqual(self.store.lookup_alias('arxiv:2101.00001'), sha256)
+        self.assertIsNone(self.store.lookup_alias('arxiv:2101.00002'))
+        self.assertEqual(self.store.total_size(), len(b"%PDF-1.4 aliased"))
+
+    def test_metadata_cache_clear_keeps_other_keys(self):
+        backend = caches['paper_metadata']
+        backend.set('unrelated', 'kept')
+        cache = MetadataCache()
+        cache.set('arxiv', '1', {'title': "A paper"})
+        cache.clear()
+        self.assertIsNone(MetadataCache().get('arxiv', '1'))
+        self.assertEqual(backend.get('unrelated'), 'kept')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class StoredPdfTests(TestCase):
+    content = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        store = PdfStore(tmp_dir.name)
+        patcher = mock.patch.object(views, 'pdf_store', store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sha256 = store.put_bytes(self.content)
+        PaperSummary.objects.create(file_name='arxiv:2101.00001', text_content="text", pdf_sha256=self.sha256)
+        self.factory = RequestFactory()
+
+    def _download(self, **headers):
+        request = self.factory.get('/papers/download/original/arxiv:2101.00001/', headers=headers)
+        return views.download_original_pdf(request, 'arxiv:2101.00001')
+
+    def test_full_download(self):
+        response = self._download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{self.sha256}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        response.close()
+
+    def test_range(self):
+        response = self._download(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+    def test_suffix_range(self):
+        response = self._download(Range='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self._download(Range=f'bytes={len(self.content) + 10}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_if_none_match(self):
+        response = self._download(If_None_Match=f'"{self.sha256}"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self._download(Range='bytes=10-19', If_Range='"other"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        response.close()
+
+
+class HostLimiterTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.state_dir = tmp_dir.name
+
+    def test_burst_then_queue_for_tokens(self):
+        limiter = HostLimiter('example.org', rate=20, burst=2, concurrency=4, state_dir=self.state_dir, max_wait=1)
+        for _ in range(2):
+            limiter.hold()()
+        with self.assertRaises(RateLimitTimeout):
+            limiter.hold(max_wait=0)
+        started = time.monotonic()
+        limiter.hold()()
+        self.assertGreater(time.monotonic() - started, 0.02)
+        self.assertEqual(limiter.stats()['timeouts'], 1)
+
+    def test_concurrency_cap(self):
+        limiter = HostLimiter('example.org', rate=1000, burst=10, concurrency=1, state_dir=self.state_dir, max_wait=1)
+        release = limiter.hold()
+        with self.assertRaises(RateLimitTimeout):
+            limiter.hold(max_wait=0.1)
+        release()
+        release()  # releasing twice is harmless
+        limiter.hold(max_wait=0.1)()
+
+    def test_host_config_overrides_max_wait(self):
+        registry = RateLimiter(
+            limits={'export.arxiv.org': {'rate': 1 / 3, 'burst': 1, 'concurrency': 1, 'max_wait': 25}},
+            default_limit={'rate': 5, 'burst': 10, 'concurrency': 8},
+            state_dir=self.state_dir,
+            max_wait=10,
+        )
+        self.assertEqual(registry.for_url('https://export.arxiv.org/api/query').max_wait, 25)
+        self.assertEqual(registry.for_url('https://example.org/paper.pdf').max_wait, 10)
+        self.assertIs(registry.for_host('example.org'), registry.for_host('example.org'))
+
+
+@override_settings(HTTP_RETRY_TOTAL=2, HTTP_RETRY_BACKOFF=0.5)
+class PacedRetryTests(TestCase):
+    def setUp(self):
+        self.limiter = mock.Mock()
+        self.releases = []
+
+        def hold():
+            release = mock.Mock()
+            self.releases.append(release)
+            return release
+        self.limiter.hold.side_effect = hold
+        patcher = mock.patch.object(http_client.rate_limiter, 'for_url', return_value=self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _response(self, status, headers=None):
+        return mock.Mock(status_code=status, headers=headers or {})
+
+    def test_each_retry_takes_a_new_slot(self):
+        responses = [self._response(503, {'Retry-After': '2'}), self._response(200)]
+        with mock.patch.object(requests.Session, 'request', side_effect=responses), \
+                mock.patch.object(http_client.time, 'sleep') as sleep:
+            response = http_client.get_session().get('https://www.biorxiv.org/content/10.1101/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.limiter.hold.call_count, 2)
+        self.assertTrue(all(release.called for release in self.releases))
+        sleep.assert_called_once_with(2)
+
+    def test_connection_errors_are_retried_then_raised(self):
+        error = requests.exceptions.ConnectionError("reset")
+        with mock.patch.object(requests.Session, 'request', side_effect=error) as request, \
+                mock.patch.object(http_client.time, 'sleep') as sleep:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                http_client.get_session().get('https://www.biorxiv.org/content/10.1101/1')
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0])
+
+    def test_post_is_not_retried(self):
+        with mock.patch.object(requests.Session, 'request', return_value=self._response(503)) as request:
+            http_client.get_session().post('https://example.org/api')
+        self.assertEqual(request.call_count, 1)
+
+
+class ArxivClientTests(TestCase):
+    def test_client_uses_the_shared_session(self):
+        client = http_client.get_arxiv_client()
+        self.assertIsInstance(client, arxiv.Client)
+        self.assertIs(client._session, http_client.get_session())
+        self.assertEqual((client.num_retries, client.delay_seconds), (0, 0))
+
+    def test_identifying_user_agent(self):
+        user_agent = http_client.get_session().headers['User-Agent']
+        self.assertNotIn('Mozilla', user_agent)
+        self.assertIn('github.com', user_agent)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LimiterTimeoutCacheTests(TestCase):
+    def test_local_limiter_timeout_is_not_negative_cached(self):
+        cache = MetadataCache()
+        cache.clear()
+
+        def fetch(repository, paper_id):
+            try:
+                raise RateLimitTimeout("Rate limit for export.arxiv.org: next token in 30.0s")
+            except RateLimitTimeout as e:
+                raise TransientFetchError(e) from e
+        self.assertIsNone(cache.get_or_fetch('arxiv', '2101.00001', fetch))
+        self.assertIsNone(cache.negative_reason('arxiv', '2101.00001'))
+
+
+LANDING_PAGES = os.path.join(os.path.dirname(__file__), 'fixtures', 'landing_pages')
+
+
+def _landing_page(name):
+    with open(os.path.join(LANDING_PAGES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class MetaParserTests(TestCase):
+    def _parse(self, head):
+        return parse_citation_meta(iter([f"<html><head>{head}</head><body>"]))[0]
+
+    def test_stops_after_the_head(self):
+        html = _landing_page('medrxiv_citation_meta.html')
+        chunks = iter([html[i:i + 16 * 1024] for i in range(0, len(html), 16 * 1024)])
+        metadata, consumed = parse_citation_meta(chunks)
+        self.assertEqual(metadata['title'], "Longitudinal sequencing of host response reveals early markers of severe infection")
+        self.assertTrue(metadata['authors'])
+        self.assertLess(len(consumed), len(html))
+
+    def test_abstract_tag_wins_over_description(self):
+        metadata = self._parse(
+            '<meta name="description" content="%s"><meta name="dc.description" content="The <b>abstract</b>.">' % ("x" * 300)
+        )
+        self.assertEqual(metadata['abstract'], "The abstract.")
+
+    def test_description_fallback_rejects_boilerplate(self):
+        tagline = self._parse('<meta name="description" content="bioRxiv - the preprint server for Biology">')
+        self.assertEqual(tagline['abstract'], '')
+        teaser = self._parse('<meta property="og:description" content="A short teaser.">')
+        self.assertEqual(teaser['abstract'], '')
+        long_description = "We study things. " * 20
+        self.assertEqual(self._parse(f'<meta name="description" content="{long_description}">')['abstract'], long_description.strip())
+
+
+class LandingPageReadTests(TestCase):
+    def _response(self, html):
+        chunks = [html[i:i + 1000].encode() for i in range(0, len(html), 1000)]
+        consumed = []
+
+        def iter_content(chunk_size):
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+        response = mock.MagicMock(headers={'Content-Type': 'text/html; charset=utf-8'}, encoding='utf-8', url='https://www.medrxiv.org/x')
+        response.__enter__.return_value = response
+        response.iter_content.side_effect = iter_content
+        return response, chunks, consumed
+
+    def test_rest_of_small_page_is_read_for_connection_reuse(self):
+        html = _landing_page('medrxiv_citation_meta.html')
+        response, chunks, consumed = self._response(html)
+        scrape = mock.Mock()
+        with mock.patch.object(views.http_client, 'get', return_value=response):
+            metadata = views._read_landing_page_metadata('https://www.medrxiv.org/x', scrape)
+        self.assertTrue(metadata['title'])
+        scrape.assert_not_called()
+        self.assertEqual(len(consumed), len(chunks))
+
+    @override_settings(LANDING_PAGE_DRAIN_BYTES=2000)
+    def test_large_page_is_cut_off(self):
+        response, chunks, consumed = self._response(_landing_page('medrxiv_citation_meta.html'))
+        with mock.patch.object(views.http_client, 'get', return_value=response):
+            views._read_landing_page_metadata('https://www.medrxiv.org/x', mock.Mock())
+        self.assertLess(len(consumed), len(chunks))
+
+    def test_missing_tags_fall_back_to_full_parse(self):
+        html = _landing_page('biorxiv_no_citation_meta.html')
+        response, chunks, consumed = self._response(html)
+        scrape = mock.Mock(return_value={'title': "Scraped", 'authors': "A. Author", 'abstract': "Abstract", 'pdf_url': ''})
+        with mock.patch.object(views.http_client, 'get', return_value=response):
+            metadata = views._read_landing_page_metadata('https://www.biorxiv.org/x', scrape)
+        self.assertEqual(scrape.call_args.args[0], html)
+        self.assertEqual(metadata['title'], "Scraped")
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RevalidationTests(TestCase):
+    def _arxiv_client(self, short_id, updated):
+        result = mock.Mock(updated=updated)
+        result.get_short_id.return_value = short_id
+        client = mock.Mock()
+        client.results.return_value = iter([result])
+        return mock.patch.object(revalidation.http_client, 'get_arxiv_client', return_value=client)
+
+    def test_batch_checks_versioned_and_unversioned_rows(self):
+        versioned = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="text")
+        unversioned = PaperSummary.objects.create(file_name='arxiv:2101.00001', text_content="text")
+        current = PaperSummary.objects.create(file_name='arxiv:2101.00001v2', text_content="text")
+        PaperSummary.objects.filter(pk=unversioned.pk).update(last_checked_at=timezone.now() - timedelta(days=2))
+        unversioned.refresh_from_db()
+        with self._arxiv_client('2101.00001v2', timezone.now() - timedelta(days=1)):
+            outcome = revalidation._check_arxiv_batch([versioned, unversioned, current])
+        self.assertEqual(outcome[versioned.pk], (revalidation.NEW_VERSION, 2))
+        self.assertEqual(outcome[unversioned.pk], (revalidation.NEW_VERSION, 2))
+        self.assertEqual(outcome[current.pk], (revalidation.UNCHANGED, 2))
+
+    def test_reingest_with_unchanged_pdf_records_version(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="old text", pdf_sha256='a' * 64)
+        with mock.patch.object(views, 'fetch_paper_data', return_value={'pdf_url': 'https://arxiv.org/pdf/2101.00001v2.pdf'}), \
+                mock.patch.object(views, 'store_preprint_pdf', return_value='a' * 64):
+            self.assertFalse(revalidation.reingest(paper, 2))
+        paper.refresh_from_db()
+        self.assertEqual(paper.version, 2)
+        self.assertEqual(paper.file_name, 'arxiv:2101.00001v2')
+        self.assertEqual(paper.text_content, "old text")
+
+    def test_reingested_version_survives_save(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="old text", pdf_sha256='a' * 64)
+        with mock.patch.object(views, 'fetch_paper_data', return_value={'pdf_url': 'https://arxiv.org/pdf/2101.00001v2.pdf'}), \
+                mock.patch.object(views, 'store_preprint_pdf', return_value='b' * 64), \
+                mock.patch.object(revalidation, 'extract_cached', return_value=("new text", "", "", 'full')), \
+                mock.patch.object(revalidation.pdf_store, 'path', return_value='/tmp/unused.pdf'):
+            self.assertTrue(revalidation.reingest(paper, 2))
+        paper.save()
+        stored = PaperSummary.objects.get(file_name='arxiv:2101.00001v2')
+        self.assertEqual(stored.pk, paper.pk)
+        self.assertEqual((stored.version, stored.text_content), (2, "new text"))
+        self.assertFalse(PaperSummary.objects.filter(file_name='arxiv:2101.00001v1').exists())
+
+    def test_unversioned_row_keeps_its_name(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001', text_content="old text", pdf_sha256='a' * 64)
+        with mock.patch.object(views, 'fetch_paper_data', return_value={'pdf_url': 'https://arxiv.org/pdf/2101.00001v2.pdf'}), \
+                mock.patch.object(views, 'store_preprint_pdf', return_value='a' * 64):
+            revalidation.reingest(paper, 2)
+        paper.refresh_from_db()
+        self.assertEqual((paper.file_name, paper.version), ('arxiv:2101.00001', 2))
+
+    def test_existing_row_for_new_version_is_not_duplicated(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="v1 text")
+        PaperSummary.objects.create(file_name='arxiv:2101.00001v2', text_content="v2 text")
+        with mock.patch.object(views, 'fetch_paper_data') as fetch:
+            self.assertFalse(revalidation.reingest(paper, 2))
+        fetch.assert_not_called()
+        paper.refresh_from_db()
+        self.assertEqual((paper.file_name, paper.text_content), ('arxiv:2101.00001v1', "v1 text"))
+
+    def test_reingest_without_metadata_keeps_paper(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="old text")
+        with mock.patch.object(views, 'fetch_paper_data', return_value=None):
+            self.assertFalse(revalidation.reingest(paper, 2))
+        paper.refresh_from_db()
+        self.assertEqual(paper.version, 1)
+
+
+def _make_pdf(pages, title="A Test Paper", author="A. Author"):
+    """PDF bytes with one page per list of lines."""
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer)
+    pdf.setTitle(title)
+    pdf.setAuthor(author)
+    for lines in pages:
+        y = 800
+        for line in lines:
+            pdf.drawString(72, y, line)
+            y -= 14
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _numbered_pages(count):
+    return [[f"Page {number} line {line} of the body text." for line in range(5)] for number in range(1, count + 1)]
+
+
+@override_settings(PDF_EXTRACTION_ENGINE='pypdf2', PDF_EXTRACTION_FALLBACK_ENGINES=[], PDF_EXTRACT_WORKERS=2)
+class ParallelExtractionTests(TestCase):
+    def test_page_ranges_cover_every_page_once(self):
+        self.assertEqual(list(extraction._page_ranges(10, 4)), [(0, 3), (3, 6), (6, 8), (8, 10)])
+        self.assertEqual(list(extraction._page_ranges(2, 4)), [(0, 1), (1, 2)])
+
+    def test_parallel_matches_serial(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = os.path.join(tmp_dir.name, 'paper.pdf')
+        with open(path, 'wb') as f:
+            f.write(_make_pdf(_numbered_pages(6)))
+        serial = extraction.extract_text_and_metadata_from_pdf(path, parallel=False)
+        parallel = extraction.extract_text_and_metadata_from_pdf(path, parallel=True)
+        self.assertEqual(parallel, serial)
+        text, title, authors = serial
+        self.assertLess(text.index("Page 1 line 0"), text.index("Page 6 line 4"))
+        self.assertEqual((title, authors), ("A Test Paper", "A. Author"))
+
+
+@override_settings(CELERY_BROKER_URL='')
+class FullTextSchedulingTests(TestCase):
+    def _partial_paper(self):
+        return PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="first pages", extraction_profile='until_references')
+
+    def test_paper_is_scheduled_once(self):
+        paper = self._partial_paper()
+        with mock.patch.object(fulltext.threading, 'Thread') as thread:
+            self.assertTrue(fulltext.schedule_full_extraction(paper))
+            self.assertFalse(fulltext.schedule_full_extraction(PaperSummary.objects.get(pk=paper.pk)))
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once_with()
+
+    def test_full_paper_is_not_scheduled(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="everything")
+        with mock.patch.object(fulltext.threading, 'Thread') as thread:
+            self.assertFalse(fulltext.schedule_full_extraction(paper))
+        thread.assert_not_called()
+
+    @override_settings(FULL_TEXT_RESCHEDULE_AFTER=60)
+    def test_stale_mark_is_rescheduled(self):
+        paper = self._partial_paper()
+        PaperSummary.objects.filter(pk=paper.pk).update(full_text_requested_at=timezone.now() - timedelta(minutes=5))
+        with mock.patch.object(fulltext.threading, 'Thread') as thread:
+            self.assertTrue(fulltext.schedule_full_extraction(paper))
+        thread.assert_called_once()
+
+    def test_thread_extracts_without_process_pool(self):
+        with mock.patch.object(fulltext, 'complete_full_text') as complete, mock.patch.object(fulltext, 'connection'):
+            fulltext._complete_in_thread(7)
+        complete.assert_called_once_with(7, parallel=False)
+
+    def test_detailed_summary_uses_text_completed_meanwhile(self):
+        paper = self._partial_paper()
+        PaperSummary.objects.filter(pk=paper.pk).update(text_content="all pages", extraction_profile='full')
+        with mock.patch.object(fulltext, 'ensure_full_text') as ensure:
+            self.assertEqual(fulltext.text_for_summary(paper, 'detailed'), "all pages")
+        ensure.assert_not_called()
+        self.assertEqual(paper.extraction_profile, 'full')
+
+    def test_short_summary_keeps_partial_text(self):
+        paper = self._partial_paper()
+        with mock.patch.object(fulltext.threading, 'Thread') as thread:
+            self.assertEqual(fulltext.text_for_summary(paper, 'short'), "first pages")
+        thread.assert_not_called()
+
+
+class _FakeEngine(extraction_engines.ExtractionEngine):
+    """Engine returning fixed page texts, or raising on open()."""
+
+    def __init__(self, name, pages=None, error=None):
+        self.name = name
+        self.pages = pages or []
+        self.error = error
+
+    def open(self, source):
+        if self.error:
+            raise self.error
+        return self.pages
+
+    def page_count(self, document):
+        return len(document)
+
+    def page_text(self, document, index):
+        return document[index]
+
+
+@override_settings(PDF_EXTRACTION_MIN_CHARS_PER_PAGE=20)
+class ExtractionEngineTests(TestCase):
+    def _engines(self, *engines):
+        return mock.patch.dict(extraction_engines.ENGINES, {engine.name: engine for engine in engines})
+
+    def test_unknown_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            extraction_engines.get_engine('no-such-engine')
+
+    def test_failing_engine_falls_back(self):
+        broken = _FakeEngine('broken', error=RuntimeError("cannot parse"))
+        working = _FakeEngine('working', pages=["A page with plenty of extracted text."])
+        with self._engines(broken, working), \
+                self.settings(PDF_EXTRACTION_ENGINE='broken', PDF_EXTRACTION_FALLBACK_ENGINES=['working']):
+            text, _, _ = extraction.extract_text_and_metadata_from_bytes(b'%PDF', parallel=False)
+        self.assertIn("plenty of extracted text", text)
+
+    def test_sparse_text_tries_next_engine_and_keeps_richest(self):
+        sparse = _FakeEngine('sparse', pages=["x", "y"])
+        rich = _FakeEngine('rich', pages=["The first page, read properly.", "The second page, read properly."])
+        with self._engines(sparse, rich), \
+                self.settings(PDF_EXTRACTION_ENGINE='sparse', PDF_EXTRACTION_FALLBACK_ENGINES=['rich']):
+            text, _, _ = extraction.extract_text_and_metadata_from_bytes(b'%PDF', parallel=False)
+        self.assertIn("second page, read properly", text)
+
+    def test_sufficient_text_skips_fallbacks(self):
+        primary = _FakeEngine('primary', pages=["Enough text on this single page."])
+        fallback = _FakeEngine('fallback', error=AssertionError("must not be used"))
+        with self._engines(primary, fallback), \
+                self.settings(PDF_EXTRACTION_ENGINE='primary', PDF_EXTRACTION_FALLBACK_ENGINES=['fallback']):
+            text, _, _ = extraction.extract_text_and_metadata_from_bytes(b'%PDF', parallel=False)
+        self.assertIn("Enough text", text)
+
+    def test_last_engine_error_is_raised(self):
+        broken = _FakeEngine('broken', error=RuntimeError("cannot parse"))
+        with self._engines(broken), self.settings(PDF_EXTRACTION_ENGINE='broken', PDF_EXTRACTION_FALLBACK_ENGINES=[]):
+            with self.assertRaises(RuntimeError):
+                extraction.extract_text_and_metadata_from_bytes(b'%PDF', parallel=False)
+
+
+class ExtractionCacheTests(TestCase):
+    def test_hit_skips_extraction(self):
+        extraction_cache.store('a' * 64, 'full', "cached text", "Title", "Author")
+        with mock.patch.object(extraction_cache, 'extract_text_and_metadata_from_pdf') as extract:
+            result = extraction_cache.extract_cached('a' * 64, '/tmp/unused.pdf')
+        self.assertEqual(result, ("cached text", "Title", "Author", 'full'))
+        extract.assert_not_called()
+
+    def test_miss_extracts_and_stores_compressed(self):
+        with mock.patch.object(extraction_cache, 'extract_text_and_metadata_from_bytes', return_value=("new text", "T", "A")) as extract:
+            result = extraction_cache.extract_cached('b' * 64, b'%PDF', profile='until_references')
+        extract.assert_called_once_with(b'%PDF', parallel=None, profile='until_references')
+        self.assertEqual(result, ("new text", "T", "A", 'until_references'))
+        entry = ExtractedText.objects.get(pdf_sha256='b' * 64)
+        self.assertEqual((entry.profile, entry.text_length), ('until_references', len("new text")))
+
+    def test_wider_profile_satisfies_narrower_request(self):
+        extraction_cache.store('c' * 64, 'full', "whole paper", "", "")
+        self.assertEqual(extraction_cache.lookup('c' * 64, 'until_references')[3], 'full')
+
+    def test_narrower_profile_does_not_satisfy_full_request(self):
+        extraction_cache.store('c' * 64, 'until_references', "first pages", "", "")
+        self.assertIsNone(extraction_cache.lookup('c' * 64, 'full'))
+
+    def test_engine_change_invalidates_entries(self):
+        extraction_cache.store('d' * 64, 'full', "old engine text", "", "")
+        with mock.patch.object(extraction_cache, 'extractor_version', return_value='v999:other-engine'):
+            self.assertIsNone(extraction_cache.lookup('d' * 64))
+
+
+SAMPLE_PAPER = (
+    "A Study of Things\nA. Author\n"
+    "Abstract\nWe study things.\n"
+    "1 Introduction\nThings matter.\n"
+    "2. Methods\nWe measured things.\n"
+    "3 Results\nThings went well.\n"
+    "4 Conclusion\nThings are good.\n"
+    "References\n[1] Results of prior work on things.\nConclusion of an old paper.\n"
+    "Appendix A\nExtra tables.\n"
+)
+
+
+class SectionTests(TestCase):
+    def test_segments_cover_text_at_headings(self):
+        found = sections.segment_text(SAMPLE_PAPER)
+        self.assertEqual(
+            [section['kind'] for section in found],
+            ['front', 'abstract', 'introduction', 'methods', 'results', 'conclusion', 'references', 'appendix'],
+        )
+        self.assertEqual("".join(SAMPLE_PAPER[section['start']:section['end']] for section in found), SAMPLE_PAPER)
+
+    def test_inline_abstract_is_recognized(self):
+        found = sections.segment_text("Title\nAbstract. We study things.\nIntroduction\nMore.\n")
+        self.assertEqual([section['kind'] for section in found], ['front', 'abstract', 'introduction'])
+
+    def test_store_and_load_sections(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content=SAMPLE_PAPER)
+        sections.store_sections(paper)
+        self.assertEqual(PaperSection.objects.filter(paper_summary=paper).count(), 8)
+        paper.refresh_from_db()
+        self.assertGreater(paper.token_count, 0)
+        loaded = sections.load_sections(paper, (sections.ABSTRACT, sections.CONCLUSION))
+        self.assertEqual(list(loaded), ['abstract', 'conclusion'])
+        self.assertIn("Things are good.", loaded['conclusion'])
+
+    def test_sections_are_created_on_first_load(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content=SAMPLE_PAPER)
+        self.assertIn("We study things.", sections.load_sections(paper, (sections.ABSTRACT,))['abstract'])
+
+    def test_selection_follows_priority_and_document_order(self):
+        texts = {'abstract': "abstract " * 10, 'introduction': "intro " * 400, 'conclusion': "conclusion " * 10}
+        selected = sections.select_sections(texts, sections.QUESTION_SECTIONS, 50)
+        self.assertLess(selected.index("abstract"), selected.index("conclusion"))
+        self.assertNotIn("intro " * 400, selected)
+
+
+def _page(number, body):
+    return '\n'.join(["Journal of Testing, Vol. 3", *body, str(number)])
+
+
+class PreprocessingTests(TestCase):
+    def test_keeps_table_rows_and_drops_page_furniture(self):
+        table = ["Model Accuracy Recall", "0.91 0.88 0.87", "0.91 0.88 0.87", "0.91 0.88 0.87"]
+        pages = [
+            _page(1, ["Introduction to the first page.", "The answer is", "42", "as shown below."]),
+            _page(2, ["Results are listed in the table.", *table, "The table ends here."]),
+            _page(3, ["Discussion of the third page.", "More discussion follows."]),
+        ]
+        text = preprocess_text(PAGE_SEPARATOR.join(pages))
+        self.assertNotIn("Journal of Testing", text)
+        self.assertEqual(text.count("0.91 0.88 0.87"), 3)
+        self.assertIn("Model Accuracy Recall", text)
+        self.assertIn("\n42\n", text)
+        self.assertFalse({"1", "2", "3"} & set(text.split('\n')))
+        self.assertTrue(text.rstrip().endswith("More discussion follows."))
+
+    def test_stored_text_has_no_page_breaks(self):
+        pages = [_page(1, ["First page body."]), _page(2, ["Second page body."]), _page(3, ["Third page body."])]
+        text = strip_page_breaks(PAGE_SEPARATOR.join(pages))
+        self.assertNotIn("\f", text)
+        self.assertNotIn("Journal of Testing", text)
+        self.assertIn("First page body.\nSecond page body.", text)
+
+    def test_full_text_is_saved_without_page_breaks(self):
+        paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="first pages", extraction_profile='until_references')
+        fulltext._save_full_text(paper, PAGE_SEPARATOR.join(["Page one.", "Page two."]), 'a' * 64)
+        paper.refresh_from_db()
+        self.assertEqual(paper.text_content, "Page one.\nPage two.")
+
+
+def _long_text(count):
+    topics = ["neural networks", "protein folding", "graph theory", "climate models"]
+    return "\n\n".join(
+        f"Sentence {index} discusses {topics[index % len(topics)]} and its results in detail." for index in range(count)
+    )
+
+
+class CompressionTests(TestCase):
+    def test_text_within_budget_is_unchanged(self):
+        text = _long_text(5)
+        self.assertIs(compression.compress_text(text, 10000), text)
+
+    def test_compressed_text_fits_budget_and_keeps_order(self):
+        text = _long_text(200)
+        for method in ('textrank', 'centroid'):
+            with self.subTest(method=method):
+                compressed = compression.compress_text(text, 300, method)
+                self.assertLessEqual(estimate_tokens(compressed), 300)
+                numbers = [int(part.split()[0]) for part in compressed.split("Sentence ")[1:]]
+                self.assertTrue(numbers)
+                self.assertEqual(numbers, sorted(numbers))
+
+    def test_long_text_is_ranked_in_blocks(self):
+        with mock.patch.object(compression, 'MAX_BLOCK_SENTENCES', 50):
+            compressed = compression.compress_text(_long_text(200), 300)
+        self.assertLessEqual(estimate_tokens(compressed), 300)
+
+    @override_settings(SUMMARY_TOKEN_BUDGETS={'short': 100, 'ordinary': 300, 'detailed': None})
+    def test_largest_budget_wins_and_none_disables(self):
+        text = _long_text(200)
+        self.assertGreater(estimate_tokens(compression.compress_for_summaries(text, ['short', 'ordinary'])), 100)
+        self.assertIs(compression.compress_for_summaries(text, ['short', 'detailed']), text)
+
+    def test_without_numpy_text_is_unchanged(self):
+        text = _long_text(200)
+        with mock.patch.object(compression, 'np', None):
+            self.assertIs(compression.compress_text(text, 100), text)
+
+
+class MapReduceTests(TestCase):
+    def test_chunks_respect_budget_and_lose_no_text(self):
+        paragraphs = ["Short one. " + "A longer sentence about the method and its results. " * 30 + "Ok."] * 4 + ["Tiny."]
+        text = "\n\n".join(paragraphs)
+        chunks = map_reduce.chunk_text(text, 100)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 100)
+        self.assertEqual("".join("".join(chunks).split()), "".join(text.split()))
+
+    def test_partials_are_reduced_in_order(self):
+        with self.settings(SUMMARY_MAP_REDUCE_CHUNK_TOKENS=20, SUMMARY_MAP_REDUCE_WORKERS=3):
+            text = "\n\n".join(f"Paragraph {index} has a few words in it." for index in range(6))
+            summary, timings = map_reduce.map_reduce_summarize(
+                text, lambda chunk, index, count: f"part {index}/{count}" if index != 1 else None, lambda partials: " | ".join(partials),
+            )
+        self.assertTrue(summary.startswith("part 0/"))
+        self.assertNotIn("part 1/", summary)
+        self.assertEqual(set(timings), {'split', 'map', 'reduce'})
+
+    @override_settings(SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS=None)
+    def test_threshold_none_disables_map_reduce(self):
+        self.assertFalse(map_reduce.should_map_reduce("word " * 100000))
+
+
+class PromptBudgetTests(TestCase):
+    def _context(self):
+        return "\n\n".join(f"Paragraph {index} reports one finding of the study in plain words." for index in range(200))
+
+    def test_prompt_fits_budget_and_keeps_instructions_and_suffix(self):
+        instructions, suffix = "Answer using the paper below.\n\n", "\n\nQuestion: what was found?"
+        for budget in range(100, 600, 7):
+            with self.subTest(budget=budget), self.settings(LLM_PROMPT_TOKEN_BUDGETS={'question': budget}):
+                prompt, prompt_tokens = prompts.build_prompt('question', instructions, self._context(), suffix)
+                self.assertTrue(prompt.startswith(instructions))
+                self.assertTrue(prompt.endswith(suffix))
+                self.assertIn(prompts.TRUNCATION_MARKER, prompt)
+                self.assertLessEqual(estimate_tokens(prompt), budget)
+                self.assertLessEqual(prompt_tokens, budget)
+
+    @override_settings(LLM_PROMPT_TOKEN_BUDGETS={'summary': None})
+    def test_no_budget_keeps_whole_context(self):
+        context = self._context()
+        prompt, _ = prompts.build_prompt('summary', "Summarize:\n", context)
+        self.assertEqual(prompt, "Summarize:\n" + context)
+
+    @override_settings(LLM_PROMPT_TOKEN_BUDGETS={})
+    def test_missing_operation_uses_default_budget(self):
+        self.assertEqual(prompts.prompt_budget('question'), prompts.DEFAULT_PROMPT_BUDGETS['question'])
+
+    def test_cut_falls_on_paragraph_or_sentence_boundary(self):
+        fitted = prompts.fit_to_budget(self._context(), 100)
+        body = fitted[:-len(prompts.TRUNCATION_MARKER)]
+        self.assertTrue(all(paragraph.endswith("plain words.") for paragraph in body.split("\n\n")))
+        self.assertEqual(prompts.fit_to_budget("some text", 0), '')
+
+
+class BatchSummaryTests(TestCase):
+    def test_parser_keeps_only_requested_non_empty_items(self):
+        raw = json.dumps({
+            'en': {'short': " Short text. ", 'ordinary': "", 'detailed': "not requested"},
+            'ru': "not an object",
+            'de': {'short': "nicht angefragt"},
+        })
+        self.assertEqual(views._parse_batch_summaries(raw, ['en', 'ru'], ['short', 'ordinary']), {('en', 'short'): "Short text."})
+
+    def test_parser_rejects_invalid_json(self):
+        self.assertEqual(views._parse_batch_summaries("not json", ['en'], ['short']), {})
+        self.assertEqual(views._parse_batch_summaries("[1, 2]", ['en'], ['short']), {})
+        self.assertEqual(views._parse_batch_summaries(None, ['en'], ['short']), {})
+
+    @override_settings(SUMMARY_EXTRACTIVE_COMPRESSION=False, SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS=None)
+    def test_missing_items_are_written_one_by_one(self):
+        model = mock.Mock()
+        model.generate_content.return_value = mock.Mock(text=json.dumps({'en': {'short': "batched"}}), usage_metadata=None)
+        with mock.patch.object(views.llm, 'get_model', return_value=model), \
+                mock.patch.object(views, 'summarize_text_gemini', return_value="single") as single:
+            summaries = views.summarize_batch_gemini("paper text", ['en', 'ru'], ['short'])
+        self.assertEqual(summaries, {('en', 'short'): "batched", ('ru', 'short'): "single"})
+        single.assert_called_once_with("paper text", 'ru', 'short', compress=False)
+        model.generate_content.assert_called_once()
+
+
+class TranslationTests(TestCase):
+    def setUp(self):
+        self.paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="paper text")
+
+    def test_missing_language_is_translated_from_original(self):
+        original = views.save_summary(self.paper, 'en', 'short', "English summary")
+        views.save_summary(self.paper, 'de', 'short', "Deutsch", source=original)
+        with mock.patch.object(views, 'translate_summary_gemini', return_value="Русский") as translate, \
+                mock.patch.object(views, 'summarize_text_gemini') as summarize:
+            summary = views.write_summary(self.paper, 'ru', 'short')
+        translate.assert_called_once_with("English summary", 'en', 'ru')
+        summarize.assert_not_called()
+        self.assertEqual((summary.summary_text, summary.derived_from), ("Русский", original))
+
+    def test_failed_translation_summarizes_paper(self):
+        views.save_summary(self.paper, 'en', 'short', "English summary")
+        with mock.patch.object(views, 'translate_summary_gemini', return_value=None), \
+                mock.patch.object(views, 'summarize_text_gemini', return_value="Резюме") as summarize:
+            summary = views.write_summary(self.paper, 'ru', 'short')
+        summarize.assert_called_once()
+        self.assertIsNone(summary.derived_from)
+
+    @override_settings(SUMMARY_LANGUAGE_POLICY='summarize')
+    def test_summarize_policy_never_translates(self):
+        views.save_summary(self.paper, 'en', 'short', "English summary")
+        self.assertIsNone(views._summary_source(self.paper, 'ru', 'short'))
+
+    def test_rewriting_drops_translations_transitively(self):
+        original = views.save_summary(self.paper, 'en', 'short', "English summary")
+        russian = views.save_summary(self.paper, 'ru', 'short', "Русский", source=original)
+        views.save_summary(self.paper, 'uz', 'short', "O'zbek", source=russian)
+        views.save_summary(self.paper, 'en', 'detailed', "Unrelated summary")
+        views.save_summary(self.paper, 'en', 'short', "Rewritten English summary")
+        self.assertEqual(
+            sorted(LocalizedPaperSummary.objects.filter(paper_summary=self.paper).values_list('language', 'summary_type')),
+            [('en', 'detailed'), ('en', 'short')],
+        )
+
+    def test_rewrite_of_existing_summary_summarizes_paper(self):
+        views.save_summary(self.paper, 'en', 'short', "English summary")
+        views.save_summary(self.paper, 'ru', 'short', "Русский")
+        self.assertIsNone(views._summary_source(self.paper, 'ru', 'short', rewrite=True))
+        self.assertIn(views._summary_source(self.paper, 'uz', 'short', rewrite=True).language, ('en', 'ru'))
+
+
+@override_settings(GEMINI_API_KEY='test-key', GEMINI_MODEL='test-model')
+class ModelCacheTests(TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(llm, '_models', {}),
+            mock.patch.object(llm, '_configured', False),
+            mock.patch.object(llm.genai, 'configure'),
+            mock.patch.object(llm.genai, 'GenerativeModel', side_effect=lambda **kwargs: mock.Mock(**kwargs)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_same_configuration_shares_one_model(self):
+        first = llm.get_model(temperature=0.7)
+        self.assertIs(llm.get_model(temperature=0.7), first)
+        self.assertIsNot(llm.get_model(temperature=0.2), first)
+        self.assertEqual(llm.genai.GenerativeModel.call_count, 2)
+        llm.genai.configure.assert_called_once_with(api_key='test-key')
+
+    @override_settings(GEMINI_API_KEY='')
+    def test_missing_api_key_returns_none(self):
+        self.assertIsNone(llm.get_model())
+        llm.genai.GenerativeModel.assert_not_called()
+
+
+@override_settings(LLM_SINGLE_FLIGHT_POLL_INTERVAL=0, LLM_SINGLE_FLIGHT_WAIT_SECONDS=5)
+class SingleFlightTests(TestCase):
+    def _hold_lock(self, key, expires_in=60):
+        GenerationLock.objects.create(key=key, owner='other-worker', expires_at=timezone.now() + timedelta(seconds=expires_in))
+
+    def test_stored_result_skips_generation(self):
+        generate = mock.Mock()
+        self.assertEqual(singleflight.single_flight('key', lambda: "stored", generate), "stored")
+        generate.assert_not_called()
+
+    def test_generates_once_and_releases_lock(self):
+        generate = mock.Mock(return_value="generated")
+        self.assertEqual(singleflight.single_flight('key', lambda: None, generate), "generated")
+        generate.assert_called_once_with()
+        self.assertFalse(GenerationLock.objects.filter(key='key').exists())
+
+    def test_result_stored_before_lock_is_taken_is_used(self):
+        lookup = mock.Mock(side_effect=[None, "stored meanwhile"])
+        generate = mock.Mock()
+        self.assertEqual(singleflight.single_flight('key', lookup, generate), "stored meanwhile")
+        generate.assert_not_called()
+
+    def test_waits_for_the_lock_holder(self):
+        self._hold_lock('key')
+        lookup = mock.Mock(side_effect=[None, None, "from the other worker"])
+        generate = mock.Mock()
+        self.assertEqual(singleflight.single_flight('key', lookup, generate), "from the other worker")
+        generate.assert_not_called()
+
+    def test_takes_over_an_expired_lock(self):
+        self._hold_lock('key', expires_in=-1)
+        generate = mock.Mock(return_value="generated")
+        self.assertEqual(singleflight.single_flight('key', lambda: None, generate), "generated")
+        generate.assert_called_once_with()
+
+
+def _events(response):
+    """(event, data) pairs of a Server-Sent Events response."""
+    body = b"".join(response.streaming_content).decode('utf-8')
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@override_settings(LLM_SINGLE_FLIGHT_POLL_INTERVAL=0)
+class StreamingTests(TestCase):
+    def setUp(self):
+        self.paper = PaperSummary.objects.create(file_name='arxiv:2101.00001v1', text_content="Abstract\nWe study things.\n")
+        self.factory = RequestFactory()
+
+    def _stream_summary(self, **data):
+        request = self.factory.post('/papers/stream/summary/', {'language': 'en', 'summary_type': 'short', **data})
+        return views.stream_summary(request, self.paper.pk)
+
+    def _stream_answer(self, question):
+        request = self.factory.post('/papers/stream/answer/', {'language': 'en', 'question': question})
+        return views.stream_answer(request, self.paper.pk)
+
+    def test_summary_is_streamed_then_stored(self):
+        with mock.patch.object(views, 'stream_summary_gemini', return_value=iter(["Part one. ", "Part two."])):
+            response = self._stream_summary()
+            events = _events(response)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual([event for event, _ in events], ['start', 'chunk', 'chunk', 'done'])
+        self.assertEqual(events[-1][1], {'text': "Part one. Part two.", 'cached': False})
+        self.assertEqual(LocalizedPaperSummary.objects.get(paper_summary=self.paper, language='en', summary_type='short').summary_text, "Part one. Part two.")
+
+    def test_stored_summary_is_sent_whole(self):
+        views.save_summary(self.paper, 'en', 'short', "Stored summary")
+        with mock.patch.object(views, 'stream_summary_gemini') as stream:
+            events = _events(self._stream_summary())
+        stream.assert_not_called()
+        self.assertEqual(events[-1], ('done', {'text': "Stored summary", 'cached': True}))
+
+    def test_failed_generation_sends_error_and_stores_nothing(self):
+        with mock.patch.object(views, 'stream_summary_gemini', side_effect=RuntimeError("model unavailable")):
+            events = _events(self._stream_summary())
+        self.assertEqual(events[-1][0], 'error')
+        self.assertFalse(LocalizedPaperSummary.objects.filter(paper_summary=self.paper).exists())
+
+    def test_answer_is_streamed_then_stored(self):
+        with mock.patch.object(views, 'stream_answer_gemini', return_value=iter(["Forty", "-two."])):
+            events = _events(self._stream_answer("What Is The Answer?"))
+        self.assertEqual(events[-1], ('done', {'text': "Forty-two.", 'cached': False}))
+        self.assertEqual(QuestionAnswer.objects.get(paper_summary=self.paper, question="what is the answer?").answer, "Forty-two.")
+
+    def test_invalid_question_is_rejected(self):
+        self.assertEqual(self._stream_answer('').status_code, 400)
+
+    def test_missing_summary_can_be_written_without_javascript(self):
+        response = views.upload_success(self.factory.get('/papers/success/', {'summary_type': 'short'}), self.paper.pk)
+        self.assertContains(response, 'name="write_summary"')
+        request = self.factory.post('/papers/success/', {'language': 'en', 'summary_type': 'short', 'write_summary': 'true'})
+        with mock.patch.object(views, 'summarize_text_gemini', return_value="Server-side summary"):
+            response = views.upload_success(request, self.paper.pk)
+        self.assertContains(response, "Server-side summary")
+        self.assertNotContains(response, 'name="write_summary"')
@@ -0,0 +1,13 @@
+import re
+
+# Gemini tokenizes English prose at roughly 4 characters per token; words and
+# punctuation runs are a closer proxy for text with many short tokens (formulas, Cyrillic).
+CHARS_PER_TOKEN = 4
+WORD_RE = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+
+def estimate_tokens(text):
+    """Cheap, offline estimate of the number of model tokens in text."""
+    if not text:
+        return 0
+    return max(len(text) // CHARS_PER_TOKEN, len(WORD_RE.findall(text)) * 3 // 4)
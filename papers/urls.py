@@ -8,4 +8,6 @@ urlpatterns = [
     path("download/original/<str:arxiv_id>/", views.download_original_pdf, name="download_original_pdf"),
     path("search/", views.search_articles, name="search_articles"),
     path('paper/<str:arxiv_id>/', views.paper_summary, name='paper_summary'),
+    path("stream/summary/<str:pk>/", views.stream_summary, name="stream_summary"),
+    path("stream/answer/<str:pk>/", views.stream_answer, name="stream_answer"),
 ]
\ No newline at end of file
@@ -1,9 +1,9 @@
 import os
+import codecs
+import json
 import requests
-import spacy
-import PyPDF2
-import google.generativeai as genai
 import logging
+import time
 import arxiv
 from bs4 import BeautifulSoup
 from django.shortcuts import render, redirect, get_object_or_404
@@ -11,7 +11,23 @@ from django.urls import reverse
 from django.utils.translation import gettext_lazy as _, get_language, activate
 from .forms import PaperUploadForm, QuestionForm
 from .models import PaperSummary, QuestionAnswer, LocalizedPaperSummary
+from . import http_client, llm
+from .extraction import profile_for_summary_type
+from .extraction_cache import extract_cached
+from .fulltext import question_context, text_for_summary
+from .sections import store_sections
+from .preprocessing import preprocess_text, strip_page_breaks
+from .compression import compress_for_summaries, compress_for_summary
+from .map_reduce import map_reduce_summarize, should_map_reduce
+from .prompts import build_prompt, log_token_usage
+from .singleflight import flight_lock, question_key, single_flight, summary_key
+from .pdf_store import pdf_store
+from .identifiers import split_version
+from .meta_parser import parse_citation_meta, has_required_metadata
+from .metadata_cache import metadata_cache, TransientFetchError, TRANSIENT_ERROR
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 from io import BytesIO
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import ParagraphStyle
@@ -20,7 +36,8 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, FileResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 
 logger = logging.getLogger(__name__)
 
@@ -52,113 +69,20 @@ try:
 except Exception as e:
     logger.error(f"Ошибка при регистрации шрифтов NotoSans: {e}")
 
-def fetch_paper_data(repository, paper_id):
-    """Fetch PDF URL and metadata for a paper from the specified repository."""
-    if repository == 'arxiv':
-        pdf_url = f"https://arxiv.org/pdf/{paper_id}.pdf"
-        abs_url = f"https://arxiv.org/abs/{paper_id}"
-        try:
-            client = arxiv.Client()
-            search = arxiv.Search(id_list=[paper_id])
-            result = next(client.results(search), None)
-            if result:
-                return {
-                    'pdf_url': pdf_url,
-                    'abs_url': abs_url,
-                    'title': result.title,
-                    'authors': ", ".join(author.name for author in result.authors),
-                    'abstract': result.summary
-                }
-        except Exception as e:
-            logger.error(f"arXiv API error for ID {paper_id}: {e}")
-    elif repository in ['medrxiv', 'biorxiv']:
-        base_url = 'https://www.medrxiv.org' if repository == 'medrxiv' else 'https://www.biorxiv.org'
-        pdf_url = f"{base_url}/content/10.1101/{paper_id}v1.full.pdf"
-        abs_url = f"{base_url}/content/10.1101/{paper_id}v1"
-        try:
-            response = requests.get(abs_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # Extract title
-            title_tag = soup.find('h1', class_=['highwire-cite-title', 'article-title'])
-            title = title_tag.text.strip() if title_tag else ''
-            # Extract authors
-            authors = []
-            author_tags = soup.select('div.highwire-cite-authors span.author-name, div.authors-list a.author-name')
-            for author in author_tags:
-                author_name = author.text.strip()
-                if author_name:
-                    authors.append(author_name)
-            authors_str = ", ".join(authors) if authors else ''
-            # Extract abstract
-            abstract_tag = soup.find('div', class_=['section abstract', 'abstract-content'])
-            abstract = abstract_tag.text.strip() if abstract_tag else ''
-            # Print to console for debugging
-            print(f"Scraped {repository} metadata for ID {paper_id}:")
-            print(f"Title: {title}")
-            print(f"Authors: {authors_str}")
-            logger.debug(f"Scraped {repository} metadata for ID {paper_id}: Title='{title}', Authors='{authors_str}', Abstract='{abstract[:50]}...'")
-            return {
-                'pdf_url': pdf_url,
-                'abs_url': abs_url,
-                'title': title,
-                'authors': authors_str,
-                'abstract': abstract
-            }
-        except requests.exceptions.Timeout:
-            logger.error(f"Timeout fetching {repository} metadata for ID {paper_id}")
-            return None
-        except Exception as e:
-            logger.error(f"{repository.capitalize()} fetch error for ID {paper_id}: {e}")
-            return None
-    elif repository == 'chemrxiv':
-        abs_url = f"https://chemrxiv.org/engage/chemrxiv/article-details/{paper_id}"
-        try:
-            response = requests.get(abs_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title_tag = soup.find('h1', class_='article-title')
-            title = title_tag.text.strip() if title_tag else ''
-            authors_tag = soup.find('div', class_='article-authors')
-            authors = authors_tag.text.strip() if authors_tag else ''
-            abstract_tag = soup.find('div', class_='abstract-content')
-            abstract = abstract_tag.text.strip() if abstract_tag else ''
-            pdf_link = soup.find('a', href=lambda href: href and '.pdf' in href)
-            pdf_url = pdf_link['href'] if pdf_link else abs_url
-            print(f"Scraped ChemRxiv metadata for ID {paper_id}:")
-            print(f"Title: {title}")
-            print(f"Authors: {authors}")
-            logger.debug(f"Scraped ChemRxiv metadata for ID {paper_id}: Title='{title}', Authors='{authors}', Abstract='{abstract[:50]}...'")
-            return {
-                'pdf_url': pdf_url,
-                'abs_url': abs_url,
-                'title': title,
-                'authors': authors,
-                'abstract': abstract
-            }
-        except requests.exceptions.Timeout:
-            logger.error(f"Timeout fetching ChemRxiv metadata for ID {paper_id}")
-            return None
-        except Exception as e:
-            logger.error(f"ChemRxiv fetch error for ID {paper_id}: {e}")
-            return None
-    return None
-
-def download_preprint_pdf(repository, paper_id, save_dir):
-    """Download PDF from the specified repository."""
-    data = fetch_paper_data(repository, paper_id)
+def store_preprint_pdf(repository, paper_id, data=None):
+    """Download PDF from the specified repository into the content-addressed store; return its SHA-256."""
+    if data is None:
+        data = fetch_paper_data(repository, paper_id)
     if not data or not data.get('pdf_url'):
         return None
-    file_path = os.path.join(save_dir, f"{paper_id}.pdf")
-    os.makedirs(save_dir, exist_ok=True)
     try:
-        response = requests.get(data['pdf_url'], stream=True, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-        response.raise_for_status()
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        logger.info(f"Успешно загружен PDF для {repository} ID {paper_id} в {file_path}")
-        return file_path
+        response = http_client.get(data['pdf_url'], stream=True, timeout=http_client.DOWNLOAD_TIMEOUT)
+        with response:
+            response.raise_for_status()
+            pdf_sha256, size = pdf_store.put_stream(response.iter_content(chunk_size=64 * 1024))
+        pdf_store.remember_alias(f"{repository}:{paper_id}", pdf_sha256)
+        logger.info(f"Успешно загружен PDF для {repository} ID {paper_id} ({size} байт, {pdf_sha256})")
+        return pdf_sha256
     except requests.exceptions.Timeout:
         logger.error(f"Timeout downloading PDF for {repository} ID {paper_id}")
         return None
@@ -169,47 +93,7 @@ def download_preprint_pdf(repository, paper_id, save_dir):
         logger.error(f"Ошибка при сохранении PDF для {repository} ID {paper_id}: {e}")
         return None
 
-def extract_text_and_metadata_from_pdf(file_path):
-    text = ""
-    title = ""
-    authors = ""
-    try:
-        with open(file_path, 'rb') as pdf_file:
-            reader = PyPDF2.PdfReader(pdf_file)
-            if reader.metadata:
-                title = reader.metadata.get('/Title', '').strip()
-                authors = reader.metadata.get('/Author', '').strip()
-                if title.startswith('(\ufeff') or title.startswith('( '):
-                    title = title[1:]
-                if title.endswith(')'):
-                    title = title[:-1]
-                if authors.startswith('(\ufeff') or authors.startswith('( '):
-                    authors = authors[1:]
-                if authors.endswith(')'):
-                    authors = authors[:-1]
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            logger.info(f"Успешно извлечены текст, название и авторы из {file_path}")
-    except Exception as e:
-        logger.error(f"Ошибка при извлечении текста/метаданных из PDF {file_path}: {e}")
-        raise
-    return text, title, authors
-
-def get_gemini_model(model_name='gemini-2.0-flash'):
-    try:
-        return genai.GenerativeModel(model_name=model_name)
-    except Exception as e:
-        logger.error(f"Не удалось получить модель Gemini '{model_name}': {e}")
-        return None
-    
-def answer_question_gemini(text, question, target_language="ru"):
-    logger.debug(f"answer_question_gemini: Attempting to answer question '{question[:50]}...' in language '{target_language}'")
-    model = get_gemini_model()
-    if not model:
-        return _("Error: Could not connect to Gemini API for answering.")
-    
+def _question_prompt(text, question, target_language):
     gemini_target_language = target_language
     if target_language == 'uz':
         gemini_target_language = "Uzbek (Latin script)"
@@ -218,65 +102,469 @@ def answer_question_gemini(text, question, target_language="ru"):
     elif target_language == 'en':
         gemini_target_language = "English"
     
-    prompt = (
+    return build_prompt(
+        'question',
         f"Answer the following question about the provided scientific paper text in {gemini_target_language}. "
         f"Ensure the answer is concise, accurate, and relevant to the question and."
         f"Prioratize answering questions based on the scientific paper text provided. If the question is not answerable based on the text, then you can answer the question based on your knowledge, but you should always try to answer based on your knowledge\n\n"
         f"Use readable text without bold formatting.\n\n"
         f"Question: {question}\n\n"
-        f"Paper Text:\n{text[:2000]}" 
-        f"Answer the questions based on the language '{gemini_target_language}'\n\n"
+        f"Paper Text:\n",
+        text,
+        f"\n\nAnswer the questions based on the language '{gemini_target_language}'\n\n"
     )
-    
+
+def answer_question_gemini(text, question, target_language="ru"):
+    logger.debug(f"answer_question_gemini: Attempting to answer question '{question[:50]}...' in language '{target_language}'")
+    model = llm.get_model(temperature=0.7)
+    if not model:
+        return _("Error: Could not connect to Gemini API for answering.")
+    prompt, prompt_tokens = _question_prompt(text, question, target_language)
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(temperature=0.7)
-        )
+        response = model.generate_content(prompt)
+        log_token_usage('question', prompt_tokens, response)
         return response.text
     except Exception as e:
         logger.error(f"Error answering question with Gemini: {e}")
         return f"Error answering question: {e}"
 
-def summarize_text_gemini(text, target_language="ru", summary_type="ordinary"):
+def _summarize_chunk_gemini(chunk, index, count):
+    model = llm.get_model(temperature=0.3)
+    if not model:
+        return None
+    prompt, prompt_tokens = build_prompt(
+        'summary_chunk',
+        f"This is part {index + 1} of {count} of a scientific paper. "
+        f"Summarize it in English in at most 300 words, keeping the problem statement, methods, "
+        f"numerical results and conclusions it contains. Use plain text without bold formatting.\n\n",
+        chunk
+    )
+    try:
+        response = model.generate_content(prompt)
+        log_token_usage('summary_chunk', prompt_tokens, response)
+        return response.text
+    except Exception as e:
+        logger.error(f"Ошибка суммирования части {index + 1}/{count} Gemini: {e}")
+        return None
+
+def _combine_partials(partials):
+    return "Последовательные summaries частей одной научной статьи:\n\n" + "\n\n".join(partials)
+
+def summarize_map_reduce_gemini(text, target_language="ru", summary_type="ordinary"):
+    """Summarize token-bounded chunks concurrently, then write the requested summary from the partial summaries."""
+    def reduce(partials):
+        if not partials:
+            return _("Ошибка: Не удалось суммировать части статьи.")
+        return summarize_text_gemini(_combine_partials(partials), target_language, summary_type, compress=False, map_reduce=False)
+    summary, timings = map_reduce_summarize(text, _summarize_chunk_gemini, reduce)
+    logger.info(f"Map-reduce summary ({summary_type}, {target_language}): {sum(timings.values()):.2f} с")
+    return summary
+
+def summarize_text_gemini(text, target_language="ru", summary_type="ordinary", compress=True, map_reduce=True):
     logger.debug(f"summarize_text_gemini: Попытка суммирования на языке '{target_language}', тип '{summary_type}'")
-    model = get_gemini_model()
+    if compress:
+        # Long papers are cut down to the summary type's token budget locally before the (slow) model call.
+        text = compress_for_summary(text, summary_type)
+    if map_reduce and should_map_reduce(text):
+        return summarize_map_reduce_gemini(text, target_language, summary_type)
+    model = llm.get_model(temperature=0.7)
     if not model:
         return _("Ошибка: Не удалось подключиться к Gemini API для суммирования.")
+    prompt, prompt_tokens = _summary_prompt(text, target_language, summary_type)
+    try:
+        started = time.monotonic()
+        response = model.generate_content(prompt)
+        logger.info(f"Gemini summary ({summary_type}, {len(text)} символов) за {time.monotonic() - started:.2f} с")
+        log_token_usage('summary', prompt_tokens, response)
+        return response.text
+    except Exception as e:
+        logger.error(f"Ошибка суммирования Gemini: {e}")
+        return f"Ошибка при суммировании текста: {e}"
+
+def _summary_prompt(text, target_language, summary_type):
     gemini_target_language = target_language
     if target_language == 'uz':
         gemini_target_language = "Uzbek (Latin script)"
     elif target_language == 'ru':
         gemini_target_language = "Russian (Cyrillic script)"
     if summary_type == 'short':
-        prompt = (
+        instructions = (
             f"Составьте очень краткий summary следующего текста научной статьи на {gemini_target_language}. "
             f"Сосредоточьтесь только на основном вкладе и ключевом результате, представив текст в одном абзаце из 2-3 предложений. "
-            f"Убедитесь, что текст читаемый и не использует жирный шрифт.\n\n{text}"
+            f"Убедитесь, что текст читаемый и не использует жирный шрифт.\n\n"
         )
     elif summary_type == 'detailed':
-        prompt = (
+        instructions = (
             f"Составьте подробный summary следующего текста научной статьи на {gemini_target_language} в структурированном формате с разделами:\n"
             f"1. Проблема/Пробел\n2. Методология\n3. Ключевые результаты\n4. Вклад/Значение\n5. Ограничения\n6. Будущая работа\n"
             f"Представьте каждый раздел в отдельном абзаце, начиная с номера и заголовка, без жирного шрифта. "
-            f"Убедитесь, что текст читаемый.\n\n{text}"
+            f"Убедитесь, что текст читаемый.\n\n"
         )
     else:  # ordinary
-        prompt = (
+        instructions = (
             f"Составьте стандартный summary следующего текста научной статьи на {gemini_target_language}. "
             f"Представьте текст в 1-3 абзацах, разделяя аспекты: \n"
             f"1. Основная проблема\n2. Методы\n3. Результаты и выводы\n"
-            f"Убедитесь, что текст читаемый и без жирного шрифта.\n\n{text}"
+            f"Убедитесь, что текст читаемый и без жирного шрифта.\n\n"
         )
+    return build_prompt('summary', instructions, text)
+
+SUMMARY_TYPE_INSTRUCTIONS = {
+    'short': "очень краткий summary: один абзац из 2-3 предложений об основном вкладе и ключевом результате",
+    'ordinary': "стандартный summary: 1-3 абзаца об основной проблеме, методах, результатах и выводах",
+    'detailed': "подробный summary с разделами 1. Проблема/Пробел, 2. Методология, 3. Ключевые результаты, "
+                "4. Вклад/Значение, 5. Ограничения, 6. Будущая работа; каждый раздел в отдельном абзаце, начиная с номера и заголовка",
+}
+
+def _gemini_language_name(target_language):
+    return {
+        'uz': "Uzbek (Latin script)",
+        'ru': "Russian (Cyrillic script)",
+        'en': "English",
+    }.get(target_language, target_language)
+
+def _parse_batch_summaries(raw, languages, summary_types):
+    """Pick {(language, summary_type): text} out of the model's JSON; missing or empty items are left out."""
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(temperature=0.7)
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return {}
+    summaries = {}
+    if not isinstance(data, dict):
+        return summaries
+    for language in languages:
+        by_type = data.get(language)
+        if not isinstance(by_type, dict):
+            continue
+        for summary_type in summary_types:
+            text = by_type.get(summary_type)
+            if isinstance(text, str) and text.strip():
+                summaries[(language, summary_type)] = text.strip()
+    return summaries
+
+def summarize_batch_gemini(text, languages, summary_types):
+    """
+    Write every language x summary type combination with one structured (JSON) model call.
+
+    Returns {(language, summary_type): summary}. Items the response does not
+    contain (or a response that is not valid JSON) are produced with
+    per-item summarize_text_gemini calls.
+    """
+    text = compress_for_summaries(text, summary_types)
+
+    def write_all(context):
+        model = llm.get_model(temperature=0.7, response_mime_type='application/json')
+        if not model:
+            return {}
+        layout = {language: {summary_type: "..." for summary_type in summary_types} for language in languages}
+        instructions = (
+            "Составьте summaries следующего текста научной статьи для каждой комбинации языка и типа:\n"
+            + "".join(f"- {summary_type}: {SUMMARY_TYPE_INSTRUCTIONS.get(summary_type, summary_type)}\n" for summary_type in summary_types)
+            + "Языки: " + ", ".join(f"{language} ({_gemini_language_name(language)})" for language in languages) + ".\n"
+            "Текст должен быть читаемым, без жирного шрифта. Ответьте только JSON-объектом вида "
+            f"{json.dumps(layout, ensure_ascii=False)}, где ключи верхнего уровня — коды языков.\n\n"
         )
+        prompt, prompt_tokens = build_prompt('summary', instructions, context)
+        try:
+            started = time.monotonic()
+            response = model.generate_content(prompt)
+            logger.info(f"Gemini batch summary ({len(languages)}x{len(summary_types)}) за {time.monotonic() - started:.2f} с")
+            log_token_usage('summary_batch', prompt_tokens, response)
+            return _parse_batch_summaries(response.text, languages, summary_types)
+        except Exception as e:
+            logger.error(f"Ошибка пакетного суммирования Gemini: {e}")
+            return {}
+
+    if should_map_reduce(text):
+        # One map phase shared by all combinations; the batched call is the reduce step.
+        def reduce(partials):
+            return write_all(_combine_partials(partials)) if partials else {}
+        summaries = map_reduce_summarize(text, _summarize_chunk_gemini, reduce)[0]
+    else:
+        summaries = write_all(text)
+    for language in languages:
+        for summary_type in summary_types:
+            if (language, summary_type) not in summaries:
+                logger.warning(f"Пакетный ответ без summary {language}/{summary_type}, отдельный запрос")
+                summaries[(language, summary_type)] = summarize_text_gemini(text, language, summary_type, compress=False)
+    return summaries
+
+def translate_summary_gemini(summary_text, source_language, target_language):
+    """Translate an existing summary; returns None on failure so the caller can summarize the paper instead."""
+    model = llm.get_model(temperature=0.2)
+    if not model:
+        return None
+    prompt, prompt_tokens = _translation_prompt(summary_text, source_language, target_language)
+    try:
+        response = model.generate_content(prompt)
+        log_token_usage('translation', prompt_tokens, response)
         return response.text
     except Exception as e:
-        logger.error(f"Ошибка суммирования Gemini: {e}")
-        return f"Ошибка при суммировании текста: {e}"
+        logger.error(f"Ошибка перевода summary Gemini ({source_language} -> {target_language}): {e}")
+        return None
+
+def _translation_prompt(summary_text, source_language, target_language):
+    return build_prompt(
+        'translation',
+        f"Translate the following summary of a scientific paper from {_gemini_language_name(source_language)} "
+        f"to {_gemini_language_name(target_language)}. Keep its structure, numbering and technical terms; "
+        f"do not add or drop content. Use readable text without bold formatting. Reply with the translation only.\n\n",
+        summary_text
+    )
+
+def _translation_source(paper_summary_obj, language, summary_type):
+    """
+    The summary a new language version is translated from, or None to summarize the paper.
+
+    With SUMMARY_LANGUAGE_POLICY = 'translate' (default) an existing summary of
+    the same type in another language is translated, a prompt of a few hundred
+    tokens instead of the whole paper; the new row points to it in
+    derived_from. With 'summarize' the paper text is always summarized.
+    """
+    if getattr(settings, 'SUMMARY_LANGUAGE_POLICY', 'translate') != 'translate':
+        return None
+    # Prefer summaries written from the paper itself over translations of translations.
+    return (
+        LocalizedPaperSummary.objects
+        .filter(paper_summary=paper_summary_obj, summary_type=summary_type)
+        .exclude(language=language)
+        .order_by(F('derived_from').asc(nulls_first=True), '-updated_at')
+        .first()
+    )
+
+def _summary_source(paper_summary_obj, language, summary_type, rewrite=False):
+    """
+    Decide how a summary about to be written is produced: the summary to translate, or None to summarize the paper.
+
+    rewrite (the Summarize button) on an existing summary always summarizes
+    the paper again; a missing summary is translated when possible.
+    """
+    if rewrite and LocalizedPaperSummary.objects.filter(paper_summary=paper_summary_obj, language=language, summary_type=summary_type).exists():
+        return None
+    return _translation_source(paper_summary_obj, language, summary_type)
+
+def _drop_translations(localized_summary):
+    """Delete the summaries translated (directly or through other translations) from localized_summary."""
+    stale = list(localized_summary.translations.values_list('pk', flat=True))
+    while stale:
+        # Collect the next level before deleting: derived_from is SET_NULL on delete.
+        next_level = list(LocalizedPaperSummary.objects.filter(derived_from__in=stale).values_list('pk', flat=True))
+        LocalizedPaperSummary.objects.filter(pk__in=stale).delete()
+        stale = next_level
+
+def save_summary(paper_summary_obj, language, summary_type, summary_text, source=None):
+    """Store a summary; translations of its previous text are deleted and translated again on demand."""
+    localized_summary, created = LocalizedPaperSummary.objects.update_or_create(
+        paper_summary=paper_summary_obj,
+        language=language,
+        summary_type=summary_type,
+        defaults={'summary_text': summary_text, 'derived_from': source}
+    )
+    if not created:
+        _drop_translations(localized_summary)
+    return localized_summary
+
+def write_summary(paper_summary_obj, language, summary_type, rewrite=False):
+    """
+    Produce and store a summary without streaming; returns the LocalizedPaperSummary.
+
+    Translates or summarizes as decided by _summary_source; a failed
+    translation falls back to summarizing the paper.
+    """
+    source = _summary_source(paper_summary_obj, language, summary_type, rewrite)
+    summary_content = None
+    if source is not None:
+        summary_content = translate_summary_gemini(source.summary_text, source.language, language)
+        if summary_content:
+            logger.info(f"PaperSummary {paper_summary_obj.pk}: summary '{summary_type}' переведен с '{source.language}' на '{language}'.")
+        else:
+            source = None
+    if not summary_content:
+        summary_content = summarize_text_gemini(preprocess_text(text_for_summary(paper_summary_obj, summary_type)), target_language=language, summary_type=summary_type)
+    return save_summary(paper_summary_obj, language, summary_type, summary_content, source)
+
+def get_or_create_answer(paper_summary_obj, question, language):
+    """
+    Return (QuestionAnswer, created) for the question, asking the model only when no answer is stored.
+
+    Identical questions asked at the same time share one model call.
+    """
+    created = False
+
+    def generate():
+        nonlocal created
+        answer = answer_question_gemini(question_context(paper_summary_obj), question, target_language=language)
+        obj, created = QuestionAnswer.objects.get_or_create(
+            paper_summary=paper_summary_obj,
+            question=question,
+            answer_language=language,
+            defaults={'answer': answer}
+        )
+        return obj
+
+    obj = single_flight(
+        question_key(paper_summary_obj.pk, question, language),
+        lambda: QuestionAnswer.objects.filter(paper_summary=paper_summary_obj, question=question, answer_language=language).first(),
+        generate,
+    )
+    return obj, created
+
+def _stream_gemini(operation, temperature, prompt, prompt_tokens):
+    """Yield the response text piece by piece as Gemini writes it."""
+    model = llm.get_model(temperature=temperature)
+    if not model:
+        raise RuntimeError("Gemini API не настроен")
+    started = time.monotonic()
+    response = model.generate_content(prompt, stream=True)
+    first_piece_after = None
+    for chunk in response:
+        try:
+            piece = chunk.text
+        except ValueError:  # a chunk without text parts, e.g. one carrying only the finish reason
+            continue
+        if first_piece_after is None:
+            first_piece_after = time.monotonic() - started
+        yield piece
+    logger.info(f"Gemini {operation} (stream): первый фрагмент через {first_piece_after or 0:.2f} с, всего {time.monotonic() - started:.2f} с")
+    log_token_usage(operation, prompt_tokens, response)
+
+def stream_summary_gemini(text, target_language="ru", summary_type="ordinary"):
+    """Streaming summarize_text_gemini; for long papers the map phase runs first and the reduce step is streamed."""
+    text = compress_for_summary(text, summary_type)
+    if should_map_reduce(text):
+        partials = map_reduce_summarize(text, _summarize_chunk_gemini, lambda partials: partials)[0]
+        if not partials:
+            raise RuntimeError("не удалось суммировать части статьи")
+        text = _combine_partials(partials)
+    prompt, prompt_tokens = _summary_prompt(text, target_language, summary_type)
+    yield from _stream_gemini('summary', 0.7, prompt, prompt_tokens)
+
+def stream_answer_gemini(text, question, target_language="ru"):
+    prompt, prompt_tokens = _question_prompt(text, question, target_language)
+    yield from _stream_gemini('question', 0.7, prompt, prompt_tokens)
+
+def stream_translation_gemini(summary_text, source_language, target_language):
+    prompt, prompt_tokens = _translation_prompt(summary_text, source_language, target_language)
+    yield from _stream_gemini('translation', 0.2, prompt, prompt_tokens)
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _sse_generation(key, lookup, stream, save):
+    """
+    Yield Server-Sent Events for one generation: 'chunk' events as the model writes, then 'done' with the whole text.
+
+    lookup() returns the stored text or None, stream() yields the text in
+    pieces and save(text) stores the complete text and returns it. A stored
+    text is sent at once; while another request generates the same key its
+    result is awaited (single_flight) and sent whole. Nothing is stored if
+    generation fails or the client disconnects.
+    """
+    # Sent before anything slow so the browser gets its first byte immediately.
+    yield _sse_event('start', {})
+    try:
+        text = lookup()
+        if text is not None:
+            yield _sse_event('done', {'text': text, 'cached': True})
+            return
+        with flight_lock(key) as acquired:
+            if acquired:
+                # The previous owner may have stored the text between the lookup and the lock.
+                text = lookup()
+                if text is not None:
+                    yield _sse_event('done', {'text': text, 'cached': True})
+                    return
+                pieces = []
+                for piece in stream():
+                    pieces.append(piece)
+                    yield _sse_event('chunk', {'text': piece})
+                if not pieces:
+                    raise RuntimeError("пустой ответ модели")
+                text = save(''.join(pieces))
+                yield _sse_event('done', {'text': text, 'cached': False})
+                return
+        text = single_flight(key, lookup, lambda: save(''.join(stream())))
+        yield _sse_event('done', {'text': text, 'cached': True})
+    except Exception as e:
+        logger.error(f"Ошибка потоковой генерации {key}: {e}")
+        yield _sse_event('error', {'message': str(e)})
+
+def _sse_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return response
+
+@require_POST
+def stream_summary(request, pk):
+    """
+    Stream the summary of a paper as Server-Sent Events while Gemini writes it, then store it.
+
+    Takes the summarize form fields: summary_type, language, and summarize to
+    rewrite an existing summary. A missing language version is translated
+    per SUMMARY_LANGUAGE_POLICY.
+    """
+    paper_summary_obj = get_object_or_404(PaperSummary, pk=pk)
+    language = request.POST.get('language') or get_language()
+    summary_type = request.POST.get('summary_type', 'ordinary')
+    summaries = LocalizedPaperSummary.objects.filter(paper_summary=paper_summary_obj, language=language, summary_type=summary_type)
+    rewrite = 'summarize' in request.POST
+    if rewrite:
+        logger.info(f"PaperSummary {pk}: Запрошено потоковое повторное суммирование для языка '{language}', тип '{summary_type}'.")
+        # A summary rewritten by a concurrent request after this one arrived is as fresh as ours.
+        summaries = summaries.filter(updated_at__gte=timezone.now())
+    source = _summary_source(paper_summary_obj, language, summary_type, rewrite)
+
+    def lookup():
+        localized_summary = summaries.first()
+        return localized_summary.summary_text if localized_summary else None
+
+    def stream():
+        if source is not None:
+            logger.info(f"PaperSummary {pk}: summary '{summary_type}' переводится с '{source.language}' на '{language}'.")
+            return stream_translation_gemini(source.summary_text, source.language, language)
+        return stream_summary_gemini(preprocess_text(text_for_summary(paper_summary_obj, summary_type)), language, summary_type)
+
+    def save(text):
+        return save_summary(paper_summary_obj, language, summary_type, text, source).summary_text
+
+    return _sse_response(_sse_generation(summary_key(paper_summary_obj.pk, language, summary_type), lookup, stream, save))
+
+@require_POST
+def stream_answer(request, pk):
+    """Stream the answer to a question form or highlighted-text question as Server-Sent Events, then store it."""
+    paper_summary_obj = get_object_or_404(PaperSummary, pk=pk)
+    language = request.POST.get('language') or get_language()
+    if 'highlighted_question' in request.POST:
+        user_question = request.POST.get('highlighted_question', '').strip().lower()
+        highlighted_text = request.POST.get('highlighted_text', '').strip()
+        if not (user_question and highlighted_text):
+            return HttpResponseBadRequest(_("Вопрос или выделенный текст не указан."))
+        question = f"Regarding the highlighted text: '{highlighted_text}'\n{user_question}"
+    else:
+        question_form = QuestionForm(request.POST)
+        if not question_form.is_valid():
+            logger.warning(f"PaperSummary {pk}: Форма вопроса недействительна: {question_form.errors}")
+            return HttpResponseBadRequest(_("Форма вопроса недействительна."))
+        question = question_form.cleaned_data['question'].strip().lower()
+    answers = QuestionAnswer.objects.filter(paper_summary=paper_summary_obj, question=question, answer_language=language)
+
+    def lookup():
+        answer = answers.first()
+        return answer.answer if answer else None
+
+    def stream():
+        return stream_answer_gemini(question_context(paper_summary_obj), question, language)
+
+    def save(text):
+        return QuestionAnswer.objects.get_or_create(
+            paper_summary=paper_summary_obj,
+            question=question,
+            answer_language=language,
+            defaults={'answer': text}
+        )[0].answer
+
+    return _sse_response(_sse_generation(question_key(paper_summary_obj.pk, question, language), lookup, stream, save))
 
 def upload_paper(request):
     if request.method == 'POST':
@@ -288,9 +576,13 @@ def upload_paper(request):
             file_name_for_db = f"{repository}:{paper_id}"
             data = fetch_paper_data(repository, paper_id)
             if not data:
+                if metadata_cache.negative_reason(repository, paper_id) == TRANSIENT_ERROR:
+                    error_message = _(f"{repository} временно недоступен. Попробуйте позже.")
+                else:
+                    error_message = _(f"Не удалось найти статью с ID {paper_id} на {repository}.")
                 return render(request, 'papers/upload.html', {
                     'form': form,
-                    'error_message': _(f"Не удалось найти статью с ID {paper_id} на {repository}.")
+                    'error_message': error_message
                 })
             try:
                 existing_paper = PaperSummary.objects.get(file_name=file_name_for_db)
@@ -300,20 +592,24 @@ def upload_paper(request):
                 return redirect(success_url)
             except PaperSummary.DoesNotExist:
                 logger.info(f"Статья с {repository} ID '{paper_id}' не существует. Продолжаем обработку.")
-            pdf_save_path = download_preprint_pdf(repository, paper_id, settings.MEDIA_ROOT)
+            pdf_sha256 = store_preprint_pdf(repository, paper_id, data=data)
+            pdf_save_path = pdf_store.path(pdf_sha256)
             if not pdf_save_path:
                 return render(request, 'papers/upload.html', {
                     'form': form,
                     'error_message': _(f"Не удалось загрузить PDF с {repository} ID: {paper_id}.")
                 })
+            # Only the pages this summary type needs; the rest is extracted on first question or detailed summary.
+            extraction_profile = profile_for_summary_type(summary_type)
             try:
-                extracted_text, extracted_title, extracted_authors = extract_text_and_metadata_from_pdf(pdf_save_path)
+                extracted_text, extracted_title, extracted_authors, extraction_profile = extract_cached(pdf_sha256, pdf_save_path, profile=extraction_profile)
                 if not extracted_text:
                     logger.warning(f"Извлечено ноль текста из PDF {paper_id}.")
                     return render(request, 'papers/upload.html', {
                         'form': form,
                         'error_message': _("Не удалось извлечь текст из PDF.")
                     })
+                extracted_text = strip_page_breaks(extracted_text)
                 logger.info(f"Извлечен текст из PDF: {len(extracted_text)} символов.")
                 logger.info(f"Извлеченное название: {extracted_title}, Авторы: {extracted_authors}")
             except Exception as e:
@@ -322,29 +618,18 @@ def upload_paper(request):
                     'form': form,
                     'error_message': _("Ошибка извлечения текста из PDF: {error}").format(error=e)
                 })
-            finally:
-                try:
-                    os.remove(pdf_save_path)
-                    logger.info(f"Временный PDF удален: {pdf_save_path}")
-                except OSError as e:
-                    logger.error(f"Ошибка удаления временного PDF {pdf_save_path}: {e}")
-            current_active_language = get_language()
             paper_summary_obj = PaperSummary.objects.create(
                 file_name=file_name_for_db,
                 text_content=extracted_text,
                 title=data.get('title', extracted_title),  # Prefer scraped title
                 authors=data.get('authors', extracted_authors),  # Prefer scraped authors
-                url=data.get('abs_url', '')
+                url=data.get('abs_url', ''),
+                pdf_sha256=pdf_sha256,
+                extraction_profile=extraction_profile
             )
             logger.info(f"Объект PaperSummary создан с ID: {paper_summary_obj.pk}")
-            summary_content = summarize_text_gemini(extracted_text, target_language=current_active_language, summary_type=summary_type)
-            LocalizedPaperSummary.objects.create(
-                paper_summary=paper_summary_obj,
-                language=current_active_language,
-                summary_text=summary_content,
-                summary_type=summary_type
-            )
-            logger.info(f"LocalizedPaperSummary создан для '{paper_id}' на {current_active_language}, тип '{summary_type}'.")
+            store_sections(paper_summary_obj)
+            # The summary is streamed into the success page (stream_summary) instead of delaying the redirect.
             success_url = reverse('upload_success', kwargs={'pk': paper_summary_obj.pk})
             success_url += f'?cached_status=false&summary_type={summary_type}'
             return redirect(success_url)
@@ -354,7 +639,6 @@ def upload_paper(request):
 
 def upload_success(request, pk):
     paper_summary_obj = get_object_or_404(PaperSummary, pk=pk)
-    extracted_text = paper_summary_obj.text_content
     paper_filename = paper_summary_obj.file_name
     article_title = paper_summary_obj.title
     article_authors = paper_summary_obj.authors
@@ -375,26 +659,36 @@ def upload_success(request, pk):
         if 'summarize' in request.POST:
             summary_type = request.POST.get('summary_type', 'ordinary')
             logger.info(f"PaperSummary {pk}: Запрошено повторное суммирование для языка '{current_active_language}', тип '{summary_type}'.")
-            summary_content = summarize_text_gemini(extracted_text, target_language=current_active_language, summary_type=summary_type)
-            LocalizedPaperSummary.objects.update_or_create(
-                paper_summary=paper_summary_obj,
-                language=current_active_language,
-                summary_type=summary_type,
-                defaults={'summary_text': summary_content}
-            )
+            requested_at = timezone.now()
+            # A summary rewritten by a concurrent request after this one arrived is as fresh as ours.
+            summary_content = single_flight(
+                summary_key(paper_summary_obj.pk, current_active_language, summary_type),
+                lambda: LocalizedPaperSummary.objects.filter(
+                    paper_summary=paper_summary_obj,
+                    language=current_active_language,
+                    summary_type=summary_type,
+                    updated_at__gte=requested_at
+                ).first(),
+                lambda: write_summary(paper_summary_obj, current_active_language, summary_type, rewrite=True),
+            ).summary_text
             is_cached_paper = False
+        elif 'write_summary' in request.POST:
+            # The no-JavaScript path for a missing summary (streamed otherwise): write it, without rewriting a stored one.
+            summary_type = request.POST.get('summary_type', 'ordinary')
+            single_flight(
+                summary_key(paper_summary_obj.pk, current_active_language, summary_type),
+                lambda: LocalizedPaperSummary.objects.filter(
+                    paper_summary=paper_summary_obj,
+                    language=current_active_language,
+                    summary_type=summary_type
+                ).first(),
+                lambda: write_summary(paper_summary_obj, current_active_language, summary_type),
+            )
         elif 'ask_question' in request.POST:
             question_form = QuestionForm(request.POST)
             if question_form.is_valid():
                 user_question = question_form.cleaned_data['question'].strip().lower()
-                obj, created = QuestionAnswer.objects.get_or_create(
-                    paper_summary=paper_summary_obj,
-                    question=user_question,
-                    answer_language=current_active_language,
-                    defaults={
-                        'answer': answer_question_gemini(paper_summary_obj.text_content, user_question, target_language=current_active_language)
-                    }
-                )
+                obj, created = get_or_create_answer(paper_summary_obj, user_question, current_active_language)
                 answer_content = obj.answer
                 logger.info(f"PaperSummary {pk}: {'Сгенерирован новый' if created else 'Использован кэшированный'} ответ для вопроса '{user_question[:50]}...'.")
             else:
@@ -404,16 +698,10 @@ def upload_success(request, pk):
             highlighted_text = request.POST.get('highlighted_text', '').strip()
             if user_question and highlighted_text:
                 full_question = f"Regarding the highlighted text: '{highlighted_text}'\n{user_question}"
-                obj, created = QuestionAnswer.objects.get_or_create(
-                    paper_summary=paper_summary_obj,
-                    question=full_question,
-                    answer_language=current_active_language,
-                    defaults={
-                        'answer': answer_question_gemini(paper_summary_obj.text_content, full_question, target_language=current_active_language)
-                    }
-                )
+                obj, created = get_or_create_answer(paper_summary_obj, full_question, current_active_language)
                 answer_content = obj.answer
     summary_content = ""
+    summary_pending = False
     try:
         localized_summary = LocalizedPaperSummary.objects.get(
             paper_summary=paper_summary_obj,
@@ -422,18 +710,13 @@ def upload_success(request, pk):
         )
         summary_content = localized_summary.summary_text
     except LocalizedPaperSummary.DoesNotExist:
-        logger.info(f"PaperSummary {pk}: Кэшированный summary не найден для языка '{current_active_language}', тип '{summary_type}'.")
-        summary_content = summarize_text_gemini(extracted_text, target_language=current_active_language, summary_type=summary_type)
-        LocalizedPaperSummary.objects.create(
-            paper_summary=paper_summary_obj,
-            language=current_active_language,
-            summary_text=summary_content,
-            summary_type=summary_type
-        )
+        logger.info(f"PaperSummary {pk}: Кэшированный summary не найден для языка '{current_active_language}', тип '{summary_type}', будет получен потоком.")
+        summary_pending = True
         is_cached_paper = False
     return render(request, 'papers/upload_success.html', {
         'summary': summary_content,
-        'extracted_text': extracted_text,
+        'summary_pending': summary_pending,
+        'extracted_text': paper_summary_obj.text_content,
         'question_form': question_form,
         'answer': answer_content,
         'paper_filename': paper_filename,
@@ -517,29 +800,134 @@ def download_summary_pdf(request, pk):
     response['Content-Disposition'] = f'attachment; filename="{paper_summary_obj.file_name}_summary_{current_active_language}_{summary_type}.pdf"'
     return response
 
+def _parse_range_header(range_header, size):
+    """Parse a single 'bytes=start-end' range; return (start, end) inclusive, or None if absent/unsupported."""
+    if not range_header or not range_header.startswith('bytes=') or ',' in range_header:
+        return None
+    start_str, _sep, end_str = range_header[len('bytes='):].strip().partition('-')
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            start = size - int(end_str)
+            end = size - 1
+    except ValueError:
+        return None
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end:
+        return 'unsatisfiable'
+    return start, end
+
+def _iter_file_range(path, start, length, chunk_size=64 * 1024):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def _serve_stored_pdf(request, path, pdf_sha256, filename):
+    """Serve a blob from the PDF store with ETag, Content-Length and single-range support."""
+    etag = f'"{pdf_sha256}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+    size = os.path.getsize(path)
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range == etag:
+        byte_range = _parse_range_header(request.headers.get('Range'), size)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_iter_file_range(path, start, length), status=206, content_type='application/pdf')
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    else:
+        # FileResponse sets Content-Length and lets the server use wsgi.file_wrapper/sendfile.
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+def _tee_upstream_pdf(upstream, repository, paper_id):
+    """Yield upstream chunks to the client while writing them into the PDF store."""
+    writer = pdf_store.writer()
+    try:
+        with upstream:
+            for chunk in upstream.iter_content(chunk_size=64 * 1024):
+                writer.write(chunk)
+                yield chunk
+    except BaseException:
+        writer.abort()
+        raise
+    pdf_sha256, _size = writer.commit()
+    pdf_store.remember_alias(f"{repository}:{paper_id}", pdf_sha256)
+    PaperSummary.objects.filter(file_name=f"{repository}:{paper_id}").update(pdf_sha256=pdf_sha256)
+
+class _UpstreamPdfStream:
+    """
+    Streaming content for a proxied PDF whose close() always closes the upstream response.
+
+    A generator's cleanup only runs once it has started; if the response is
+    closed before the first chunk (client gone, HEAD), the upstream
+    connection and its rate-limiter slot would otherwise leak.
+    """
+
+    def __init__(self, upstream, repository, paper_id):
+        self.upstream = upstream
+        self.chunks = _tee_upstream_pdf(upstream, repository, paper_id)
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        try:
+            self.chunks.close()
+        finally:
+            self.upstream.close()
+
 def download_original_pdf(request, arxiv_id):
     repository, paper_id = arxiv_id.split(':', 1) if ':' in arxiv_id else ('arxiv', arxiv_id)
+    filename = f"{paper_id}.pdf"
+    pdf_sha256 = (
+        PaperSummary.objects.filter(file_name=f"{repository}:{paper_id}").values_list('pdf_sha256', flat=True).first()
+        or pdf_store.lookup_alias(f"{repository}:{paper_id}")
+    )
+    stored_path = pdf_store.path(pdf_sha256)
+    if stored_path:
+        return _serve_stored_pdf(request, stored_path, pdf_sha256, filename)
     data = fetch_paper_data(repository, paper_id)
     if not data or not data.get('pdf_url'):
         logger.error(f"Не удалось найти PDF для {repository} ID {paper_id}")
         return HttpResponse(_("Не удалось загрузить оригинальный PDF."), status=404)
     try:
-        response = requests.get(data['pdf_url'], stream=True, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()
-        django_response = HttpResponse(response.iter_content(chunk_size=8192), content_type='application/pdf')
-        django_response['Content-Disposition'] = f'attachment; filename="{paper_id}.pdf"'
-        return django_response
+        upstream = http_client.get(data['pdf_url'], stream=True, timeout=http_client.DOWNLOAD_TIMEOUT)
+        if not upstream.ok:
+            upstream.close()
+            upstream.raise_for_status()
     except requests.exceptions.RequestException as e:
         logger.error(f"Ошибка при загрузке PDF для {repository} ID {paper_id}: {e}")
         return HttpResponse(_("Не удалось загрузить оригинальный PDF: {error}").format(error=e), status=404)
+    # Cache miss: stream to the client and populate the store at the same time.
+    django_response = StreamingHttpResponse(_UpstreamPdfStream(upstream, repository, paper_id), content_type='application/pdf')
+    if upstream.headers.get('Content-Length') and not upstream.headers.get('Content-Encoding'):
+        django_response['Content-Length'] = upstream.headers['Content-Length']
+    django_response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return django_response
 
 def search_articles(request):
-    model = get_gemini_model()
-    if not model:
-        return render(request, "papers/search_results.html", {
-            "error": _("Не удалось подключиться к Gemini API."),
-            "query": ""
-        })
     if request.method == "POST":
         query = request.POST.get("search_query", "").strip()
         original_language = request.POST.get("original_language", "en")  # Get the original language from the form
@@ -553,6 +941,12 @@ def search_articles(request):
         try:
             # Use Gemini to translate the query to English acronym if not already in English
             if original_language != "en":
+                model = llm.get_model()
+                if not model:
+                    return render(request, "papers/search_results.html", {
+                        "error": _("Не удалось подключиться к Gemini API."),
+                        "query": query
+                    })
                 prompt = f"Translate the following text to english. Be specific about the terms. Return only translated version '{query}'. If the text is already in English or an acronym, return it as is."
                 response = model.generate_content(prompt)
                 translated_query = response.text.strip()
@@ -563,7 +957,7 @@ def search_articles(request):
 
             topic = query
             logger.info(f"Query: {query}, Using Topic: {topic}")
-            client = arxiv.Client()
+            client = http_client.get_arxiv_client()
             search = arxiv.Search(
                 query=f"ti:\"{topic}\" OR all:{topic} cat:cs.*",
                 max_results=200,
@@ -617,94 +1011,160 @@ def search_articles(request):
     return render(request, "papers/search_results.html", {})
 
 def fetch_paper_data(repository, paper_id):
+    """Fetch PDF URL and metadata for a paper, served from the metadata cache when possible."""
+    return metadata_cache.get_or_fetch(repository, paper_id, _fetch_paper_data_uncached)
+
+def arxiv_result_to_data(paper_id, result):
+    """Build the fetch_paper_data dict from an arxiv.Result."""
+    return {
+        'pdf_url': f"https://arxiv.org/pdf/{paper_id}.pdf",
+        'abs_url': f"https://arxiv.org/abs/{paper_id}",
+        'title': result.title,
+        'authors': ", ".join(author.name for author in result.authors),
+        'abstract': result.summary
+    }
+
+def _is_not_found(response):
+    """Upstream answered that the paper does not exist (as opposed to a retryable failure)."""
+    return response is not None and response.status_code in (400, 404, 410)
+
+def _fetch_paper_data_uncached(repository, paper_id):
     """Fetch PDF URL and metadata for a paper from the specified repository."""
     if repository == 'arxiv':
-        pdf_url = f"https://arxiv.org/pdf/{paper_id}.pdf"
-        abs_url = f"https://arxiv.org/abs/{paper_id}"
         try:
-            client = arxiv.Client()
+            client = http_client.get_arxiv_client()
             search = arxiv.Search(id_list=[paper_id])
             result = next(client.results(search), None)
             if result:
-                return {
-                    'pdf_url': pdf_url,
-                    'abs_url': abs_url,
-                    'title': result.title,
-                    'authors': ", ".join(author.name for author in result.authors),
-                    'abstract': result.summary
-                }
-        except Exception as e:
+                return arxiv_result_to_data(paper_id, result)
+        except arxiv.HTTPError as e:
             logger.error(f"arXiv API error for ID {paper_id}: {e}")
+            # A malformed or unknown ID is answered with 400/404; only 5xx is worth retrying.
+            if e.status in (400, 404, 410):
+                return None
+            raise TransientFetchError(e) from e
+        except (arxiv.ArxivError, requests.exceptions.RequestException) as e:
+            logger.error(f"arXiv API error for ID {paper_id}: {e}")
+            raise TransientFetchError(e) from e
     elif repository in ['medrxiv', 'biorxiv']:
         base_url = 'https://www.medrxiv.org' if repository == 'medrxiv' else 'https://www.biorxiv.org'
-        pdf_url = f"{base_url}/content/10.1101/{paper_id}v1.full.pdf"
-        abs_url = f"{base_url}/content/10.1101/{paper_id}v1"
+        base_id, version = split_version(paper_id)
+        pdf_url = f"{base_url}/content/10.1101/{base_id}v{version or 1}.full.pdf"
+        abs_url = f"{base_url}/content/10.1101/{base_id}v{version or 1}"
         try:
-            response = requests.get(abs_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # Extract title
-            title_tag = soup.find('h1', class_=['article-title', 'highwire-cite-title'])
-            title = title_tag.text.strip() if title_tag else ''
-            # Extract authors
-            authors = []
-            author_tags = soup.select('div.highwire-cite-authors span.author-name')
-            for author in author_tags:
-                author_name = author.text.strip()
-                if author_name:
-                    authors.append(author_name)
-            authors_str = ", ".join(authors) if authors else ''
-            # Extract abstract
-            abstract_tag = soup.find('div', class_=['abstract-content', 'section abstract'])
-            abstract = abstract_tag.text.strip() if abstract_tag else ''
-            # Print to console for debugging
-            print(f"Scraped {repository} metadata for ID {paper_id}:")
-            print(f"Title: {title}")
-            print(f"Authors: {authors_str}")
-            logger.debug(f"Scraped {repository} metadata for ID {paper_id}: Title='{title}', Authors='{authors_str}', Abstract='{abstract[:50]}...'")
+            metadata = _read_landing_page_metadata(abs_url, scrape_rxiv_html)
+            logger.debug(f"Scraped {repository} metadata for ID {paper_id}: Title='{metadata['title']}', Authors='{metadata['authors']}', Abstract='{metadata['abstract'][:50]}...'")
             return {
                 'pdf_url': pdf_url,
                 'abs_url': abs_url,
-                'title': title,
-                'authors': authors_str,
-                'abstract': abstract
+                'title': metadata['title'],
+                'authors': metadata['authors'],
+                'abstract': metadata['abstract']
             }
-        except requests.exceptions.Timeout:
+        except requests.exceptions.Timeout as e:
             logger.error(f"Timeout fetching {repository} metadata for ID {paper_id}")
-            return None
-        except Exception as e:
+            raise TransientFetchError(e) from e
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"{repository.capitalize()} fetch error for ID {paper_id}: {e}")
+            if _is_not_found(e.response):
+                return None
+            raise TransientFetchError(e) from e
+        except requests.exceptions.RequestException as e:
             logger.error(f"{repository.capitalize()} fetch error for ID {paper_id}: {e}")
-            return None
+            raise TransientFetchError(e) from e
     elif repository == 'chemrxiv':
         abs_url = f"https://chemrxiv.org/engage/chemrxiv/article-details/{paper_id}"
         try:
-            response = requests.get(abs_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title_tag = soup.find('h1', class_='article-title')
-            title = title_tag.text.strip() if title_tag else ''
-            authors_tag = soup.find('div', class_='article-authors')
-            authors = authors_tag.text.strip() if authors_tag else ''
-            abstract_tag = soup.find('div', class_='abstract-content')
-            abstract = abstract_tag.text.strip() if abstract_tag else ''
-            pdf_link = soup.find('a', href=lambda href: href and '.pdf' in href)
-            pdf_url = pdf_link['href'] if pdf_link else abs_url
-            logger.debug(f"Scraped ChemRxiv metadata for ID {paper_id}: Title='{title}', Authors='{authors}', Abstract='{abstract[:50]}...'")
+            metadata = _read_landing_page_metadata(abs_url, scrape_chemrxiv_html)
+            logger.debug(f"Scraped ChemRxiv metadata for ID {paper_id}: Title='{metadata['title']}', Authors='{metadata['authors']}', Abstract='{metadata['abstract'][:50]}...'")
             return {
-                'pdf_url': pdf_url,
+                'pdf_url': metadata['pdf_url'] or abs_url,
                 'abs_url': abs_url,
-                'title': title,
-                'authors': authors,
-                'abstract': abstract
+                'title': metadata['title'],
+                'authors': metadata['authors'],
+                'abstract': metadata['abstract']
             }
-        except requests.exceptions.Timeout:
+        except requests.exceptions.Timeout as e:
             logger.error(f"Timeout fetching ChemRxiv metadata for ID {paper_id}")
-            return None
-        except Exception as e:
+            raise TransientFetchError(e) from e
+        except requests.exceptions.HTTPError as e:
             logger.error(f"ChemRxiv fetch error for ID {paper_id}: {e}")
-            return None
+            if _is_not_found(e.response):
+                return None
+            raise TransientFetchError(e) from e
+        except requests.exceptions.RequestException as e:
+            logger.error(f"ChemRxiv fetch error for ID {paper_id}: {e}")
+            raise TransientFetchError(e) from e
     return None
 
+def scrape_rxiv_html(html):
+    """Full BeautifulSoup parse of a medRxiv/bioRxiv landing page (fallback when citation_* tags are missing)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    # Extract title
+    title_tag = soup.find('h1', class_=['article-title', 'highwire-cite-title'])
+    title = title_tag.text.strip() if title_tag else ''
+    # Extract authors
+    authors = []
+    author_tags = soup.select('div.highwire-cite-authors span.author-name')
+    for author in author_tags:
+        author_name = author.text.strip()
+        if author_name:
+            authors.append(author_name)
+    authors_str = ", ".join(authors) if authors else ''
+    # Extract abstract
+    abstract_tag = soup.find('div', class_=['abstract-content', 'section abstract'])
+    abstract = abstract_tag.text.strip() if abstract_tag else ''
+    return {'title': title, 'authors': authors_str, 'abstract': abstract, 'pdf_url': ''}
+
+def scrape_chemrxiv_html(html):
+    """Full BeautifulSoup parse of a ChemRxiv landing page (fallback when citation_* tags are missing)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    title_tag = soup.find('h1', class_='article-title')
+    title = title_tag.text.strip() if title_tag else ''
+    authors_tag = soup.find('div', class_='article-authors')
+    authors = authors_tag.text.strip() if authors_tag else ''
+    abstract_tag = soup.find('div', class_='abstract-content')
+    abstract = abstract_tag.text.strip() if abstract_tag else ''
+    pdf_link = soup.find('a', href=lambda href: href and '.pdf' in href)
+    pdf_url = pdf_link['href'] if pdf_link else ''
+    return {'title': title, 'authors': authors, 'abstract': abstract, 'pdf_url': pdf_url}
+
+def _drain(response, body, limit):
+    """Read what is left of a streamed body (up to limit bytes) so its keep-alive connection goes back to the pool."""
+    drained = 0
+    for chunk in body:
+        drained += len(chunk)
+        if drained > limit:
+            logger.debug(f"Landing page {response.url}: больше {limit} байт после <head>, соединение закрывается")
+            return
+
+def _read_landing_page_metadata(abs_url, scrape_fallback):
+    """
+    Read title/authors/abstract from the citation_* meta tags in the page <head>.
+
+    Only the head is parsed; the rest of the page is handed to scrape_fallback
+    only when the tags are missing. Otherwise the rest is still read (not
+    parsed) up to LANDING_PAGE_DRAIN_BYTES so the connection is reused: closing
+    a half-read response drops it, and the next request to the same host pays
+    for a new TLS handshake. Pages larger than that are cut off, since
+    downloading them costs more than the reconnect.
+    """
+    with http_client.get(abs_url, stream=True) as response:
+        response.raise_for_status()
+        encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else 'utf-8'
+        body = response.iter_content(chunk_size=16 * 1024)
+        chunks = codecs.iterdecode(body, encoding, errors='replace')
+        metadata, consumed = parse_citation_meta(chunks)
+        if has_required_metadata(metadata):
+            _drain(response, body, getattr(settings, 'LANDING_PAGE_DRAIN_BYTES', 512 * 1024))
+            return metadata
+        logger.info(f"citation_* meta tags incomplete on {abs_url}, falling back to full HTML parse")
+        scraped = scrape_fallback(consumed + ''.join(chunks))
+    for key, value in scraped.items():
+        if not metadata.get(key):
+            metadata[key] = value
+    return metadata
+
 def paper_summary(request, arxiv_id):
     logger.debug(f"Starting paper_summary for ID {arxiv_id}")
     repository, paper_id = arxiv_id.split(':', 1) if ':' in arxiv_id else ('arxiv', arxiv_id)
@@ -719,19 +1179,22 @@ def paper_summary(request, arxiv_id):
             return render(request, 'papers/upload_success.html', {
                 'error_message': _(f"Статья с ID {paper_id} не найдена на {repository}.")
             })
-        pdf_save_path = download_preprint_pdf(repository, paper_id, settings.MEDIA_ROOT)
+        pdf_sha256 = store_preprint_pdf(repository, paper_id, data=data)
+        pdf_save_path = pdf_store.path(pdf_sha256)
         if not pdf_save_path:
             logger.error(f"Failed to download PDF for {repository} ID {paper_id}.")
             return render(request, 'papers/upload_success.html', {
                 'error_message': _(f"Не удалось загрузить PDF с {repository} ID {paper_id}.")
             })
+        extraction_profile = profile_for_summary_type(request.POST.get('summary_type', request.GET.get('summary_type', 'ordinary')))
         try:
-            extracted_text, extracted_title, extracted_authors = extract_text_and_metadata_from_pdf(pdf_save_path)
+            extracted_text, extracted_title, extracted_authors, extraction_profile = extract_cached(pdf_sha256, pdf_save_path, profile=extraction_profile)
             if not extracted_text:
                 logger.warning(f"No text extracted from PDF for {repository} ID {paper_id}.")
                 return render(request, 'papers/upload_success.html', {
                     'error_message': _("Не удалось извлечь текст из PDF.")
                 })
+            extracted_text = strip_page_breaks(extracted_text)
             # Always prefer scraped metadata for medRxiv/bioRxiv, fallback to PDF only for arXiv if scraped fails
             final_title = data.get('title', extracted_title) if repository != 'arxiv' or not data.get('title') else data.get('title', '')
             final_authors = data.get('authors', extracted_authors) if repository != 'arxiv' or not data.get('authors') else data.get('authors', '')
@@ -740,18 +1203,16 @@ def paper_summary(request, arxiv_id):
             return render(request, 'papers/upload_success.html', {
                 'error_message': _(f"Ошибка извлечения текста из PDF: {e}")
             })
-        finally:
-            try:
-                os.remove(pdf_save_path)
-            except OSError as e:
-                logger.error(f"Error deleting PDF {pdf_save_path}: {e}")
         paper_summary = PaperSummary.objects.create(
             file_name=file_name,
             text_content=extracted_text,
             title=final_title,
             authors=final_authors,
-            url=data.get('abs_url', '')
+            url=data.get('abs_url', ''),
+            pdf_sha256=pdf_sha256,
+            extraction_profile=extraction_profile
         )
+        store_sections(paper_summary)
         is_cached_paper = False
     current_language = get_language()
     summary_type = request.POST.get('summary_type', request.GET.get('summary_type', 'ordinary'))
@@ -768,29 +1229,17 @@ def paper_summary(request, arxiv_id):
             question_form = QuestionForm(request.POST)
             if question_form.is_valid():
                 user_question = question_form.cleaned_data['question'].strip().lower()
-                obj, created = QuestionAnswer.objects.get_or_create(
-                    paper_summary=paper_summary,
-                    question=user_question,
-                    answer_language=current_language,
-                    defaults={
-                        'answer': answer_question_gemini(paper_summary.text_content, user_question, target_language=current_language)
-                    }
-                )
+                obj, created = get_or_create_answer(paper_summary, user_question, current_language)
                 answer_content = obj.answer
         elif 'highlighted_question' in request.POST:
             user_question = request.POST.get('highlighted_question', '').strip().lower()
             highlighted_text = request.POST.get('highlighted_text', '').strip()
             if user_question and highlighted_text:
                 full_question = f"Regarding the highlighted text: '{highlighted_text}'\n{user_question}"
-                obj, created = QuestionAnswer.objects.get_or_create(
-                    paper_summary=paper_summary,
-                    question=full_question,
-                    answer_language=current_language,
-                    defaults={
-                        'answer': answer_question_gemini(paper_summary.text_content, full_question, target_language=current_language)
-                    }
-                )
+                obj, created = get_or_create_answer(paper_summary, full_question, current_language)
                 answer_content = obj.answer
+    summary_content = ""
+    summary_pending = False
     try:
         localized_summary = LocalizedPaperSummary.objects.get(
             paper_summary=paper_summary,
@@ -799,16 +1248,11 @@ def paper_summary(request, arxiv_id):
         )
         summary_content = localized_summary.summary_text
     except LocalizedPaperSummary.DoesNotExist:
-        summary_content = summarize_text_gemini(paper_summary.text_content, target_language=current_language, summary_type=summary_type)
-        LocalizedPaperSummary.objects.create(
-            paper_summary=paper_summary,
-            language=current_language,
-            summary_text=summary_content,
-            summary_type=summary_type
-        )
+        summary_pending = True
         is_cached_paper = False
     return render(request, 'papers/upload_success.html', {
         'summary': summary_content,
+        'summary_pending': summary_pending,
         'extracted_text': paper_summary.text_content,
         'question_form': question_form,
         'answer': answer_content,
@@ -823,13 +1267,3 @@ def paper_summary(request, arxiv_id):
         'summary_types': [('short', _('Короткий')), ('ordinary', _('Стандартный')), ('detailed', _('Подробный'))],
         'related_papers': []
     })
-
-try:
-    gemini_api_key = settings.GEMINI_API_KEY
-    if not gemini_api_key or gemini_api_key == 'your_dev_api_key_if_needed':
-        logger.warning("GEMINI_API_KEY не установлен.")
-    else:
-        genai.configure(api_key=gemini_api_key)
-        logger.info("Gemini API успешно настроен.")
-except Exception as e:
-    logger.error(f"Ошибка конфигурации Gemini API: {e}")
\ No newline at end of file